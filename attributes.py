@@ -0,0 +1,220 @@
+# Multi-valued Music and Movie attributes (genres, artists, producers, directors)
+# The base tables keep the comma separated text that Manage Entries, Populate and imports
+# write, and every one of those paths also stores one row per value in the attribute tables
+# (schema.ATTRIBUTE_TABLES) within the same transaction. "All albums by this artist" or
+# "items per genre" are then answered from the (value, ProductID) indexes instead of
+# LIKE '%x%' scans and string splitting.
+#
+# The MusicDetails and MovieDetails views rebuild the comma joined shape from the attribute
+# tables, for readers moving off the old columns.
+
+import backends
+import schema
+
+SEPARATOR = ","
+
+# Base table -> view presenting it with its attributes joined from the attribute tables
+VIEWS = {
+    "Music": "MusicDetails",
+    "Movie": "MovieDetails",
+}
+
+DEFAULT_LIMIT = 100
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def attributes_of(table_name):
+    """[(column, attribute table)] of a base table, empty for every other table."""
+    return [(column, attribute_table) for (base, column), attribute_table in schema.ATTRIBUTE_TABLES.items()
+            if base == table_name]
+
+
+def attribute_table(table_name, column):
+    """Attribute table of one column, matching the column name case-insensitively."""
+    for (base, attribute_column), name in schema.ATTRIBUTE_TABLES.items():
+        if base == table_name and attribute_column.upper() == column.upper():
+            return attribute_column, name
+    raise ValueError(f"{table_name}.{column} is not a multi-valued attribute")
+
+
+def split_values(text):
+    """Distinct values of a comma separated attribute, in the order written."""
+    values = []
+    for value in str(text or "").split(SEPARATOR):
+        value = value.strip()
+        if value and value not in values:
+            values.append(value)
+    return values
+
+
+def insert_values(cursor, table_name, column_names, rows):
+    """Store the attribute values of base table rows that were just inserted or updated."""
+    attributes = attributes_of(table_name)
+    if not attributes:
+        return
+    key_position = schema.column_position(column_names, "ProductID")
+    for column, attribute_table in attributes:
+        position = schema.column_position(column_names, column)
+        values = [(row[key_position], value) for row in rows for value in split_values(row[position])]
+        if values:
+            cursor.executemany(f"INSERT INTO {attribute_table} (ProductID, {column}) VALUES (:1, :2)", values)
+
+
+def delete_values(cursor, table_name, product_id):
+    """Remove the attribute values of one base table row (before it is updated or deleted)."""
+    for column, attribute_table in attributes_of(table_name):
+        cursor.execute(f"DELETE FROM {attribute_table} WHERE ProductID = :1", [product_id])
+
+
+def rebuild(connection, table_name, batch_size=REBUILD_BATCH_SIZE):
+    """Refill the attribute tables of a base table from its comma separated columns (no commit).
+
+    This is the migration for rows written before the attribute tables existed, and the
+    repair after custom SQL changed the base table.
+    """
+    cursor = connection.cursor()
+    for column, attribute_table in attributes_of(table_name):
+        cursor.execute(f"DELETE FROM {attribute_table}")
+    reader = connection.cursor()
+    reader.arraysize = batch_size
+    reader.execute(f"SELECT * FROM {table_name}")
+    column_names = [desc[0] for desc in reader.description]
+    rows_done = 0
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            return rows_done
+        insert_values(cursor, table_name, column_names, rows)
+        rows_done += len(rows)
+
+
+def migrate(connection):
+    """Fill the attribute tables of base tables that have rows but no attribute values yet.
+
+    Returns the base tables that were migrated (committed).
+    """
+    migrated = []
+    cursor = connection.cursor()
+    for table_name in VIEWS:
+        if not _has_rows(cursor, table_name):
+            continue
+        if any(_has_rows(cursor, attribute_table) for column, attribute_table in attributes_of(table_name)):
+            continue
+        rebuild(connection, table_name)
+        migrated.append(table_name)
+    connection.commit()
+    return migrated
+
+
+def _has_rows(cursor, table_name):
+    cursor.execute(f"SELECT 1 FROM {table_name}")
+    return cursor.fetchone() is not None
+
+
+# Compatibility views
+
+def view_sql(table_name, dialect="oracle"):
+    """CREATE VIEW presenting a base table with its attributes comma joined from the attribute tables."""
+    attributes = dict(attributes_of(table_name))
+    columns = []
+    for column, kind in schema.COLUMN_TYPES[table_name]:
+        if column not in attributes:
+            columns.append(f"b.{column}")
+        elif dialect == "sqlite":
+            # Values come back in primary key (ProductID, value) order
+            columns.append(f"(SELECT GROUP_CONCAT(a.{column}, ', ') FROM {attributes[column]} a "
+                           f"WHERE a.ProductID = b.ProductID) AS {column}")
+        else:
+            columns.append(f"(SELECT LISTAGG(a.{column}, ', ') WITHIN GROUP (ORDER BY a.{column}) "
+                           f"FROM {attributes[column]} a WHERE a.ProductID = b.ProductID) AS {column}")
+    create = "CREATE VIEW IF NOT EXISTS" if dialect == "sqlite" else "CREATE OR REPLACE VIEW"
+    return f"{create} {VIEWS[table_name]} AS SELECT {', '.join(columns)} FROM {table_name} b"
+
+
+def create_views(connection, dialect="oracle"):
+    """Create (or replace) the compatibility views; returns their names."""
+    cursor = connection.cursor()
+    for table_name in VIEWS:
+        cursor.execute(view_sql(table_name, dialect))
+    connection.commit()
+    return list(VIEWS.values())
+
+
+def drop_views(connection, dialect="oracle"):
+    """Drop the compatibility views that exist; returns their names."""
+    cursor = connection.cursor()
+    dropped = []
+    for view_name in VIEWS.values():
+        try:
+            cursor.execute(f"DROP VIEW {view_name}")
+            dropped.append(view_name)
+        except backends.DatabaseError:
+            pass  # Never created
+    connection.commit()
+    return dropped
+
+
+# Lookups
+
+def _limit_clause(dialect):
+    return " LIMIT :row_limit" if dialect == "sqlite" else " FETCH FIRST :row_limit ROWS ONLY"
+
+
+def filter_pairs(filters):
+    """[(column, value)] from a dict, or from pairs so one column can be required twice."""
+    return list(filters.items()) if isinstance(filters, dict) else list(filters or [])
+
+
+def _filter_predicates(table_name, pairs, alias, start=0):
+    """EXISTS predicates (and their binds) requiring every (column, value) pair on alias.ProductID."""
+    predicates = []
+    binds = {}
+    for i, (column, value) in enumerate(pairs, start):
+        column, name = attribute_table(table_name, column)
+        predicates.append(f"EXISTS (SELECT 1 FROM {name} f{i} WHERE f{i}.ProductID = {alias}.ProductID "
+                          f"AND f{i}.{column} = :value{i})")
+        binds[f"value{i}"] = value
+    return predicates, binds
+
+
+def find(cursor, table_name, filters, limit=DEFAULT_LIMIT, dialect="oracle", cache=None):
+    """Base table rows having every attribute value in filters, e.g. {"Artist": "Imagine Dragons"}
+    or [("Genre", "Rock"), ("Genre", "Jazz")].
+
+    The first filter drives the query through its (value, ProductID) index, so rows come back
+    in ProductID order without a sort. Returns (column names, rows).
+    """
+    pairs = filter_pairs(filters)
+    if not pairs:
+        raise ValueError("find() needs at least one attribute filter")
+    column, name = attribute_table(table_name, pairs[0][0])
+    predicates, binds = _filter_predicates(table_name, pairs[1:], "b", start=1)
+    sql = (f"SELECT b.* FROM {name} a JOIN {table_name} b ON b.ProductID = a.ProductID "
+           f"WHERE a.{column} = :value0")
+    for predicate in predicates:
+        sql += f" AND {predicate}"
+    sql += " ORDER BY a.ProductID" + _limit_clause(dialect)
+    binds.update(value0=pairs[0][1], row_limit=limit)
+    return _fetch(cursor, sql, binds, cache)
+
+
+def facet_counts(cursor, table_name, column, filters=None, dialect="oracle", cache=None):
+    """[(value, items)] of one attribute, most common first; filters narrow the items counted.
+
+    Without filters this is answered from the (value, ProductID) index alone.
+    """
+    column, name = attribute_table(table_name, column)
+    predicates, binds = _filter_predicates(table_name, filter_pairs(filters), "a")
+    sql = f"SELECT a.{column}, COUNT(*) AS Items FROM {name} a"
+    if predicates:
+        sql += " WHERE " + " AND ".join(predicates)
+    sql += f" GROUP BY a.{column} ORDER BY COUNT(*) DESC, a.{column}"
+    return _fetch(cursor, sql, binds, cache)[1]
+
+
+def _fetch(cursor, sql, binds, cache):
+    if cache is not None:
+        return cache.fetch(cursor, sql, binds)
+    cursor.execute(sql, binds)
+    return [desc[0] for desc in cursor.description], cursor.fetchall()
@@ -0,0 +1,255 @@
+# Database backends used by main.py and the helper modules
+# Every piece of code borrows a connection for the duration of one operation:
+#
+#     with backend.connection() as connection:
+#         cursor = connection.cursor()
+#         ...
+#
+# so searches, reports and edits running on different worker threads never share a cursor.
+# OracleBackend pools sessions with cx_Oracle.SessionPool, SQLiteBackend is a stand-in for
+# local testing and benchmarks. Both speak the same named-bind SQL; `dialect` tells the
+# few places that differ (row limits, DUAL, DROP ... CASCADE) which form to use.
+#
+# cx_Oracle is only imported when an OracleBackend is opened, so SQLite runs and the command
+# line (cli.py) start without loading the driver.
+
+import contextlib
+import datetime
+import decimal
+import queue
+import sqlite3
+import threading
+import uuid
+
+cx_Oracle = None  # set by load_oracle()
+
+# Exceptions raised by any backend, for except clauses that don't care which one is active
+# (load_oracle() adds cx_Oracle's, so always refer to it as backends.DatabaseError)
+DatabaseError = (sqlite3.Error,)
+
+# SQLite stores dates as ISO text, the same strings Oracle's TO_DATE(..., 'YYYY-MM-DD') reads
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(decimal.Decimal, str)  # Stored with the column's NUMERIC affinity
+
+
+def load_oracle():
+    """Import cx_Oracle on first use and return it."""
+    global cx_Oracle, DatabaseError
+    if cx_Oracle is None:
+        try:
+            import cx_Oracle as driver
+        except ImportError:
+            raise RuntimeError("cx_Oracle is not installed") from None
+        cx_Oracle = driver
+        DatabaseError = (sqlite3.Error, driver.DatabaseError)
+    return cx_Oracle
+
+
+class SimplePool:
+    """Bounded pool of connections created on demand by `factory`."""
+
+    def __init__(self, factory, max_size):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.max_size:
+                self.opened += 1
+                try:
+                    return self.factory()
+                except Exception:
+                    self.opened -= 1
+                    raise
+        return self.idle.get()  # Pool exhausted, wait for a connection to come back
+
+    def release(self, connection):
+        self.idle.put(connection)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Backend:
+    """Shared behaviour: borrowing connections, cancelling them and checking health."""
+
+    dialect = None
+    test_query = None
+
+    def __init__(self):
+        self.busy = {}  # connection currently lent out -> owner it was borrowed for, so cancel() can interrupt it
+        self.busy_lock = threading.Lock()
+        self.tracer = None  # query_trace.Tracer timing the statements run on borrowed connections
+        self.owner_of = None  # returns the owner (e.g. the job) borrowing on the calling thread, None if none
+
+    def acquire(self):
+        raise NotImplementedError
+
+    def release(self, connection):
+        raise NotImplementedError
+
+    def _owner(self):
+        return self.owner_of() if self.owner_of is not None else None
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a connection; uncommitted work is rolled back if the block fails."""
+        connection = self.acquire()
+        with self.busy_lock:
+            self.busy[connection] = self._owner()
+        try:
+            yield connection if self.tracer is None else self.tracer.wrap(connection)
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            with self.busy_lock:
+                self.busy.pop(connection, None)
+            self.release(connection)
+
+    def claim(self, connection):
+        """Hand a connection kept across jobs (e.g. an open result stream) to the owner on the calling thread."""
+        connection = getattr(connection, "_connection", connection)  # Unwrap a query_trace.TracedConnection
+        with self.busy_lock:
+            if connection in self.busy:
+                self.busy[connection] = self._owner()
+
+    def cancel(self, owner):
+        """Interrupt the statements running on the connections borrowed for one owner."""
+        if owner is None:
+            return
+        with self.busy_lock:
+            busy = [connection for connection, borrower in self.busy.items() if borrower is owner]
+        for connection in busy:
+            self.interrupt(connection)
+
+    def interrupt(self, connection):
+        raise NotImplementedError
+
+    def health_check(self):
+        """Run the test query on a pooled connection and return its result."""
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(self.test_query)
+            return cursor.fetchone()[0]
+
+    def drop_table_sql(self, table_name):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class OracleBackend(Backend):
+    """Oracle sessions from a cx_Oracle.SessionPool.
+
+    SessionPool can't open SYSDBA sessions, so with sysdba=True a SimplePool of
+    standalone connections is used instead.
+    """
+
+    dialect = "oracle"
+    test_query = "SELECT 'Hello, Oracle XE!' FROM DUAL"
+
+    def __init__(self, user, password, dsn, min_sessions=1, max_sessions=4, increment=1,
+                 sysdba=False, lib_dir=None, ping_interval=60):
+        super().__init__()
+        load_oracle()
+        if lib_dir:
+            try:
+                cx_Oracle.init_oracle_client(lib_dir=lib_dir)  # Initialize the Oracle client
+            except cx_Oracle.ProgrammingError:
+                pass  # Already initialized by an earlier connect attempt
+        self.sysdba = sysdba
+        if sysdba:
+            self.pool = SimplePool(
+                lambda: cx_Oracle.connect(user=user, password=password, dsn=dsn, encoding="UTF-8",
+                                          mode=cx_Oracle.SYSDBA, threaded=True),
+                max_sessions)
+        else:
+            self.pool = cx_Oracle.SessionPool(
+                user=user, password=password, dsn=dsn, min=min_sessions, max=max_sessions,
+                increment=increment, threaded=True, encoding="UTF-8",
+                getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT, ping_interval=ping_interval)
+        with self.connection() as connection:
+            self.version = connection.version
+
+    def acquire(self):
+        return self.pool.acquire()
+
+    def release(self, connection):
+        self.pool.release(connection)
+
+    def interrupt(self, connection):
+        connection.cancel()
+
+    def pool_status(self):
+        """Short description of pool usage for the terminal."""
+        if self.sysdba:
+            return f"{self.pool.opened} standalone SYSDBA sessions, {len(self.busy)} busy"
+        return f"{self.pool.opened} sessions open, {self.pool.busy} busy, max {self.pool.max}"
+
+    def drop_table_sql(self, table_name):
+        return f"DROP TABLE {table_name} CASCADE CONSTRAINTS"
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteBackend(Backend):
+    """SQLite database file (or shared in-memory database) for local testing and benchmarks."""
+
+    dialect = "sqlite"
+    test_query = "SELECT 'Hello, SQLite!'"
+
+    def __init__(self, path=":memory:", max_connections=4):
+        super().__init__()
+        self.keep_alive = None
+        if path == ":memory:":
+            # Connections only see the same in-memory database through a shared-cache URI,
+            # which lives as long as one connection to it stays open
+            self.uri = f"file:store-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self.keep_alive = self._connect()
+        else:
+            self.uri = f"file:{path}"
+        self.pool = SimplePool(self._connect, max_connections)
+        self.version = sqlite3.sqlite_version
+
+    def _connect(self):
+        connection = sqlite3.connect(self.uri, uri=True, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def acquire(self):
+        return self.pool.acquire()
+
+    def release(self, connection):
+        self.pool.release(connection)
+
+    def interrupt(self, connection):
+        connection.interrupt()
+
+    def pool_status(self):
+        return f"{self.pool.opened} connections open, {len(self.busy)} busy"
+
+    def drop_table_sql(self, table_name):
+        return f"DROP TABLE {table_name}"
+
+    def close(self):
+        self.pool.close()
+        if self.keep_alive is not None:
+            self.keep_alive.close()
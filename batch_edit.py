@@ -0,0 +1,238 @@
+# Staged batch edits for manage_entries
+# Updates, inserts and deletes are collected in an EditBatch instead of being committed one by
+# one, previewed as a diff against the rows as stored, and then applied in one transaction:
+# deletes, then updates grouped by the columns they set, then inserts, each group with a
+# single executemany. If any row fails, the whole batch is rolled back and every failing row
+# is reported (Oracle's batcherrors, or a row by row replay on SQLite, see bulk_load.py).
+#
+# Staged values are converted with the table's metadata (metadata.py) when they are staged, so
+# a malformed number, an over-long text or a missing required value is refused right away
+# instead of at apply time, and every executemany declares its bind types first.
+#
+# Updates and deletes remember the row they were staged against and only apply while the row
+# still has its row version (schema.VERSION_COLUMN), like records.update_value() and delete();
+# a row someone else changed in between rolls the batch back with records.ConflictError.
+
+import attributes
+import bulk_load
+import metadata
+import records
+import schema
+
+
+def _text(value):
+    return "NULL" if value is None else str(value)
+
+
+class EditBatch:
+    """Updates, inserts and deletes staged against one table, applied in one transaction."""
+
+    def __init__(self, table_name, info=None):
+        self.table_name = table_name
+        self.info = info or metadata.declared(table_name)  # metadata.TableInfo
+        self.updates = {}  # key -> {column: value}, in the order first staged
+        self.deletes = {}  # key -> None (an ordered set)
+        self.inserts = []  # value lists in column order
+        self.seen = {}  # key -> row an update or delete was staged against, whose row version is checked
+
+    def __len__(self):
+        return len(self.updates) + len(self.deletes) + len(self.inserts)
+
+    def stage_update(self, key, column, text, seen=None):
+        """Stage setting one column of the row with this key (a later value for the same column wins).
+
+        seen is the row as the user saw it; the first one staged for a key is kept.
+        """
+        if key in self.deletes:
+            raise ValueError(f"{key} is already staged for removal")
+        column = self.info.column(column)
+        self.updates.setdefault(key, {})[column.name] = column.convert(text)
+        self._see(key, seen)
+
+    def stage_delete(self, key, seen=None):
+        """Stage removing the row with this key, dropping any update staged for it."""
+        self.updates.pop(key, None)
+        self.deletes[key] = None
+        self._see(key, seen)
+
+    def _see(self, key, seen):
+        if seen is not None:
+            self.seen.setdefault(key, seen)
+
+    def rebase(self, key, row):
+        """Apply the change staged for a key to the row as it is now (after a conflict)."""
+        self.seen[key] = row
+
+    def unstage(self, key):
+        """Drop the update or delete staged for a key."""
+        self.updates.pop(key, None)
+        self.deletes.pop(key, None)
+        self.seen.pop(key, None)
+
+    def stage_insert(self, texts):
+        """Stage a new row from one text value per column."""
+        self.inserts.append(self.info.convert_row(texts))
+
+    def drop(self, numbers):
+        """Unstage changes by their number in changes(), e.g. the ones a failed apply reported."""
+        numbers = set(numbers)
+        changes = self.changes()
+        seen = dict(self.seen)
+        self.clear()
+        for number, (kind, key, values) in enumerate(changes, 1):
+            if number in numbers:
+                continue
+            if kind == "DELETE":
+                self.deletes[key] = None
+            elif kind == "UPDATE":
+                self.updates[key] = values
+            else:
+                self.inserts.append(values)
+            if key in seen:
+                self.seen[key] = seen[key]
+
+    def clear(self):
+        self.updates.clear()
+        self.deletes.clear()
+        self.inserts.clear()
+        self.seen.clear()
+
+    def changes(self):
+        """[(kind, key, values)] in the order they are applied; error reports number changes from 1 in this order."""
+        return ([("DELETE", key, None) for key in self.deletes]
+                + [("UPDATE", key, values) for key, values in self.updates.items()]
+                + [("INSERT", None, values) for values in self.inserts])
+
+    def preview(self, cursor):
+        """Lines describing every staged change against the stored rows; returns (lines, rows that are gone)."""
+        stored = records.fetch_rows(cursor, self.table_name, list(self.deletes) + list(self.updates))
+        columns = self.info.column_names
+        lines = []
+        missing = 0
+        for number, (kind, key, values) in enumerate(self.changes(), 1):
+            if kind == "INSERT":
+                lines.append(f"{number:>4} + ({', '.join(_text(value) for value in values)})")
+                continue
+            row = stored.get(key)
+            if row is None:
+                missing += 1
+                lines.append(f"{number:>4} ! {key} no longer exists")
+            elif kind == "DELETE":
+                lines.append(f"{number:>4} - {row}")
+            else:
+                diffs = ", ".join(f"{column}: {_text(row[columns.index(column)])} -> {_text(value)}"
+                                  for column, value in values.items())
+                lines.append(f"{number:>4} ~ {key} {diffs}")
+        return lines, missing
+
+    def version(self, key):
+        """Row version the change staged for a key has to find, None when it isn't checked."""
+        return self.info.version_of(self.seen.get(key))
+
+    def apply(self, connection, dialect="oracle"):
+        """Apply every staged change in one transaction.
+
+        Returns (results, errors). results is [(old key, new key, row as stored)] with old key None
+        for inserts and row None for deletes. errors is [(change number, message)]; when there are
+        any, the transaction was rolled back and results is empty. When a row was changed by someone
+        else since it was staged, the transaction is rolled back and records.ConflictError raised.
+        """
+        cursor = connection.cursor()
+        if dialect == "sqlite":
+            cursor.execute("BEGIN IMMEDIATE")  # Nobody else writes between the checks and the changes
+        changes = self.changes()
+        table_name = self.table_name
+        key_condition = records.key_condition(table_name)
+
+        # Lock the rows being changed and make sure they are all still there
+        stored = records.fetch_rows(cursor, table_name, list(self.deletes) + list(self.updates),
+                                    lock=dialect != "sqlite")
+        errors = [(number, f"{key} no longer exists") for number, (kind, key, values) in enumerate(changes, 1)
+                  if kind != "INSERT" and key not in stored]
+
+        # Attribute rows (Music, Movie) are rewritten from the base rows afterwards
+        for column, attribute_table in attributes.attributes_of(table_name):
+            keys = [(key[0],) for key in list(self.deletes) + list(self.updates)]
+            if keys:
+                cursor.executemany(f"DELETE FROM {attribute_table} WHERE ProductID = :1", keys)
+
+        info = self.info
+        key_columns = records.key_columns(table_name)
+        version_column = {"version": schema.VERSION_COLUMN} if info.version is not None else {}
+        version_condition = f"{key_condition} AND {schema.VERSION_COLUMN} = :version"
+        conflicted = False  # a versioned statement matched fewer rows than it was given
+
+        def versioned_binds(key):
+            binds = records.key_binds(key)
+            if self.version(key) is not None:
+                binds["version"] = self.version(key)
+            return binds
+
+        def run_group(sql, group, versioned):
+            nonlocal conflicted
+            matched, group_errors = bulk_load.execute_counted(cursor, sql, [binds for change_number, binds in group],
+                                                              dialect)
+            conflicted |= versioned and matched < len(group) - len(group_errors)
+            return [(group[offset][0], message) for offset, message in group_errors]
+
+        deletes = {}  # versioned -> [(change number, binds)]
+        for change_number, key in enumerate(self.deletes, 1):
+            binds = versioned_binds(key)
+            deletes.setdefault("version" in binds, []).append((change_number, binds))
+        for versioned, group in deletes.items():
+            info.declare_binds(cursor, **key_columns, **(version_column if versioned else {}))
+            errors += run_group(f"DELETE FROM {table_name} WHERE {version_condition if versioned else key_condition}",
+                                group, versioned)
+
+        groups = {}  # (columns set, versioned) -> [(change number, binds)]
+        for change_number, (key, values) in enumerate(self.updates.items(), len(self.deletes) + 1):
+            binds = versioned_binds(key)
+            binds.update((f"value{i}", value) for i, value in enumerate(values.values()))
+            groups.setdefault((tuple(values), "version" in binds), []).append((change_number, binds))
+        for (columns, versioned), group in groups.items():
+            assignments = ", ".join(f"{column} = :value{i}" for i, column in enumerate(columns))
+            if versioned:
+                assignments += f", {schema.VERSION_COLUMN} = {schema.VERSION_COLUMN} + 1"
+            info.declare_binds(cursor, **key_columns, **{f"value{i}": column for i, column in enumerate(columns)},
+                               **(version_column if versioned else {}))
+            errors += run_group(f"UPDATE {table_name} SET {assignments} "
+                                f"WHERE {version_condition if versioned else key_condition}", group, versioned)
+        number = len(self.deletes) + len(self.updates) + 1
+
+        if self.inserts:
+            sql = bulk_load.insert_sql(table_name, len(self.inserts[0]))
+            info.declare_binds(cursor)
+            errors += self._run(cursor, sql, self.inserts, number, dialect)
+
+        if errors:
+            connection.rollback()
+            return [], sorted(errors)
+        if conflicted:
+            connection.rollback()
+            raise self._conflict(stored)
+
+        # Read back what was stored and rebuild the attribute rows of the rows that remain
+        new_keys = {key: tuple(values.get(column, value) for column, value in zip(schema.PRIMARY_KEYS[table_name], key))
+                    for key, values in self.updates.items()}
+        inserted_keys = [schema.key_of(table_name, self.info.data_column_names, values)
+                         for values in self.inserts]
+        rows = records.fetch_rows(cursor, table_name, list(new_keys.values()) + inserted_keys)
+        if rows:
+            attributes.insert_values(cursor, table_name, [desc[0] for desc in cursor.description], list(rows.values()))
+        connection.commit()
+        return ([(key, key, None) for key in self.deletes]
+                + [(key, new_key, rows.get(new_key)) for key, new_key in new_keys.items()]
+                + [(None, key, rows.get(key)) for key in inserted_keys]), []
+
+    def _conflict(self, stored):
+        """ConflictError for the first staged row whose version changed; stored was read under lock."""
+        for kind, key, values in self.changes():
+            version = self.version(key) if kind != "INSERT" else None
+            if version is not None and version != self.info.version_of(stored[key]):
+                return records.ConflictError(self.table_name, key, stored[key])
+        return records.ConflictError(self.table_name, None, None)
+
+    def _run(self, cursor, sql, rows, first_number, dialect):
+        """executemany one group; returns [(change number, message)] for the rows that failed."""
+        return [(first_number + offset, message)
+                for offset, message in bulk_load.execute_batch(cursor, sql, rows, dialect)]
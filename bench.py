@@ -0,0 +1,251 @@
+# Scaling benchmarks for the store on a SQLite stand-in
+# Generates a data set with datagen.py, bulk loads it, then times the operations the GUI
+# runs: search_tables, opening a table in Manage Entries (first and deep pages), modifying
+# and deleting a record, plus joins and lookups timed before and after schema.INDEXES exist. Every scenario reports latency percentiles and the peak Python
+# memory it allocated (tracemalloc, so SQLite's own page cache is not included).
+#
+#   python bench.py --scale 100000 --save-baseline bench_baseline.json
+#   python bench.py --scale 100000 --baseline bench_baseline.json --threshold 20
+#
+# With --baseline the run exits with status 1 when a scenario's p95 latency or peak memory
+# grew by more than --threshold percent. Compare runs on the same machine and scale.
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import backends
+import bulk_load
+import datagen
+import paging
+import schema
+import search
+from search_index import SearchIndex
+
+# Differences smaller than this are timer noise, whatever the percentage
+NOISE_FLOOR = {"p95_ms": 0.5, "peak_kb": 64}
+
+SEARCH_TERMS = ["dragon", "road", "blu-ray", "jazz", "martin", "toronto", "overdue", "neon star", "xyz"]
+
+
+def percentile(timings, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    index = min(len(timings) - 1, max(0, int(round(fraction * len(timings) + 0.5)) - 1))
+    return timings[index]
+
+
+def measure(function, iterations, trace_memory=True):
+    """Call function(i) `iterations` times; return latency stats in ms and peak memory in KB."""
+    if trace_memory:
+        tracemalloc.start()
+    timings = []
+    try:
+        for i in range(iterations):
+            start = time.perf_counter()
+            function(i)
+            timings.append((time.perf_counter() - start) * 1000)
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    timings.sort()
+    return {
+        "count": len(timings),
+        "p50_ms": percentile(timings, 0.50),
+        "p95_ms": percentile(timings, 0.95),
+        "p99_ms": percentile(timings, 0.99),
+        "max_ms": timings[-1],
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_access_paths(backend, sizes, iterations, seed, trace_memory, suffix=""):
+    """Time the joins and lookups that depend on secondary indexes (see schema.INDEXES)."""
+    rng = random.Random(seed)
+    results = {}
+
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+        customer_ids = [rng.randint(1, sizes["Customer"]) for _ in range(iterations)]
+        supplier_ids = [rng.randint(1, sizes["Supplier"]) for _ in range(iterations)]
+        cursor.execute("SELECT PhoneNumber FROM Customer WHERE CustomerID = :id", {"id": customer_ids[0]})
+        phone = cursor.fetchone()[0]
+        cursor.execute("SELECT Name FROM Product WHERE ProductID = :id", {"id": sizes["Product"] // 2})
+        product_name = cursor.fetchone()[0]
+
+        def customer_history(i):
+            cursor.execute(
+                "SELECT t.TransactionDate, t.AmountExchanged, p.Name FROM Transactions t "
+                "JOIN InventoryProduct ip ON ip.InventoryID = t.InventoryID "
+                "JOIN Product p ON p.ProductID = ip.ProductID "
+                "WHERE t.CustomerID = :id", {"id": customer_ids[i]})
+            cursor.fetchall()
+        results["join: customer history" + suffix] = measure(customer_history, iterations, trace_memory)
+
+        def supplier_products(i):
+            cursor.execute(
+                "SELECT p.Name FROM ProductSupplier ps JOIN Product p ON p.ProductID = ps.ProductID "
+                "WHERE ps.SupplierID = :id", {"id": supplier_ids[i]})
+            cursor.fetchall()
+        results["join: supplier products" + suffix] = measure(supplier_products, iterations, trace_memory)
+
+        def lookup_phone(i):
+            cursor.execute("SELECT * FROM Customer WHERE PhoneNumber = :phone", {"phone": phone})
+            cursor.fetchall()
+        results["lookup: phone" + suffix] = measure(lookup_phone, iterations, trace_memory)
+
+        def lookup_name(i):
+            cursor.execute("SELECT * FROM Product WHERE Name = :name", {"name": product_name})
+            cursor.fetchall()
+        results["lookup: product name" + suffix] = measure(lookup_name, iterations, trace_memory)
+
+        def open_rentals(i):
+            cursor.execute("SELECT * FROM Rentals WHERE CustomerID = :id AND ReturnDate IS NULL", {"id": customer_ids[i]})
+            cursor.fetchall()
+        results["lookup: open rentals" + suffix] = measure(open_rentals, iterations, trace_memory)
+
+        def delete_customer(i):
+            # The foreign key check looks for child rows in Rentals, Transactions and InventoryCustomer
+            customer_id = sizes["Customer"] + 1 + i
+            cursor.execute("INSERT INTO Customer (CustomerID, Name) VALUES (:id, 'Bench')", {"id": customer_id})
+            cursor.execute("DELETE FROM Customer WHERE CustomerID = :id", {"id": customer_id})
+            connection.commit()
+        results["delete parent row" + suffix] = measure(delete_customer, iterations, trace_memory)
+
+    return results
+
+
+def run_scenarios(backend, sizes, iterations, seed, trace_memory):
+    """Time every scenario against a loaded database and return {name: stats}."""
+    rng = random.Random(seed)
+    results = {}
+
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+
+        def search_all(i):
+            term = SEARCH_TERMS[i % len(SEARCH_TERMS)]
+            for table_name in search.SEARCH_TABLES:
+                search.search_table(cursor, table_name, term, dialect=backend.dialect)
+        results["search"] = measure(search_all, iterations, trace_memory)
+
+        index = SearchIndex()
+        results["search index build"] = measure(lambda i: index.rebuild(cursor), 1, trace_memory)
+
+        def search_index(i):
+            term = SEARCH_TERMS[i % len(SEARCH_TERMS)]
+            for table_name in search.SEARCH_TABLES:
+                if index.covers(table_name):
+                    index.search(table_name, term)
+                else:
+                    search.search_table(cursor, table_name, term, dialect=backend.dialect)
+        results["search (index)"] = measure(search_index, iterations, trace_memory)
+
+        def open_table(i):
+            table_name = schema.TABLES[i % len(schema.TABLES)]
+            paging.fetch_page(cursor, table_name, dialect=backend.dialect)
+        results["table open"] = measure(open_table, iterations, trace_memory)
+
+        def deep_page(i):
+            # Jump to a page near the end, sorted by a non-key column like the grid's Sort by control
+            after = (rng.choice(datagen.TITLE_WORDS), rng.randint(1, sizes["Product"]))
+            paging.fetch_page(cursor, "Product", after=after, dialect=backend.dialect, sort_column="Name")
+        results["table deep page"] = measure(deep_page, iterations, trace_memory)
+
+        def modify(i):
+            cursor.execute("UPDATE Product SET Price = :price WHERE ProductID = :id",
+                           {"price": round(rng.uniform(4.99, 39.99), 2), "id": rng.randint(1, sizes["Product"])})
+            connection.commit()
+        results["modify"] = measure(modify, iterations, trace_memory)
+
+        # Rentals has no child rows, so deleting never trips a foreign key
+        rental_ids = rng.sample(range(1, sizes["Rentals"] + 1), min(iterations, sizes["Rentals"]))
+
+        def delete(i):
+            cursor.execute("DELETE FROM Rentals WHERE RentalID = :id", {"id": rental_ids[i]})
+            connection.commit()
+        results["delete"] = measure(delete, len(rental_ids), trace_memory)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return a line for every scenario that got slower or bigger than the baseline allows."""
+    regressions = []
+    limit = 1 + threshold / 100
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ("p95_ms", "peak_kb"):
+            if stats[metric] > previous[metric] * limit and stats[metric] - previous[metric] > NOISE_FLOOR[metric]:
+                change = f"+{(stats[metric] / previous[metric] - 1) * 100:.0f}%" if previous[metric] else "new"
+                regressions.append(f"{name}: {metric} {previous[metric]:.2f} -> {stats[metric]:.2f} ({change})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark store operations on generated data in SQLite.")
+    parser.add_argument("--scale", type=int, default=100000, help="approximate total number of rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200, help="timed runs per scenario")
+    parser.add_argument("--sqlite", default=":memory:", help="SQLite file to load into (default: in memory)")
+    parser.add_argument("--baseline", help="JSON file from --save-baseline to check for regressions")
+    parser.add_argument("--save-baseline", help="write this run's results to a JSON file")
+    parser.add_argument("--threshold", type=float, default=20, help="allowed growth in percent before failing")
+    parser.add_argument("--no-memory", action="store_true", help="don't trace memory (slightly faster timings)")
+    args = parser.parse_args()
+    trace_memory = not args.no_memory
+
+    backend = backends.SQLiteBackend(args.sqlite)
+    with backend.connection() as connection:
+        if schema.create_missing_tables(connection) < len(schema.CREATE_SQL):
+            sys.exit(f"{args.sqlite} already has store tables, use a new file so the data set matches --scale")
+    sizes = datagen.table_sizes(args.scale)
+
+    print(f"Loading {sum(sizes.values())} generated rows (seed {args.seed})...")
+    load = {}
+
+    def bulk(i):
+        load["summary"], load["elapsed"] = bulk_load.load_tables(backend, datagen.generate(args.scale, args.seed))
+    results = {"bulk load": measure(bulk, 1, trace_memory)}
+    print(bulk_load.summary_line(load["summary"], load["elapsed"]))
+
+    # Joins and lookups before and after the secondary indexes exist
+    results.update(run_access_paths(backend, sizes, args.iterations, args.seed, trace_memory, " (no indexes)"))
+    with backend.connection() as connection:
+        results["create indexes"] = measure(lambda i: schema.create_indexes(connection, backend.dialect), 1, trace_memory)
+    results.update(run_access_paths(backend, sizes, args.iterations, args.seed, trace_memory))
+
+    results.update(run_scenarios(backend, sizes, args.iterations, args.seed, trace_memory))
+    backend.close()
+
+    print(f"\n{'scenario':<36} {'runs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak KB':>10}")
+    for name, stats in results.items():
+        print(f"{name:<36} {stats['count']:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f} {stats['peak_kb']:>10.0f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({"scale": args.scale, "seed": args.seed, "results": results}, baseline_file, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["scale"] != args.scale or baseline["seed"] != args.seed:
+            print(f"\nWarning: baseline was taken at scale {baseline['scale']}, seed {baseline['seed']}")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold:.0f}%:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0f}% against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
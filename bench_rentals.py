@@ -0,0 +1,170 @@
+# Throughput benchmark for concurrent rental checkouts and returns (rentals.py)
+# Every terminal is a thread with its own pooled connection that checks out --items copies of
+# products picked from a small set of --hot products (so terminals keep competing for the same
+# copies) and then returns them. Reports checkouts per second and latency percentiles, and fails
+# if a copy was ever handed to two terminals at once or stock and inventory don't end up where
+# they started.
+#
+#   python bench_rentals.py --terminals 8 --checkouts 200 --items 3
+#   python bench_rentals.py --config store.ini --terminals 16     # against the configured database
+#
+# Without --config a SQLite file with generated data (datagen.py) is created in a temporary
+# directory. With --config the database must already hold products with Available copies; every
+# copy rented is returned, but the Rentals and Transactions rows written are kept.
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import backends
+import bulk_load
+import datagen
+import rentals
+import schema
+import settings
+from bench import percentile
+
+
+def snapshot(backend):
+    """(rented copies, {ProductID: StockQuantity}) to compare before and after the run."""
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Inventory WHERE Status = 'Rented'")
+        rented = cursor.fetchone()[0]
+        cursor.execute("SELECT ProductID, StockQuantity FROM Product")
+        return rented, dict(cursor.fetchall())
+
+
+def hot_products(backend, count):
+    """ProductIDs with Available copies and at least as much stock, most copies first."""
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT i.ProductID, COUNT(*) FROM Inventory i JOIN Product p ON p.ProductID = i.ProductID "
+                       "WHERE i.Status = 'Available' GROUP BY i.ProductID, p.StockQuantity "
+                       "HAVING p.StockQuantity >= COUNT(*) ORDER BY COUNT(*) DESC, i.ProductID")
+        return [row[0] for row in cursor.fetchmany(count)]
+
+
+def run_terminals(backend, terminals, checkouts, items, products, customers, seed):
+    """Run the terminals to completion; returns (stats, errors)."""
+    keys = rentals.KeyAllocator()
+    held = {}  # InventoryID -> terminal currently renting it
+    held_lock = threading.Lock()
+    stats = {"checkout_ms": [], "return_ms": [], "refused": 0, "items": 0}
+    errors = []
+    stats_lock = threading.Lock()
+
+    def terminal(number):
+        rng = random.Random(seed + number)
+        for i in range(checkouts):
+            product_ids = [rng.choice(products) for _ in range(items)]
+            start = time.perf_counter()
+            try:
+                result = rentals.checkout(backend, keys, rng.choice(customers), product_ids)
+            except rentals.RentalError:
+                with stats_lock:
+                    stats["refused"] += 1  # Every copy of a product was out with other terminals
+                continue
+            except backends.DatabaseError as e:
+                errors.append(f"terminal {number} checkout: {e}")
+                continue
+            checkout_ms = (time.perf_counter() - start) * 1000
+            copies = [inventory_id for product_id, inventory_id in result["copies"]]
+            with held_lock:
+                for inventory_id in copies:
+                    if inventory_id in held:
+                        errors.append(f"copy {inventory_id} rented by terminals {held[inventory_id]} and {number}")
+                    held[inventory_id] = number
+            with held_lock:  # Released before the return, whose commit makes them Available again
+                for inventory_id in copies:
+                    del held[inventory_id]
+            start = time.perf_counter()
+            try:
+                rentals.return_copies(backend, copies)
+            except (rentals.RentalError,) + backends.DatabaseError as e:
+                errors.append(f"terminal {number} return: {e}")
+                continue
+            with stats_lock:
+                stats["checkout_ms"].append(checkout_ms)
+                stats["return_ms"].append((time.perf_counter() - start) * 1000)
+                stats["items"] += len(copies)
+
+    threads = [threading.Thread(target=terminal, args=(number,)) for number in range(terminals)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats["elapsed"] = time.perf_counter() - start
+    return stats, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent rental checkouts and returns.")
+    parser.add_argument("--config", help="run against the database in this settings file instead of generated SQLite data")
+    parser.add_argument("--scale", type=int, default=20000, help="approximate rows generated for the SQLite run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--terminals", type=int, default=8, help="concurrent terminals (threads)")
+    parser.add_argument("--checkouts", type=int, default=100, help="checkouts per terminal")
+    parser.add_argument("--items", type=int, default=3, help="copies per checkout")
+    parser.add_argument("--hot", type=int, default=50, help="products the terminals pick from")
+    args = parser.parse_args()
+
+    directory = None
+    if args.config:
+        db_settings = settings.load(args.config)
+        db_settings["pool_max"] = str(max(int(db_settings["pool_max"]), args.terminals))
+        backend = settings.open_backend(db_settings)
+        print(f"Running against {settings.describe(db_settings)}")
+    else:
+        directory = tempfile.mkdtemp(prefix="bench_rentals")
+        backend = backends.SQLiteBackend(os.path.join(directory, "store.db"), max_connections=args.terminals)
+        with backend.connection() as connection:
+            schema.create_missing_tables(connection)
+        summary, elapsed = bulk_load.load_tables(backend, datagen.generate(args.scale, args.seed))
+        print(bulk_load.summary_line(summary, elapsed))
+        with backend.connection() as connection:
+            schema.create_indexes(connection, backend.dialect)
+
+    try:
+        products = hot_products(backend, args.hot)
+        with backend.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT CustomerID FROM Customer")
+            customers = [row[0] for row in cursor.fetchall()]
+        if not products or not customers:
+            sys.exit("No products with Available copies, or no customers, to rent")
+        before = snapshot(backend)
+        stats, errors = run_terminals(backend, args.terminals, args.checkouts, args.items, products, customers, args.seed)
+        after = snapshot(backend)
+    finally:
+        backend.close()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    done = len(stats["checkout_ms"])
+    print(f"{args.terminals} terminals, {done} checkouts of {args.items} copies from {len(products)} products "
+          f"in {stats['elapsed']:.2f}s, {stats['refused']} refused (no copy left)")
+    print(f"{done / stats['elapsed']:.1f} checkouts/s, {stats['items'] / stats['elapsed']:.1f} copies/s "
+          f"(each checkout also returned)")
+    for name in ("checkout_ms", "return_ms"):
+        timings = sorted(stats[name])
+        if timings:
+            print(f"{name[:-3]:<9} p50 {percentile(timings, 0.5):.2f} ms  p95 {percentile(timings, 0.95):.2f} ms  "
+                  f"max {timings[-1]:.2f} ms")
+    if before != after:
+        errors.append("rented copies or stock quantities differ from before the run")
+    for error in errors[:20]:
+        print("  " + error)
+    if errors:
+        sys.exit(f"{len(errors)} consistency errors")
+    print("No copy was rented twice; inventory and stock are back where they started.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Benchmark for search_tables(): old full-table Python scan vs the server-side search in search.py
+# Runs against an in-memory SQLite database built from schema.py (tables.sql is the Oracle script)
+# and filled with generated rows, so no Oracle is needed.
+#
+#   python bench_search.py --rows 100000 --term dragon
+
+import argparse
+import random
+import sqlite3
+import time
+
+import attributes
+import schema
+import search
+
+WORDS = ["Inception", "Imagine", "Dragons", "Nolan", "Toronto", "Blu-ray", "Album", "Rock", "Sci-Fi", "Jazz",
+         "Paramount", "Studio", "Live", "Deluxe", "Edition", "Greatest", "Hits", "Night", "Road", "Ocean"]
+
+
+def random_text(rng, words=3):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def insert(connection, table_name, rows):
+    """Insert rows of the declared columns; the row version column takes its default."""
+    columns = [column for column, kind in schema.COLUMN_TYPES[table_name]]
+    connection.executemany(f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                           rows)
+
+
+def build_database(rows, seed=0):
+    """Create the schema in memory and fill every table with roughly `rows` rows."""
+    rng = random.Random(seed)
+    connection = sqlite3.connect(":memory:")
+    schema.create_missing_tables(connection)
+    schema.add_version_columns(connection, "sqlite")
+
+    ids = range(1, rows + 1)
+    insert(connection, "Supplier",
+           [(i, random_text(rng, 2), rng.choice(["Movies", "Music"]), i, random_text(rng, 2),
+             "Toronto", "ON", "Canada", "M5V1E3") for i in ids])
+    insert(connection, "Product",
+           [(i, random_text(rng), rng.randint(0, 50), "2023-01-01", 19.99, 4.99) for i in ids])
+    insert(connection, "Inventory", [(i, rng.choice(["Available", "Rented"]), i) for i in ids])
+    insert(connection, "ProductSupplier", [(i, i) for i in ids])
+    insert(connection, "Music",
+           [(i, rng.choice(WORDS), random_text(rng, 2), random_text(rng, 2)) for i in ids])
+    insert(connection, "Movie",
+           [(i, rng.choice(WORDS), random_text(rng, 2), random_text(rng, 1)) for i in ids])
+    insert(connection, "Customer",
+           [(i, random_text(rng, 2), f"416-555-{i % 10000:04d}", "Good", random_text(rng)) for i in ids])
+    insert(connection, "Rentals",
+           [(i, "2024-11-01", "2024-11-10", rng.choice(["Returned", "Rented"]), i) for i in ids])
+    insert(connection, "InventoryCustomer", [(i, i) for i in ids])
+    insert(connection, "Transactions",
+           [(i, "2024-11-01", rng.choice(["Purchase", "Rental"]), 9.99, i, i) for i in ids])
+    insert(connection, "InventoryProduct", [(i, i) for i in ids])
+    connection.commit()
+    attributes.migrate(connection)
+    schema.create_indexes(connection, "sqlite")
+    attributes.create_views(connection, "sqlite")
+    return connection
+
+
+def legacy_search(cursor, search_term):
+    """The original search_tables() loop: fetch every row and filter in Python."""
+    results = {}
+    for table_name in search.SEARCH_TABLES:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        rows = cursor.fetchall()
+        matching_rows = []
+        for row in rows:
+            for value in row:
+                if isinstance(value, str) and search_term.lower() in value.lower():
+                    matching_rows.append(row)
+                    break
+        if matching_rows:
+            results[table_name] = matching_rows
+    return results
+
+
+def pushdown_search(cursor, search_term, row_limit):
+    """The current search_tables() loop using search.search_table()."""
+    results = {}
+    for table_name in search.SEARCH_TABLES:
+        found = search.search_table(cursor, table_name, search_term, row_limit=row_limit, dialect="sqlite")
+        if found and found[1]:
+            results[table_name] = found[1]
+    return results
+
+
+def time_it(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and server-side search on generated data.")
+    parser.add_argument("--rows", type=int, default=100000, help="rows generated per table")
+    parser.add_argument("--term", default="dragon", help="search term")
+    parser.add_argument("--limit", type=int, default=search.DEFAULT_ROW_LIMIT, help="row cap per table")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    print(f"Building SQLite database with {args.rows} rows per table...")
+    connection = build_database(args.rows)
+    cursor = connection.cursor()
+
+    legacy_time, legacy = time_it(lambda: legacy_search(cursor, args.term), args.repeat)
+    pushdown_time, pushdown = time_it(lambda: pushdown_search(cursor, args.term, args.limit), args.repeat)
+
+    # Same tables must match, and capped results must be a prefix of the legacy ones
+    for table_name, rows in pushdown.items():
+        assert table_name in legacy, table_name
+        assert rows == legacy[table_name][:len(rows)], table_name
+    assert set(pushdown) == set(legacy)
+
+    print(f"legacy scan : {legacy_time * 1000:9.1f} ms  ({sum(len(r) for r in legacy.values())} rows matched)")
+    print(f"server-side : {pushdown_time * 1000:9.1f} ms  ({sum(len(r) for r in pushdown.values())} rows returned)")
+
+
+if __name__ == "__main__":
+    main()
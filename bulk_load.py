@@ -0,0 +1,143 @@
+# Bulk loading of table data with executemany
+# Rows are sent in batches with array binding (one round trip per batch instead of per row)
+# and committed once per batch. On Oracle, batcherrors=True lets the good rows of a batch
+# through and reports the bad ones; SQLite has no equivalent, so a failed batch is rolled
+# back to a savepoint and replayed row by row to find the offenders. Music and Movie rows
+# also get their attribute values (attributes.py) stored with the same commit. Given the
+# table's metadata (metadata.py), every batch declares its bind types before executemany.
+
+import itertools
+import time
+
+import attributes
+import backends
+import schema
+
+# Parents before children so foreign keys are always satisfied
+LOAD_ORDER = [
+    "Supplier",
+    "Product",
+    "Inventory",
+    "ProductSupplier",
+    "Music",
+    "Movie",
+    "Customer",
+    "Rentals",
+    "InventoryCustomer",
+    "Transactions",
+    "InventoryProduct",
+]
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def insert_sql(table_name, column_count, column_names=None):
+    """INSERT of column_count values into column_names (the declared columns by default).
+
+    Columns are always named, so a table's row version column (schema.VERSION_COLUMN) takes its default.
+    """
+    placeholders = ", ".join(":" + str(i + 1) for i in range(column_count))
+    column_names = column_names or [column for column, kind in schema.COLUMN_TYPES[table_name]][:column_count]
+    return f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES ({placeholders})"
+
+
+def execute_batch(cursor, sql, batch, dialect):
+    """executemany one batch of DML and return [(offset in batch, message)] for the rows that failed.
+
+    The rows that succeeded stay applied (uncommitted); callers decide whether to commit or roll back.
+    """
+    return execute_counted(cursor, sql, batch, dialect)[1]
+
+
+def execute_counted(cursor, sql, batch, dialect):
+    """execute_batch() that also returns how many rows the statements matched: (rows, errors)."""
+    if dialect == "oracle":
+        cursor.executemany(sql, batch, batcherrors=True)
+        return cursor.rowcount, [(error.offset, error.message) for error in cursor.getbatcherrors()]
+
+    cursor.execute("SAVEPOINT bulk_batch")
+    try:
+        cursor.executemany(sql, batch)
+        matched = cursor.rowcount  # RELEASE resets it
+        cursor.execute("RELEASE bulk_batch")
+        return matched, []
+    except backends.DatabaseError:
+        cursor.execute("ROLLBACK TO bulk_batch")
+    matched = 0
+    errors = []
+    for offset, row in enumerate(batch):
+        try:
+            cursor.execute(sql, row)
+            matched += cursor.rowcount
+        except backends.DatabaseError as e:
+            errors.append((offset, str(e)))
+    cursor.execute("RELEASE bulk_batch")
+    return matched, errors
+
+
+def load_table(connection, table_name, rows, batch_size=DEFAULT_BATCH_SIZE, dialect="oracle", on_batch=None,
+               column_names=None, info=None):
+    """Insert an iterable of row tuples into one table.
+
+    Returns (inserted, errors) where errors holds (row number, message) for every rejected row.
+    on_batch(rows_done) is called after every committed batch. Rows hold every column in table
+    order unless column_names says which columns they fill. info (metadata.TableInfo) declares
+    the bind types of every batch.
+    """
+    cursor = connection.cursor()
+    rows = iter(rows)
+    attribute_columns = None
+    if attributes.attributes_of(table_name):
+        attribute_columns = column_names or [column for column, kind in schema.COLUMN_TYPES[table_name]]
+    inserted = 0
+    errors = []
+    done = 0
+    sql = None
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        if sql is None:
+            sql = insert_sql(table_name, len(batch[0]), column_names)
+        if info is not None:
+            info.declare_binds(cursor, column_names)
+        batch_errors = execute_batch(cursor, sql, batch, dialect)
+        if attribute_columns:
+            failed = {offset for offset, message in batch_errors}
+            attributes.insert_values(cursor, table_name, attribute_columns,
+                                     [row for offset, row in enumerate(batch) if offset not in failed])
+        connection.commit()
+        errors.extend((done + offset + 1, message) for offset, message in batch_errors)
+        inserted += len(batch) - len(batch_errors)
+        done += len(batch)
+        if on_batch is not None:
+            on_batch(done)
+    return inserted, errors
+
+
+def load_tables(backend, data, batch_size=DEFAULT_BATCH_SIZE, on_progress=None, tables=None):
+    """Load {table name: rows} in foreign key order.
+
+    Returns {table name: (inserted, errors)} and the elapsed seconds.
+    on_progress(table_name, rows_done) is called after every batch. tables is
+    {table name: metadata.TableInfo}, as loaded at connect time.
+    """
+    start = time.perf_counter()
+    summary = {}
+    with backend.connection() as connection:
+        for table_name in LOAD_ORDER:
+            if table_name not in data:
+                continue
+            summary[table_name] = load_table(
+                connection, table_name, data[table_name], batch_size, backend.dialect,
+                on_batch=None if on_progress is None else lambda done, table_name=table_name: on_progress(table_name, done),
+                info=(tables or {}).get(table_name))
+    return summary, time.perf_counter() - start
+
+
+def summary_line(summary, elapsed):
+    """One line describing a load_tables() run."""
+    inserted = sum(result[0] for result in summary.values())
+    failed = sum(len(result[1]) for result in summary.values())
+    rate = inserted / elapsed if elapsed else 0
+    return f"Loaded {inserted} rows into {len(summary)} tables in {elapsed:.2f}s ({rate:,.0f} rows/s), {failed} rows rejected."
@@ -0,0 +1,231 @@
+# Change tracking for incremental refresh across terminals
+# Triggers on the store tables write one ChangeLog row per inserted, updated or deleted row
+# (its table, primary key and operation) in the same transaction as the change. Every open
+# terminal polls the log with a ChangeFeed for entries after the last one it saw, reads just
+# those rows back and moves them into its windows, result cache and search index, instead of
+# re-reading whole tables.
+#
+# ChangeIDs come from the CHANGE_SEQ sequence on Oracle and from MAX + 1 on SQLite, where
+# writers are serialized. Oracle sequence values are handed out before commit, so a change can
+# become visible after one with a higher ChangeID; the feed keeps re-reading the gaps below the
+# highest ChangeID seen until they appear or are older than GAP_SECONDS (rolled back or cached
+# sequence values that were never used).
+
+import time
+
+import backends
+import records
+import schema
+
+# Tables whose rows are tracked: every table with a single or two column INT key, except the
+# attribute tables (they follow Music and Movie) and the bookkeeping tables (key counters, this
+# log and the report summaries)
+TRACKED_TABLES = [table_name for table_name in schema.TABLES
+                  if table_name not in schema.ATTRIBUTE_TABLES.values()
+                  and table_name not in schema.BOOKKEEPING_TABLES]
+
+SEQUENCE = "CHANGE_SEQ"
+
+# ChangeLog.Operation values, as SQL literals
+INSERTED = "'I'"
+UPDATED = "'U'"
+DELETED = "'D'"
+
+# Seconds a missing ChangeID is waited for before it is treated as never used
+GAP_SECONDS = 30
+
+# More changes than this since the last poll are not applied one by one, the consumer reloads
+MAX_DELTA = 1000
+
+# Days of history kept by purge()
+KEEP_DAYS = 7
+
+
+def trigger_name(table_name, suffix=""):
+    return f"TRG_CHG_{table_name.upper()}{suffix}"[:30]
+
+
+def _key_values(table_name, prefix):
+    """SQL for Key1 and Key2 of the OLD or NEW row."""
+    key = schema.PRIMARY_KEYS[table_name]
+    return f"{prefix}.{key[0]}", f"{prefix}.{key[1]}" if len(key) > 1 else "NULL"
+
+
+def _key_changed(table_name):
+    return " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in schema.PRIMARY_KEYS[table_name])
+
+
+def _data_changed(table_name):
+    """Whether an update set any declared column; the row version bump alone isn't a change."""
+    return " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column, kind in schema.COLUMN_TYPES[table_name])
+
+
+def trigger_sql(table_name, dialect="oracle"):
+    """CREATE TRIGGER statements logging every row change of one table."""
+    if dialect == "sqlite":
+        old_key = _key_values(table_name, "OLD")
+        new_key = _key_values(table_name, "NEW")
+        changed = _key_changed(table_name)
+
+        def log(key, operation, condition=None):
+            where = f" WHERE {condition}" if condition else ""
+            return (f"INSERT INTO ChangeLog (ChangeID, TableName, Key1, Key2, Operation, ChangedAt) "
+                    f"SELECT (SELECT COALESCE(MAX(ChangeID), 0) + 1 FROM ChangeLog), '{table_name}', "
+                    f"{key[0]}, {key[1]}, {operation}, CURRENT_TIMESTAMP{where};")
+
+        return [
+            f"CREATE TRIGGER IF NOT EXISTS {trigger_name(table_name, '_I')} AFTER INSERT ON {table_name} "
+            f"BEGIN {log(new_key, INSERTED)} END",
+            # A changed key is logged as the old row deleted and the new one inserted
+            f"CREATE TRIGGER IF NOT EXISTS {trigger_name(table_name, '_U')} AFTER UPDATE ON {table_name} "
+            f"WHEN {_data_changed(table_name)} BEGIN {log(old_key, DELETED, changed)} "
+            f"{log(new_key, f'CASE WHEN {changed} THEN {INSERTED} ELSE {UPDATED} END')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {trigger_name(table_name, '_D')} AFTER DELETE ON {table_name} "
+            f"BEGIN {log(old_key, DELETED)} END",
+        ]
+
+    old_key = _key_values(table_name, ":OLD")
+    new_key = _key_values(table_name, ":NEW")
+    changed = " OR ".join(f":OLD.{column} <> :NEW.{column}" for column in schema.PRIMARY_KEYS[table_name])
+
+    def log(key, operation):
+        return (f"INSERT INTO ChangeLog (ChangeID, TableName, Key1, Key2, Operation, ChangedAt) "
+                f"VALUES ({SEQUENCE}.NEXTVAL, '{table_name}', {key[0]}, {key[1]}, {operation}, SYSDATE);")
+
+    return [
+        f"CREATE OR REPLACE TRIGGER {trigger_name(table_name)} "
+        f"AFTER INSERT OR UPDATE OR DELETE ON {table_name} FOR EACH ROW "
+        f"BEGIN "
+        f"IF DELETING THEN {log(old_key, DELETED)} "
+        f"ELSIF INSERTING THEN {log(new_key, INSERTED)} "
+        f"ELSIF {changed} THEN {log(old_key, DELETED)} {log(new_key, INSERTED)} "
+        f"ELSE {log(new_key, UPDATED)} "
+        f"END IF; "
+        f"END;"
+    ]
+
+
+def create_triggers(connection, dialect="oracle"):
+    """Create the change log sequence (Oracle) and triggers. Returns the tables now tracked."""
+    cursor = connection.cursor()
+    if dialect != "sqlite":
+        try:
+            cursor.execute(f"CREATE SEQUENCE {SEQUENCE}")
+        except backends.DatabaseError:
+            pass  # Already there
+    for table_name in TRACKED_TABLES:
+        for sql in trigger_sql(table_name, dialect):
+            cursor.execute(sql)
+    connection.commit()
+    return list(TRACKED_TABLES)
+
+
+def drop_triggers(connection, dialect="oracle"):
+    """Stop tracking changes; dropping the tables drops their triggers too."""
+    cursor = connection.cursor()
+    names = ([trigger_name(table_name, suffix) for table_name in TRACKED_TABLES for suffix in ("_I", "_U", "_D")]
+             if dialect == "sqlite" else [trigger_name(table_name) for table_name in TRACKED_TABLES])
+    for name in names:
+        try:
+            cursor.execute(f"DROP TRIGGER {name}")
+        except backends.DatabaseError:
+            pass  # Never created, or gone with its table
+    if dialect != "sqlite":
+        try:
+            cursor.execute(f"DROP SEQUENCE {SEQUENCE}")
+        except backends.DatabaseError:
+            pass
+    connection.commit()
+
+
+def purge(connection, keep_days=KEEP_DAYS, dialect="oracle"):
+    """Delete log entries older than keep_days; returns how many (committed).
+
+    The cutoff comes from the database clock the triggers stamp ChangedAt with (UTC on SQLite).
+    """
+    cursor = connection.cursor()
+    cutoff = ("SYSDATE - :keep_days" if dialect != "sqlite"
+              else "DATETIME('now', '-' || :keep_days || ' days')")
+    cursor.execute(f"DELETE FROM ChangeLog WHERE ChangedAt < {cutoff}", {"keep_days": keep_days})
+    purged = cursor.rowcount
+    connection.commit()
+    return purged
+
+
+class ChangeFeed:
+    """Position of one terminal in the change log, and the reading of what came after it."""
+
+    def __init__(self, max_delta=MAX_DELTA, gap_seconds=GAP_SECONDS):
+        self.max_delta = max_delta
+        self.gap_seconds = gap_seconds
+        self.since = None  # every ChangeID up to this one has been seen (or given up on)
+        self.seen = set()  # ChangeIDs above `since` already seen
+        self.gaps = {}  # missing ChangeID -> when it was first missed
+
+    def start(self, cursor):
+        """Begin at the end of the log, so only changes made from now on are polled."""
+        cursor.execute("SELECT MAX(ChangeID) FROM ChangeLog")
+        self.since = cursor.fetchone()[0] or 0
+        self.seen.clear()
+        self.gaps.clear()
+
+    def poll(self, cursor):
+        """Changes after the last poll: (reload, {table name: {key: operation}}).
+
+        The latest operation per key wins. reload is True, with no changes, when more than
+        max_delta changes arrived since the last poll; the caller then reloads everything.
+        """
+        cursor.execute("SELECT MAX(ChangeID), COUNT(*) FROM ChangeLog WHERE ChangeID > :since",
+                       {"since": self.since})
+        last, count = cursor.fetchone()
+        if not count:
+            return False, {}
+        if count - len(self.seen) > self.max_delta:
+            self._jump(last)
+            return True, {}
+        cursor.execute("SELECT ChangeID, TableName, Key1, Key2, Operation FROM ChangeLog "
+                       "WHERE ChangeID > :since ORDER BY ChangeID", {"since": self.since})
+        changed = {}
+        for change_id, table_name, key1, key2, operation in cursor.fetchall():
+            if change_id in self.seen:
+                continue
+            self.seen.add(change_id)
+            self.gaps.pop(change_id, None)
+            key = (key1,) if key2 is None else (key1, key2)
+            changed.setdefault(table_name, {})[key] = operation
+        self._advance()
+        return False, changed
+
+    def _jump(self, last):
+        self.since = last
+        self.seen.clear()
+        self.gaps.clear()
+
+    def _advance(self):
+        """Move `since` over the ChangeIDs seen, waiting at gaps younger than gap_seconds."""
+        now = time.monotonic()
+        highest = max(self.seen, default=self.since)
+        for change_id in range(self.since + 1, highest):
+            if change_id not in self.seen:
+                self.gaps.setdefault(change_id, now)
+        while self.since < highest:
+            following = self.since + 1
+            if following in self.seen:
+                self.seen.discard(following)
+            elif now - self.gaps.get(following, now) >= self.gap_seconds:
+                del self.gaps[following]  # Never committed
+            else:
+                break
+            self.since = following
+
+
+def read_changed_rows(cursor, changed):
+    """{table name: {key: row, or None when it is gone}} of the rows a poll reported."""
+    rows = {}
+    for table_name, keys in changed.items():
+        if table_name not in schema.PRIMARY_KEYS:
+            continue
+        present = [key for key, operation in keys.items() if operation != "D"]
+        stored = records.fetch_rows(cursor, table_name, present) if present else {}
+        rows[table_name] = {key: stored.get(key) for key in keys}
+    return rows
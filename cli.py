@@ -0,0 +1,400 @@
+# Headless command line for quick lookups and scripted (nightly) jobs
+#
+#     python cli.py create                    Create missing tables, indexes and change triggers
+#     python cli.py drop                      Drop every store table
+#     python cli.py populate [--scale N]      Insert the sample rows, or N generated rows (datagen.py)
+#     python cli.py search TERM               Search every table's text columns
+#     python cli.py find Music --where Artist=X  Items with a genre/artist/producer/director
+#     python cli.py facets Movie Genre        Items per genre (artist, ...)
+#     python cli.py query "SELECT ..."        Run one statement ("-" reads it from stdin)
+#     python cli.py export TABLE -o FILE      Stream a table (or --query) to CSV/JSON Lines (.gz)
+#     python cli.py import FILE...            Load export files, parents before children
+#     python cli.py checkout CUSTOMER PRODUCT...  Rent a copy of each product (one transaction)
+#     python cli.py return COPY...            Check rented copies (InventoryIDs) back in
+#     python cli.py reports [--rebuild]       Refresh the report summaries and print the dashboard
+#     python cli.py wishlist [--dismiss]      Customers whose wishlist item is back in stock
+#
+# Connection settings come from store.ini / STORE_DB_* environment variables (settings.py);
+# --sqlite PATH is a shortcut for a local SQLite file. Only the database modules are loaded,
+# never the GUI, tabulate or (for SQLite) cx_Oracle, so a search starts in a fraction of a
+# second. Results go to stdout and messages to stderr; the exit status is 0 on success and 1
+# when a database operation failed, so the commands can be chained in scripts.
+
+import argparse
+import csv
+import sys
+import time
+
+import attributes
+import backends
+import bulk_load
+import changes
+import rentals
+import reports
+import result_cache
+import result_stream
+import schema
+import search
+import settings
+import transfer
+import wishlist
+
+# Rows per fetch round trip for query and export
+ARRAYSIZE = 1000
+
+# Rejected rows listed per table by populate
+MAX_REPORTED_ERRORS = 10
+
+
+def message(text):
+    print(text, file=sys.stderr)
+
+
+def create(backend, args):
+    with backend.connection() as connection:
+        created = schema.create_missing_tables(connection)
+        indexes = schema.create_indexes(connection, backend.dialect)
+        message(f"Created {created} tables and {len(indexes)} indexes.")
+        for table_name in attributes.migrate(connection):
+            message(f"Attribute tables of {table_name} filled from its comma separated columns.")
+        for table_name in schema.add_version_columns(connection, backend.dialect):
+            message(f"Row versions added to {table_name}.")
+        attributes.create_views(connection, backend.dialect)
+        changes.create_triggers(connection, backend.dialect)
+        for warning in schema.missing_index_warnings(connection.cursor(), backend.dialect):
+            message(warning)
+    return 0
+
+
+def drop(backend, args):
+    failed = 0
+    with backend.connection() as connection:
+        attributes.drop_views(connection, backend.dialect)
+        changes.drop_triggers(connection, backend.dialect)
+        cursor = connection.cursor()
+        for table in schema.TABLES:  # Children before parents
+            try:
+                cursor.execute(backend.drop_table_sql(table))
+                message(f"Table {table} dropped.")
+            except backends.DatabaseError as e:
+                message(f"Error dropping table {table}: {e}")
+                failed += 1
+        connection.commit()
+    return 1 if failed else 0
+
+
+def populate(backend, args):
+    if args.scale:
+        import datagen
+        data = datagen.generate(args.scale, args.seed)
+    else:
+        import sample_data
+        data = sample_data.ROWS
+    summary, elapsed = bulk_load.load_tables(backend, data, batch_size=args.batch_size)
+    message(bulk_load.summary_line(summary, elapsed))
+    return report_rejected(summary)
+
+
+def report_rejected(summary):
+    """List the rows a load rejected; returns the exit status (1 if there were any)."""
+    rejected = 0
+    for table_name, (inserted, errors) in summary.items():
+        for row_number, error in errors[:MAX_REPORTED_ERRORS]:
+            message(f"{table_name} row {row_number}: {error}")
+        if len(errors) > MAX_REPORTED_ERRORS:
+            message(f"{table_name}: {len(errors) - MAX_REPORTED_ERRORS} more rows rejected")
+        rejected += len(errors)
+    return 1 if rejected else 0
+
+
+def run_search(backend, args):
+    tables = args.table or search.SEARCH_TABLES
+    found_any = False
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+        for table_name in tables:
+            found = search.search_table(cursor, table_name, args.term, row_limit=args.limit, dialect=backend.dialect)
+            if found is None or not found[1]:
+                continue
+            columns, rows, truncated = found
+            found_any = True
+            if args.format == "csv":
+                writer = csv.writer(sys.stdout)
+                writer.writerow(["Table"] + columns)
+                writer.writerows([table_name] + list(row) for row in rows)
+            else:
+                print(f"Table: {table_name}")
+                result_stream.render_rows(columns, rows, print)
+                if truncated:
+                    print(f"(showing first {len(rows)} matches)")
+    if not found_any:
+        message(f"No matching records found for '{args.term}'.")
+    return 0
+
+
+def attribute_filters(arguments):
+    """[(column, value)] from Column=Value arguments."""
+    filters = []
+    for argument in arguments or []:
+        column, separator, value = argument.partition("=")
+        if not separator:
+            raise ValueError(f"Expected Column=Value, got {argument}")
+        filters.append((column.strip(), value.strip()))
+    return filters
+
+
+def find(backend, args):
+    with backend.connection() as connection:
+        columns, rows = attributes.find(connection.cursor(), args.table, attribute_filters(args.where),
+                                        limit=args.limit, dialect=backend.dialect)
+    write_result(columns, rows, args.format)
+    return 0
+
+
+def facets(backend, args):
+    with backend.connection() as connection:
+        counts = attributes.facet_counts(connection.cursor(), args.table, args.column,
+                                         attribute_filters(args.where), dialect=backend.dialect)
+    write_result([args.column, "Items"], counts, args.format)
+    return 0
+
+
+def write_result(columns, rows, fmt):
+    if fmt == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    elif rows:
+        result_stream.render_rows(columns, rows, print)
+    message(f"({len(rows)} rows)")
+
+
+def query(backend, args):
+    sql = sys.stdin.read() if args.sql == "-" else args.sql
+    sql = sql.strip().rstrip(";")
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+        result_stream.tune_cursor(cursor, ARRAYSIZE)
+        cursor.execute(sql)
+        if cursor.description is None:
+            affected = max(cursor.rowcount, 0)
+            # Refill the attribute tables of Music/Movie rows the statement may have changed, same transaction
+            written = result_cache.tables_written(sql) or set()
+            for table_name in attributes.VIEWS:
+                if table_name.upper() in written:
+                    attributes.rebuild(connection, table_name)
+            connection.commit()
+            message(f"{affected} rows affected.")
+            return 0
+        if args.format != "table":
+            count = transfer.write_rows(cursor, sys.stdout, args.format, ARRAYSIZE)
+        else:
+            column_names = [desc[0] for desc in cursor.description]
+            col_widths = None
+            count = 0
+            while True:
+                rows = cursor.fetchmany(ARRAYSIZE)
+                first = col_widths is None
+                if first:
+                    col_widths = result_stream.column_widths(column_names, rows)
+                count += len(rows)
+                print(result_stream.format_chunk(column_names, col_widths, rows, first=first, last=len(rows) < ARRAYSIZE))
+                if len(rows) < ARRAYSIZE:
+                    break
+        message(f"({count} rows)")
+    return 0
+
+
+def export(backend, args):
+    if args.all:
+        counts = transfer.export_tables(backend, args.output, args.extension)
+        message(f"Exported {sum(counts.values())} rows from {len(counts)} tables to {args.output}.")
+        return 0
+    if args.query:
+        sql = args.query
+    elif args.table in schema.PRIMARY_KEYS:
+        sql = transfer.table_query(args.table)
+    else:
+        message(f"Unknown table: {args.table}")
+        return 1
+    with backend.connection() as connection:
+        cursor = connection.cursor()
+        if args.output == "-":
+            result_stream.tune_cursor(cursor, ARRAYSIZE)
+            cursor.execute(sql)
+            count = transfer.write_rows(cursor, sys.stdout, args.format or "csv", ARRAYSIZE)
+        else:
+            count = transfer.export_query(cursor, sql, args.output, arraysize=ARRAYSIZE)
+    message(f"Exported {count} rows to {'stdout' if args.output == '-' else args.output}.")
+    return 0
+
+
+def import_files(backend, args):
+    if args.table:
+        if len(args.files) != 1:
+            message("--table needs exactly one file")
+            return 1
+        start = time.perf_counter()
+        summary = {args.table: transfer.import_file(backend, args.files[0], args.table, args.batch_size)}
+        elapsed = time.perf_counter() - start
+    else:
+        summary, elapsed = transfer.import_files(backend, args.files, args.batch_size)
+    message(bulk_load.summary_line(summary, elapsed))
+    return report_rejected(summary)
+
+
+def checkout(backend, args):
+    result = rentals.checkout(backend, rentals.KeyAllocator(block_size=1), args.customer, args.products)
+    copies = ", ".join(f"{inventory_id} (product {product_id})" for product_id, inventory_id in result["copies"])
+    message(f"Rental {result['rental_id']}: copies {copies}, {result['amount']:.2f} due back {result['due']}.")
+    return 0
+
+
+def return_copies(backend, args):
+    result = rentals.return_copies(backend, args.copies)
+    message(f"Returned {result['copies']} copies, closed {result['rentals_closed']} rentals.")
+    return 0
+
+
+def run_reports(backend, args):
+    with backend.connection() as connection:
+        rebuilt = reports.refresh(connection, backend.dialect, rebuild=args.rebuild)
+        if rebuilt:
+            message(f"Rebuilt from scratch: {', '.join(rebuilt)}")
+        if args.refresh_only:
+            return 0
+        for title, columns, rows in reports.dashboard(connection.cursor(), dialect=backend.dialect, days=args.days):
+            print(title)
+            result_stream.render_rows(columns, rows, print)
+            print()
+    return 0
+
+
+def run_wishlist(backend, args):
+    with backend.connection() as connection:
+        rebuilt, notices = wishlist.refresh(connection, backend.dialect, rebuild=args.rebuild)
+        if rebuilt:
+            message("Wishlist matches rebuilt from scratch.")
+        message(f"{len(notices)} new notices.")
+        columns, rows = wishlist.pending(connection.cursor(), limit=args.limit, dialect=backend.dialect)
+        result_stream.render_rows(columns, rows, print)
+        if args.dismiss and rows:
+            wishlist.dismiss(connection, [(row[1], row[4]) for row in rows])
+            message(f"Dismissed {len(rows)} notices.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Movie and Music Store database from the command line.")
+    parser.add_argument("--config", help=f"settings file (default {settings.CONFIG_FILE})")
+    parser.add_argument("--sqlite", metavar="PATH", help="use this SQLite database file instead of the configured database")
+    parser.add_argument("--timing", action="store_true", help="print how long the command took")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("create", help="create missing tables and indexes").set_defaults(run=create)
+    commands.add_parser("drop", help="drop every store table").set_defaults(run=drop)
+
+    command = commands.add_parser("populate", help="insert sample or generated rows")
+    command.add_argument("--scale", type=int, help="generate about this many rows instead of the sample rows")
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--batch-size", type=int, default=5000)
+    command.set_defaults(run=populate)
+
+    command = commands.add_parser("search", help="search the text columns of every table")
+    command.add_argument("term")
+    command.add_argument("--table", action="append", choices=search.SEARCH_TABLES, help="only search this table (repeatable)")
+    command.add_argument("--limit", type=int, default=search.DEFAULT_ROW_LIMIT, help="matches shown per table")
+    command.add_argument("--format", choices=["table", "csv"], default="table")
+    command.set_defaults(run=run_search)
+
+    command = commands.add_parser("find", help="Music or Movie items with the given genres, artists, producers or directors")
+    command.add_argument("table", choices=list(attributes.VIEWS))
+    command.add_argument("--where", action="append", required=True, metavar="COLUMN=VALUE",
+                         help='e.g. --where "Artist=Imagine Dragons" (repeat to require several)')
+    command.add_argument("--limit", type=int, default=attributes.DEFAULT_LIMIT)
+    command.add_argument("--format", choices=["table", "csv"], default="table")
+    command.set_defaults(run=find)
+
+    command = commands.add_parser("facets", help="items per value of a Music or Movie attribute")
+    command.add_argument("table", choices=list(attributes.VIEWS))
+    command.add_argument("column", help="Genre, Artist, Producer or Director")
+    command.add_argument("--where", action="append", metavar="COLUMN=VALUE", help="only count items with this value")
+    command.add_argument("--format", choices=["table", "csv"], default="table")
+    command.set_defaults(run=facets)
+
+    command = commands.add_parser("query", help="run one SQL statement")
+    command.add_argument("sql", help='SQL text, or "-" to read it from stdin')
+    command.add_argument("--format", choices=["table", "csv", "jsonl"], default="table")
+    command.set_defaults(run=query)
+
+    command = commands.add_parser("export", help="stream a table or query result to CSV or JSON Lines")
+    command.add_argument("table", nargs="?", help="table to export (ordered by primary key)")
+    command.add_argument("--query", help="export the result of this SELECT instead of a table")
+    command.add_argument("--all", action="store_true", help="export every table into the --output directory")
+    command.add_argument("-o", "--output", default="-",
+                         help='file (.csv, .jsonl, optionally .gz), directory with --all, or "-" for stdout')
+    command.add_argument("--format", choices=["csv", "jsonl"], help="format written to stdout (default csv)")
+    command.add_argument("--extension", default=".csv.gz", help="file extension used with --all")
+    command.set_defaults(run=export)
+
+    command = commands.add_parser("import", help="load export files into their tables, parents first")
+    command.add_argument("files", nargs="+", help="files named after their tables, e.g. Product.csv.gz")
+    command.add_argument("--table", choices=bulk_load.LOAD_ORDER, help="load a single file into this table")
+    command.add_argument("--batch-size", type=int, default=5000)
+    command.set_defaults(run=import_files)
+
+    command = commands.add_parser("checkout", help="rent a copy of each product to a customer in one transaction")
+    command.add_argument("customer", type=int, help="CustomerID")
+    command.add_argument("products", type=int, nargs="+", help="ProductIDs, repeat one to rent several copies")
+    command.set_defaults(run=checkout)
+
+    command = commands.add_parser("return", help="check rented copies back in")
+    command.add_argument("copies", type=int, nargs="+", help="InventoryIDs of the copies")
+    command.set_defaults(run=return_copies)
+
+    command = commands.add_parser("reports", help="refresh the report summaries and print the dashboard")
+    command.add_argument("--rebuild", action="store_true", help="rebuild every summary from the full history")
+    command.add_argument("--refresh-only", action="store_true", help="only refresh, e.g. from a scheduled job")
+    command.add_argument("--days", type=int, default=reports.DASHBOARD_DAYS, help="days of daily revenue shown")
+    command.set_defaults(run=run_reports)
+
+    command = commands.add_parser("wishlist", help="match wishlists to products and list customers to notify of restocks")
+    command.add_argument("--rebuild", action="store_true", help="match every wishlist again from scratch")
+    command.add_argument("--dismiss", action="store_true", help="drop the notices listed once printed")
+    command.add_argument("--limit", type=int, default=100, help="notices listed at most")
+    command.set_defaults(run=run_wishlist)
+    return parser
+
+
+def main(argv=None):
+    start = time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "export" and not (args.table or args.query or args.all):
+        parser.error("export needs a table, --query or --all")
+    if args.command == "export" and args.all and args.output == "-":
+        parser.error("export --all needs an --output directory")
+
+    db_settings = settings.load(args.config)
+    if args.sqlite:
+        db_settings["backend"] = "sqlite"
+        db_settings["sqlite_path"] = args.sqlite
+    try:
+        backend = settings.open_backend(db_settings)
+    except backends.DatabaseError + (RuntimeError, ValueError) as e:
+        message(f"Error connecting to {settings.describe(db_settings)}: {e}")
+        return 1
+    try:
+        status = args.run(backend, args)
+    except backends.DatabaseError + (OSError, ValueError, rentals.RentalError) as e:
+        message(f"Error: {e}")
+        status = 1
+    finally:
+        backend.close()
+    if args.timing:
+        message(f"{args.command} took {time.perf_counter() - start:.3f}s")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# Seeded generator of store data for every table in tables.sql
+# Rows are produced lazily, table by table, so 10M-row data sets never sit in memory;
+# feed them straight into bulk_load.load_tables(). Every foreign key points at a row
+# generated for the parent table, and the same (scale, seed) always gives the same data.
+#
+#   python datagen.py --scale 100000 --sqlite store.db
+
+import argparse
+import datetime
+import random
+
+# Share of the total row count given to each table
+TABLE_WEIGHTS = {
+    "Supplier": 0.002,
+    "Product": 0.05,
+    "Inventory": 0.10,
+    "ProductSupplier": 0.05,
+    "Music": 0.025,
+    "Movie": 0.025,
+    "Customer": 0.05,
+    "Rentals": 0.25,
+    "InventoryCustomer": 0.10,
+    "Transactions": 0.25,
+    "InventoryProduct": 0.10,
+}
+
+TITLE_WORDS = ["Inception", "Imagine", "Dragons", "Interstellar", "Midnight", "Ocean", "Road", "Fire", "Glass",
+               "Silent", "Golden", "Electric", "Summer", "Winter", "Echo", "Shadow", "Velvet", "Neon", "Storm",
+               "Paper", "River", "Stone", "Wild", "Lost", "City", "Dream", "Heart", "Star", "Blue", "Red"]
+FORMATS = ["Blu-ray", "DVD", "4K", "Album", "Vinyl", "CD", "Deluxe Edition", "Soundtrack"]
+GENRES = ["Rock", "Pop", "Jazz", "Hip-Hop", "Classical", "Country", "Sci-Fi", "Drama", "Comedy", "Horror",
+          "Action", "Documentary", "Animation", "Thriller", "Romance"]
+FIRST_NAMES = ["John", "Jane", "Alex", "Maria", "Wei", "Priya", "Omar", "Sofia", "Liam", "Emma", "Noah", "Ava",
+               "Lucas", "Mia", "Ethan", "Chloe", "Arjun", "Fatima", "Mateo", "Hana"]
+LAST_NAMES = ["Doe", "Smith", "Nguyen", "Patel", "Garcia", "Kim", "Brown", "Martin", "Singh", "Lopez", "Chen",
+              "Wilson", "Taylor", "Khan", "Rossi", "Cohen", "Silva", "Murphy", "Tremblay", "Ali"]
+STUDIOS = ["Paramount Pictures", "Universal", "Warner Bros", "A24", "Lionsgate", "Studio Ghibli", "Pixar"]
+CITIES = [("Toronto", "ON"), ("Montreal", "QC"), ("Vancouver", "BC"), ("Calgary", "AB"), ("Ottawa", "ON"),
+          ("Halifax", "NS"), ("Winnipeg", "MB")]
+STREETS = ["King St W", "Queen St E", "Yonge St", "Bloor St", "Main St", "Granville St", "Rue Sainte-Catherine"]
+STANDINGS = ["Good", "Average", "Poor", "VIP"]
+
+START_DATE = datetime.date(2015, 1, 1)
+HISTORY_DAYS = 3650
+
+
+def table_sizes(scale):
+    """Row count of every table for a total of roughly `scale` rows."""
+    sizes = {table_name: max(1, int(scale * weight)) for table_name, weight in TABLE_WEIGHTS.items()}
+    # Music describes even product ids and Movie odd ones, junction tables can't hold more pairs than exist
+    sizes["Music"] = min(sizes["Music"], sizes["Product"] // 2)
+    sizes["Movie"] = min(sizes["Movie"], (sizes["Product"] + 1) // 2)
+    sizes["ProductSupplier"] = min(sizes["ProductSupplier"], sizes["Product"] * sizes["Supplier"])
+    sizes["InventoryCustomer"] = min(sizes["InventoryCustomer"], sizes["Customer"] * sizes["Inventory"])
+    sizes["InventoryProduct"] = min(sizes["InventoryProduct"], sizes["Inventory"])
+    return sizes
+
+
+def _random_date(rng):
+    return START_DATE + datetime.timedelta(days=rng.randrange(HISTORY_DAYS))
+
+
+def product_name(product_id, seed=0):
+    """Name of a generated product (also used for wishlist entries)."""
+    rng = random.Random(f"{seed}-product-name-{product_id}")
+    words = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+    return f"{words} {rng.choice(FORMATS)}"
+
+
+def generate(scale, seed=0):
+    """Return {table name: row iterator} for a data set of roughly `scale` rows."""
+    sizes = table_sizes(scale)
+    n_suppliers = sizes["Supplier"]
+    n_products = sizes["Product"]
+    n_inventory = sizes["Inventory"]
+    n_customers = sizes["Customer"]
+
+    def rng_for(table_name):
+        return random.Random(f"{seed}-{table_name}")
+
+    def suppliers():
+        rng = rng_for("Supplier")
+        for supplier_id in range(1, n_suppliers + 1):
+            city, province = rng.choice(CITIES)
+            yield (supplier_id, f"{rng.choice(LAST_NAMES)} {rng.choice(['Media', 'Distribution', 'Records', 'Films'])} {supplier_id}",
+                   rng.choice(["Movies", "Music"]), rng.randint(1, 9999), rng.choice(STREETS), city, province,
+                   "Canada", f"{rng.choice('KLMNTV')}{rng.randint(1, 9)}{rng.choice('ABCEGH')}{rng.randint(1, 9)}{rng.choice('JKLMNP')}{rng.randint(1, 9)}")
+
+    def products():
+        rng = rng_for("Product")
+        for product_id in range(1, n_products + 1):
+            price = round(rng.uniform(4.99, 39.99), 2)
+            yield (product_id, product_name(product_id, seed), rng.choice([0] * 2 + list(range(1, 30))),
+                   _random_date(rng), price, round(price / 4, 2))
+
+    def inventory():
+        rng = rng_for("Inventory")
+        for inventory_id in range(1, n_inventory + 1):
+            yield (inventory_id, rng.choice(["Available", "Available", "Rented", "Damaged"]),
+                   (inventory_id - 1) % n_products + 1)
+
+    def product_supplier():
+        # Every product gets its main supplier, extra pairs move on to the next supplier
+        for k in range(sizes["ProductSupplier"]):
+            yield (k % n_products + 1, (k % n_products + k // n_products) % n_suppliers + 1)
+
+    def music():
+        rng = rng_for("Music")
+        for k in range(sizes["Music"]):
+            yield (2 * k + 2, ", ".join(rng.sample(GENRES, rng.randint(1, 2))),
+                   ", ".join(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rng.randint(1, 2))),
+                   f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+
+    def movie():
+        rng = rng_for("Movie")
+        for k in range(sizes["Movie"]):
+            yield (2 * k + 1, ", ".join(rng.sample(GENRES, rng.randint(1, 3))),
+                   ", ".join(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rng.randint(1, 2))),
+                   rng.choice(STUDIOS))
+
+    def customers():
+        rng = rng_for("Customer")
+        for customer_id in range(1, n_customers + 1):
+            yield (customer_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                   f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+                   rng.choice(STANDINGS),
+                   product_name(rng.randint(1, n_products), seed) if rng.random() < 0.6 else None)
+
+    def rentals():
+        rng = rng_for("Rentals")
+        for rental_id in range(1, sizes["Rentals"] + 1):
+            rental_date = _random_date(rng)
+            status = rng.choice(["Returned", "Returned", "Returned", "Rented", "Overdue"])
+            return_date = rental_date + datetime.timedelta(days=rng.randint(1, 21)) if status == "Returned" else None
+            yield (rental_id, rental_date, return_date, status, rng.randint(1, n_customers))
+
+    def inventory_customers():
+        for k in range(sizes["InventoryCustomer"]):
+            yield (k % n_customers + 1, (k % n_customers + k // n_customers) % n_inventory + 1)
+
+    def transactions():
+        rng = rng_for("Transactions")
+        for transaction_id in range(1, sizes["Transactions"] + 1):
+            kind = rng.choice(["Purchase", "Rental", "Rental", "Return", "Refund"])
+            yield (transaction_id, _random_date(rng), kind, round(rng.uniform(1.0, 40.0), 2),
+                   rng.randint(1, n_customers), rng.randint(1, n_inventory))
+
+    def inventory_products():
+        for inventory_id in range(1, sizes["InventoryProduct"] + 1):
+            yield (inventory_id, (inventory_id - 1) % n_products + 1)
+
+    return {
+        "Supplier": suppliers(),
+        "Product": products(),
+        "Inventory": inventory(),
+        "ProductSupplier": product_supplier(),
+        "Music": music(),
+        "Movie": movie(),
+        "Customer": customers(),
+        "Rentals": rentals(),
+        "InventoryCustomer": inventory_customers(),
+        "Transactions": transactions(),
+        "InventoryProduct": inventory_products(),
+    }
+
+
+def main():
+    import backends
+    import bulk_load
+    import schema
+
+    parser = argparse.ArgumentParser(description="Generate store data into a SQLite database.")
+    parser.add_argument("--scale", type=int, default=10000, help="approximate total number of rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", default="store.db", help="SQLite database file (tables are created if missing)")
+    args = parser.parse_args()
+
+    backend = backends.SQLiteBackend(args.sqlite)
+    with backend.connection() as connection:
+        schema.create_missing_tables(connection)
+    summary, elapsed = bulk_load.load_tables(backend, generate(args.scale, args.seed))
+    print(bulk_load.summary_line(summary, elapsed))
+    with backend.connection() as connection:
+        created = schema.create_indexes(connection, backend.dialect)  # After the load, building them once is cheaper
+    if created:
+        print(f"Created {len(created)} indexes.")
+
+
+if __name__ == "__main__":
+    main()
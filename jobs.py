@@ -0,0 +1,196 @@
+# Background execution of database work for the GUI
+# Button handlers submit jobs here instead of calling the cursor on the Tk event loop.
+# Worker threads run the jobs; anything that has to touch widgets (results, progress,
+# terminal output) is queued and run on the Tk thread by a root.after() poll loop.
+
+import queue
+import threading
+import time
+
+# Seconds a job may run before it is cancelled
+DEFAULT_TIMEOUT = 120
+
+# How often the Tk thread picks up finished jobs and queued UI calls (milliseconds)
+POLL_MS = 50
+
+
+class Job:
+    """One unit of database work and its callbacks."""
+
+    def __init__(self, name, work, args, on_done, on_error, timeout):
+        self.name = name
+        self.work = work
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.timeout = timeout
+        self.cancelled = threading.Event()
+        self.timed_out = False
+        self.started_at = None
+        self.progress = None  # last message passed to JobRunner.report()
+
+    def elapsed(self):
+        return 0 if self.started_at is None else time.monotonic() - self.started_at
+
+
+class JobRunner:
+    """Runs jobs on worker threads and hands their results back to the Tk thread."""
+
+    def __init__(self, root, workers=1, cancel_hook=None, on_activity=None, on_failure=None, poll_ms=POLL_MS):
+        self.root = root
+        self.cancel_hook = cancel_hook  # cancel_hook(job) interrupts that job's database calls, e.g. connection.cancel()
+        self.on_activity = on_activity  # called on the Tk thread with a short "what is running" text
+        self.on_failure = on_failure  # called with the exception of jobs submitted without on_error
+        self.poll_ms = poll_ms
+        self.pending = queue.Queue()
+        self.ui_calls = queue.Queue()
+        self.running = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.last_activity = None
+        self.next_wrapper = None  # see wrap_next()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"db-worker-{i}", daemon=True).start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, name, work, *args, on_done=None, on_error=None, timeout=DEFAULT_TIMEOUT, background=False):
+        """Queue work(*args) for a worker thread.
+
+        on_done(result) and on_error(exception) are called on the Tk thread. background=True marks
+        work nobody asked for (polls, health checks, typeahead lookups); wrap_next() skips it.
+        """
+        wrapper = None
+        if not background:
+            with self.lock:
+                wrapper, self.next_wrapper = self.next_wrapper, None
+        if wrapper is not None:
+            work = wrapper(name, work)
+        job = Job(name, work, args, on_done, on_error, timeout)
+        self.pending.put(job)
+        return job
+
+    def call_on_ui(self, function, *args):
+        """Run function(*args) on the Tk thread; safe to call from any thread."""
+        self.ui_calls.put(lambda: function(*args))
+
+    def on_ui_thread(self):
+        return threading.current_thread() is threading.main_thread()
+
+    def report(self, message):
+        """Record progress for the job running on the calling thread."""
+        job = getattr(self.local, "job", None)
+        if job is not None:
+            job.progress = message
+
+    def wrap_next(self, wrapper):
+        """Run the work of the next job a user action submits as wrapper(name, work)(*args), e.g. to profile it.
+
+        Background jobs submitted meanwhile run unwrapped.
+        """
+        with self.lock:
+            self.next_wrapper = wrapper
+
+    def current_job(self):
+        """The job running on the calling thread, None outside jobs."""
+        return getattr(self.local, "job", None)
+
+    def current_job_name(self):
+        """Name of the job running on the calling thread, None outside jobs."""
+        job = self.current_job()
+        return job.name if job is not None else None
+
+    def is_cancelled(self):
+        """True when the job running on the calling thread was cancelled (for long loops to check)."""
+        job = getattr(self.local, "job", None)
+        return job is not None and job.cancelled.is_set()
+
+    def cancel(self):
+        """Cancel every queued and running job."""
+        while True:
+            try:
+                job = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            job.cancelled.set()
+            self.ui_calls.put(lambda job=job: self._finish(job, None, RuntimeError("not started")))
+        with self.lock:
+            running = list(self.running)
+        for job in running:
+            self._cancel_running(job)
+
+    def _cancel_running(self, job):
+        job.cancelled.set()
+        if self.cancel_hook is not None:
+            try:
+                self.cancel_hook(job)
+            except Exception:
+                pass  # Nothing to interrupt (no connection yet or the call already returned)
+
+    def _worker(self):
+        while True:
+            job = self.pending.get()
+            if job.cancelled.is_set():
+                continue
+            job.started_at = time.monotonic()
+            with self.lock:
+                self.running.append(job)
+            self.local.job = job
+            result, error = None, None
+            try:
+                result = job.work(*job.args)
+            except Exception as e:
+                error = e
+            finally:
+                self.local.job = None
+                with self.lock:
+                    self.running.remove(job)
+            self.ui_calls.put(lambda job=job, result=result, error=error: self._finish(job, result, error))
+
+    def _finish(self, job, result, error):
+        if error is None and job.cancelled.is_set():
+            error = RuntimeError("cancelled")
+        if error is not None:
+            if job.timed_out:
+                error = TimeoutError(f"{job.name} timed out after {job.timeout}s ({error})")
+            elif job.cancelled.is_set():
+                error = RuntimeError(f"{job.name} cancelled ({error})")
+            on_error = job.on_error or self.on_failure
+            if on_error is not None:
+                on_error(error)
+            return
+        if job.on_done is not None:
+            job.on_done(result)
+
+    def _poll(self):
+        self.root.after(self.poll_ms, self._poll)
+
+        # Run everything the workers queued for the Tk thread
+        while True:
+            try:
+                call = self.ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            call()
+
+        # Enforce per-job deadlines
+        with self.lock:
+            running = list(self.running)
+        for job in running:
+            if job.timeout and not job.cancelled.is_set() and job.elapsed() > job.timeout:
+                job.timed_out = True
+                self._cancel_running(job)
+
+        # Tell the user what is running
+        if self.on_activity is not None:
+            if running:
+                job = running[0]
+                activity = f"Running {job.name} ({job.elapsed():.1f}s)"
+                if job.progress:
+                    activity += f": {job.progress}"
+                if self.pending.qsize():
+                    activity += f" [+{self.pending.qsize()} queued]"
+            else:
+                activity = "Idle"
+            if activity != self.last_activity:
+                self.last_activity = activity
+                self.on_activity(activity)
@@ -1,370 +1,526 @@
 import tkinter as tk
+from tkinter import filedialog
 import customtkinter as ctk
-import cx_Oracle
 from tabulate import tabulate
-import datetime
+import logging
+
+import attributes
+import backends
+import batch_edit
+import bulk_load
+import changes
+import metadata
+import query_trace
+import records
+import rentals
+import reports
+import result_cache
+import result_stream
+import sample_data
+import schema
+import search
+import settings
+import terminal_log
+import transfer
+import typeahead
+import wishlist
+from jobs import JobRunner
+from record_picker import RecordPicker
+from search_index import SearchIndex
+from table_grid import TableGrid
+from terminal_log import TerminalLog
+
+# Answer searches from an in-memory trigram index built at connect time (set to False to always query the DB)
+USE_SEARCH_INDEX = True
+search_index = SearchIndex() if USE_SEARCH_INDEX else None
+
+# Read-through cache of query results (pages, searches, custom SELECTs), invalidated per table
+# by every write made through the app; the TTL covers writes made by other sessions
+USE_RESULT_CACHE = True
+RESULT_CACHE_MB = 64
+RESULT_CACHE_TTL = 30
+query_cache = result_cache.ResultCache(RESULT_CACHE_MB, RESULT_CACHE_TTL) if USE_RESULT_CACHE else None
+
+# Tables searched at the same time (one pooled connection each) and the seconds a search may
+# take before the tables still running are interrupted
+SEARCH_WORKERS = 4
+SEARCH_DEADLINE = 10
+
+# Seconds a background job may run before it is cancelled
+POPULATE_TIMEOUT = 600
+TRANSFER_TIMEOUT = 3600  # export and import of whole tables
+CUSTOM_SQL_TIMEOUT = 300
+
+# Custom SELECT results are streamed: rows per fetch round trip, and the rows/characters shown
+# before 'Fetch More Rows' has to be pressed
+CUSTOM_SQL_ARRAYSIZE = 500
+CUSTOM_SQL_ROW_LIMIT = 1000
+CUSTOM_SQL_BYTE_LIMIT = 1000000
+
+# Rows sent per executemany call when populating, and how many rejected rows are listed
+POPULATE_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 10
+
+# Terminal output: lines kept in the window, how often queued messages are written (milliseconds),
+# the lowest level shown, and an optional rotating log file that keeps every message
+LOG_MAX_LINES = 5000
+LOG_FLUSH_MS = 50
+LOG_LEVEL = logging.INFO
+LOG_FILE = None  # e.g. "store.log"
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+log = logging.getLogger("store")
+
+# Time every statement for the Query Timings window (entries kept, refresh interval in milliseconds)
+TRACE_QUERIES = True
+TRACE_MAX_ENTRIES = 5000
+TIMINGS_REFRESH_MS = 1000
+
+# Database settings come from store.ini and STORE_DB_* environment variables (see settings.py)
+db_settings = settings.load()
+
+# Worker threads running database jobs, each borrows its own pooled connection
+DB_WORKERS = 2
+
+# How often the pooled connections are checked while the app is open (milliseconds)
+HEALTH_CHECK_INTERVAL_MS = 60000
+
+# How often the change log is polled for rows other terminals changed (milliseconds)
+CHANGE_POLL_MS = 5000
+
+backend = None
+tracer = None
+rental_keys = rentals.KeyAllocator()  # new Rentals/Transactions keys, shared by every rental desk
+custom_sql_stream = None  # result of the last custom SELECT, kept open for 'Fetch More Rows'
+record_lookups = {}  # table name -> typeahead.Typeahead of the record pickers, cleared with the result cache
+table_metadata = {}  # table name -> metadata.TableInfo, read once at connect and after Create/Drop Tables
+change_feed = changes.ChangeFeed()  # this terminal's position in the change log
+change_listeners = []  # (window, callback) of open windows showing rows, see poll_changes()
 
 # Connects the program to the local Oracle DB
 def connect_to_db():
-    global connection, cursor
-    try:
-        update_terminal_output("----- EXECUTING connect_to_db -----")
-        
-        # point this to your installation directory of Oracle Instant Client
-        cx_Oracle.init_oracle_client(lib_dir=r"C:\Oracle\instantclient_23_6") # Initialize the Oracle client
-
-        # if not working, try these:
-        # run lsnrctl start in cmd
-        # check services.msc for OracleServiceXElistener
-
-        # Define connection details
-        user = "SYS"  # Connecting as SYS user
-        password = "your_password"  # Password for SYS user
-        dsn = cx_Oracle.makedsn("localhost", 1521, service_name="XE")  # Default service name for Oracle XE
-        encoding = "UTF-8"
-        mode = cx_Oracle.SYSDBA
-
-        # Connect to the Oracle database as SYSDBA
-        connection = cx_Oracle.connect(user=user, password=password, dsn=dsn, encoding=encoding, mode=mode)
-        cursor = connection.cursor()
+    """Connect on a worker thread and update the UI when done."""
+    update_terminal_output("----- EXECUTING connect_to_db -----")
+    connect_button.configure(state=tk.DISABLED, text="Connecting...")
+    job_runner.submit("connect_to_db", open_connection, on_done=connection_opened, on_error=connection_failed)
 
-        # Verify the connection
-        update_terminal_output("Connection established successfully!")
-        update_terminal_output("Oracle version: " + connection.version)
 
-        # Run a test query to confirm functionality
-        cursor.execute("SELECT 'Hello, Oracle XE!' FROM DUAL")
-        result = cursor.fetchone()
-        update_terminal_output("Test query result: " + result[0])
+def open_connection():
+    """Create the connection pool and run a test query (runs on a worker thread)."""
+    global backend
 
-        # Update UI
-        status_label.configure(text="Connected to Oracle XE!")
-        connect_button.configure(state=tk.DISABLED, text="[Already Connected]")  # Disable button after connection
+    backend = settings.open_backend(db_settings)
+    backend.tracer = tracer
+    backend.owner_of = job_runner.current_job  # Connections are tagged with the job borrowing them
+    invalidate_cache()  # Results of a previous connection
 
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error connecting to database: {e}")
-        status_label.configure(text=f"Error connecting to DB: {e}")
+    # Verify the connection
+    update_terminal_output("Connection established successfully!")
+    update_terminal_output(f"{backend.dialect} version: {backend.version}")
 
+    # Run a test query to confirm functionality
+    result = backend.health_check()
+    update_terminal_output("Test query result: " + result)
+    update_terminal_output(f"Connection pool: {backend.pool_status()}")
+    with borrow_connection() as connection:
+        report_missing_indexes(connection.cursor())
+    load_metadata()
+    start_change_feed(purge=True)
 
-def create_tables():
-    update_terminal_output("\n----- EXECUTING create_tables -----")
-    # List of table creation SQL statements
-    create_sql = [
-        """
-        CREATE TABLE Supplier (
-            SupplierID INT PRIMARY KEY,
-            Name VARCHAR(255) NOT NULL,
-            ProductType VARCHAR(255),
-            StreetNumber INT,
-            StreetName VARCHAR(255),
-            CityName VARCHAR(255),
-            Province VARCHAR(255),
-            Country VARCHAR(255),
-            PostalCode VARCHAR(6)
-        )
-        """,
-        """
-        CREATE TABLE Product (
-            ProductID INT PRIMARY KEY,
-            Name VARCHAR(255) NOT NULL,
-            StockQuantity INT DEFAULT 0 CHECK (StockQuantity >= 0),
-            ReleaseDate DATE,
-            Price DECIMAL(10, 2) CHECK (Price >= 0),
-            RentalPrice DECIMAL(10, 2) CHECK (RentalPrice >= 0)
-        )
-        """,
-        """
-        CREATE TABLE Inventory (
-            InventoryID INT PRIMARY KEY,
-            Status VARCHAR(255),
-            ProductID INT,
-            FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
-        )
-        """,
-        """
-        CREATE TABLE ProductSupplier (
-            ProductID INT,
-            SupplierID INT,
-            PRIMARY KEY (ProductID, SupplierID),
-            FOREIGN KEY (ProductID) REFERENCES Product(ProductID),
-            FOREIGN KEY (SupplierID) REFERENCES Supplier(SupplierID)
-        )
-        """,
-        """
-        CREATE TABLE Music (
-            ProductID INT PRIMARY KEY,
-            Genre VARCHAR(255), -- comma separated multi-value attribute
-            Artist VARCHAR(255), -- comma separated multi-value attribute
-            Producer VARCHAR(255), -- comma separated multi-value attribute
-            FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
-        )
-        """,
-        """
-        CREATE TABLE Movie (
-            ProductID INT PRIMARY KEY,
-            Genre VARCHAR(255), -- comma separated multi-value attribute
-            Director VARCHAR(255), -- comma separated multi-value attribute
-            Studio VARCHAR(255),
-            FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
-        )
-        """,
-        """
-        CREATE TABLE Customer (
-            CustomerID INT PRIMARY KEY,
-            Name VARCHAR(255) NOT NULL,
-            PhoneNumber VARCHAR(20),
-            StoreStanding VARCHAR(255),
-            WishlistItem VARCHAR(255)
-        )
-        """,
-        """
-        CREATE TABLE Rentals (
-            RentalID INT PRIMARY KEY,
-            RentalDate DATE NOT NULL,
-            ReturnDate DATE,
-            Status VARCHAR(255),
-            CustomerID INT,
-            FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID)
-        )
-        """,
-        """
-        CREATE TABLE InventoryCustomer (
-            CustomerID INT,
-            InventoryID INT,
-            PRIMARY KEY (CustomerID, InventoryID),
-            FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID),
-            FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID)
-        )
-        """,
-        """
-        CREATE TABLE Transactions (
-            TransactionID INT PRIMARY KEY,
-            TransactionDate DATE NOT NULL,
-            TransactionType VARCHAR(255),
-            AmountExchanged DECIMAL(10, 2),
-            CustomerID INT,
-            InventoryID INT,
-            FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID),
-            FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID)
-        )
-        """,
-        """
-        CREATE TABLE InventoryProduct (
-            InventoryID INT,
-            ProductID INT,
-            PRIMARY KEY (InventoryID, ProductID),
-            FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID),
-            FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
-        )
-        """
-    ]
+    # Build the search index once so searches can be answered from memory
+    build_search_index()
 
-    try:
-        # Loop through the create SQL statements
-        for sql in create_sql:
-            try:
-                cursor.execute(sql)
-                update_terminal_output(f"Table created successfully.")
-            except cx_Oracle.DatabaseError as e:
-                message = str(e)[0:9]
-                update_terminal_output(f"Table already exists. (error code: {message})")
 
-        connection.commit()
-        update_status("create_tables completed successfully")
+def connection_opened(result):
+    """Update the UI once connected."""
+    status_label.configure(text=f"Connected to {settings.describe(db_settings)}!")
+    connect_button.configure(state=tk.DISABLED, text="[Already Connected]")  # Disable button after connection
+    root.after(HEALTH_CHECK_INTERVAL_MS, check_connection_health)
+    root.after(CHANGE_POLL_MS, poll_changes)
 
-    except cx_Oracle.DatabaseError as e:
-        update_status(f"create_tables failed: {e}")
-        update_terminal_output(f"Error creating tables: {e}")
 
+def connection_failed(e):
+    update_terminal_output(f"Error connecting to database: {e}", logging.ERROR)
+    status_label.configure(text=f"Error connecting to DB: {e}")
+    connect_button.configure(state=tk.NORMAL, text="Connect to DB")
 
-def drop_tables():
-    update_terminal_output("\n----- EXECUTING drop_tables -----")
-    # List of table names to drop
-    tables_to_drop = [
-        "InventoryProduct",
-        "Transactions",
-        "InventoryCustomer",
-        "Rentals",
-        "Customer",
-        "Movie",
-        "Music",
-        "ProductSupplier",
-        "Inventory",
-        "Product",
-        "Supplier"
-    ]
 
-    try:
-        for table in tables_to_drop:
-            try:
-                cursor.execute(f"DROP TABLE {table} CASCADE CONSTRAINTS")
-                update_terminal_output(f"Table {table} dropped successfully.")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error dropping table {table}: {e}")
+def check_connection_health():
+    """Periodically make sure the pool still hands out working connections."""
+    def healthy(result):
+        root.after(HEALTH_CHECK_INTERVAL_MS, check_connection_health)
 
-        connection.commit()
-        update_status("drop_tables completed successfully")
+    def unhealthy(e):
+        update_terminal_output(f"Database health check failed: {e}", logging.ERROR)
+        update_status("Database connection lost, retrying...")
+        root.after(HEALTH_CHECK_INTERVAL_MS, check_connection_health)
 
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error dropping tables: {e}")
-        update_status(f"drop_tables failed: {e}")
+    job_runner.submit("health check", backend.health_check, on_done=healthy, on_error=unhealthy, background=True)
 
 
-def populate_tables():
-    update_terminal_output("\n----- EXECUTING populate_tables -----")
+def require_backend():
+    """Return the active backend, failing clearly when not connected yet."""
+    if backend is None:
+        raise RuntimeError("Not connected to the database.")
+    return backend
+
+
+def borrow_connection():
+    """Borrow a pooled connection for one operation."""
+    return require_backend().connection()
+
+
+def cancel_running_query(job):
+    """Interrupt the database calls of one job (used by the job runner's cancel and timeouts)."""
+    if backend is not None:
+        backend.cancel(job)
+
 
-    # List of records to populate each table 
-    suppliers = [
-        (1, 'Universal Suppliers', 'Movies', 123, 'King St W', 'Toronto', 'ON', 'Canada', 'M5V1E3'),
-        (2, 'Global Music Co', 'Music', 456, 'Queen St E', 'Toronto', 'ON', 'Canada', 'M5A1S3')]
+def load_metadata():
+    """Read column types, keys and nullability of the store tables (runs on a worker thread)."""
+    global table_metadata
+    with borrow_connection() as connection:
+        table_metadata = metadata.load(connection.cursor(), backend.dialect)
+    update_terminal_output(f"Schema metadata loaded for {len(table_metadata)} tables.")
 
-    products = [
-        (1, 'Inception Blu-ray', 10, '2022-01-01', 19.99, 5.99),
-        (2, 'Imagine Dragons Album', 20, '2023-01-01', 15.99, 4.99)]
 
-    inventory = [
-        (1, 'Available', 1),
-        (2, 'Rented', 2)]
+def table_info(table_name):
+    """Cached metadata of a table, matching its name case-insensitively; None if it doesn't exist."""
+    for name, info in table_metadata.items():
+        if name.upper() == table_name.upper():
+            return info
+    return None
 
-    product_supplier = [
-        (1, 1),
-        (2, 2)]
 
-    music = [
-        (2, 'Rock', 'Imagine Dragons', 'Alex Da Kid')]
+def start_change_feed(purge=False):
+    """Follow the change log from its current end, if the tables have one (runs on a worker thread)."""
+    if "ChangeLog" not in table_metadata:
+        change_feed.since = None  # Not created yet, nothing to poll
+        return
+    with borrow_connection() as connection:
+        if purge:
+            changes.purge(connection, dialect=backend.dialect)
+        change_feed.start(connection.cursor())
+
+
+def poll_changes():
+    """Periodically bring caches, the search index and open windows up to date with the rows
+    other terminals changed, reading only those rows.
+    """
+    def read_changes():
+        if change_feed.since is None:
+            return False, {}
+        with borrow_connection() as connection:
+            cursor = connection.cursor()
+            reload, changed = change_feed.poll(cursor)
+            rows = changes.read_changed_rows(cursor, changed)
+        if reload:
+            invalidate_cache()
+            build_search_index()
+            return True, {}
+        if rows:
+            invalidate_cache(*rows, *[attribute_table for table_name in rows
+                                      for column, attribute_table in attributes.attributes_of(table_name)])
+        if search_index is not None:
+            for table_name, table_rows in rows.items():
+                if search_index.covers(table_name):
+                    for key, row in table_rows.items():
+                        search_index.apply_row(table_name, key[0], row)
+        return False, rows
+
+    def changes_read(result):
+        reload, rows = result
+        root.after(CHANGE_POLL_MS, poll_changes)
+        if not reload and not rows:
+            return
+        change_listeners[:] = [(window, callback) for window, callback in change_listeners if window.winfo_exists()]
+        for window, callback in change_listeners:
+            callback(None if reload else rows)
 
-    movie = [
-        (1, 'Sci-Fi', 'Christopher Nolan', 'Paramount Pictures')]
+    def poll_failed(e):
+        update_terminal_output(f"Error polling the change log: {e}", logging.WARNING)
+        root.after(CHANGE_POLL_MS, poll_changes)
 
-    customers = [
-        (1, 'John Doe', '123-456-7890', 'Good', 'Interstellar Blu-ray'),
-        (2, 'Jane Smith', '987-654-3210', 'Average', 'Imagine Dragons Album')]
+    job_runner.submit("poll changes", read_changes, on_done=changes_read, on_error=poll_failed, background=True)
 
-    rentals = [
-        (1, '2024-11-01', '2024-11-10', 'Returned', 1),
-        (2, '2024-11-01', '2024-11-15', 'Rented', 2)]
 
-    transactions = [
-        (1, '2024-11-01', 'Purchase', 19.99, 1, 1),
-        (2, '2024-11-01', 'Rental', 5.99, 2, 2)]
+def create_tables():
+    update_terminal_output("\n----- EXECUTING create_tables -----")
 
-    inventory_customers = [
-        (1, 1),
-        (2, 2)]
+    try:
+        with borrow_connection() as connection:
+            cursor = connection.cursor()
+            # Loop through the create SQL statements
+            for sql in schema.CREATE_SQL:
+                try:
+                    cursor.execute(sql)
+                    update_terminal_output(f"Table created successfully.")
+                except backends.DatabaseError as e:
+                    message = str(e)[0:9]
+                    update_terminal_output(f"Table already exists. (error code: {message})")
+
+            connection.commit()
+
+            # Secondary indexes (foreign keys and lookup columns), only the missing ones are created
+            for index_name in schema.create_indexes(connection, backend.dialect):
+                update_terminal_output(f"Index {index_name} created successfully.")
+
+            # Genre/Artist/Producer/Director values of rows written before the attribute tables existed
+            for table_name in attributes.migrate(connection):
+                update_terminal_output(f"Attribute tables of {table_name} filled from its comma separated columns.")
+            # Row version column and trigger for optimistic concurrency in manage_entries
+            for table_name in schema.add_version_columns(connection, backend.dialect):
+                update_terminal_output(f"Row versions added to {table_name}.")
+            attributes.create_views(connection, backend.dialect)
+            changes.create_triggers(connection, backend.dialect)
+            report_missing_indexes(cursor)
+            invalidate_cache()
+        load_metadata()
+        start_change_feed()
+        update_status("create_tables completed successfully")
+
+    except backends.DatabaseError as e:
+        update_status(f"create_tables failed: {e}")
+        update_terminal_output(f"Error creating tables: {e}", logging.ERROR)
+
+
+def invalidate_cache(*table_names):
+    """Forget cached results reading these tables (all cached results when none are given)."""
+    if table_names:
+        for table_name in table_names:
+            if table_name in record_lookups:
+                record_lookups[table_name].invalidate()
+    else:
+        record_lookups.clear()
+    if query_cache is None:
+        return
+    if table_names:
+        query_cache.invalidate(*table_names)
+    else:
+        query_cache.clear()
+
+
+def record_lookup(table_name):
+    """Prefix lookups of a table for the record pickers, with their cache of recent lookups."""
+    if table_name not in record_lookups:
+        record_lookups[table_name] = typeahead.Typeahead(table_name, dialect=backend.dialect)
+    return record_lookups[table_name]
 
-    inventory_products = [
-        (1, 1),
-        (2, 1)]
 
+def report_missing_indexes(cursor):
+    """Warn about common access paths (joins, lookups) that would need a full table scan."""
+    for warning in schema.missing_index_warnings(cursor, backend.dialect):
+        update_terminal_output(warning, logging.WARNING)
+
+
+def drop_tables():
+    update_terminal_output("\n----- EXECUTING drop_tables -----")
+    close_custom_sql_stream()
+    invalidate_cache()
     try:
-        # Insert records into the tables
-        for supplier in suppliers:
-            try:
-                cursor.execute("INSERT INTO Supplier VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9)", supplier)
-                update_terminal_output(f"Inserted into Supplier: {supplier}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into Supplier: {e}")
+        with borrow_connection() as connection:
+            attributes.drop_views(connection, backend.dialect)
+            changes.drop_triggers(connection, backend.dialect)
+            cursor = connection.cursor()
+            for table in schema.TABLES:  # Children before parents
+                try:
+                    cursor.execute(backend.drop_table_sql(table))
+                    update_terminal_output(f"Table {table} dropped successfully.")
+                except backends.DatabaseError as e:
+                    update_terminal_output(f"Error dropping table {table}: {e}", logging.ERROR)
+
+            connection.commit()
+            if search_index is not None:
+                search_index.clear()
+        load_metadata()
+        start_change_feed()
+        update_status("drop_tables completed successfully")
 
-        for product in products:
-            try:
-                cursor.execute("INSERT INTO Product VALUES (:1, :2, :3, TO_DATE(:4, 'YYYY-MM-DD'), :5, :6)", product)
-                update_terminal_output(f"Inserted into Product: {product}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into Product: {e}")
+    except backends.DatabaseError as e:
+        update_terminal_output(f"Error dropping tables: {e}", logging.ERROR)
+        update_status(f"drop_tables failed: {e}")
 
-        for record in inventory:
-            try:
-                cursor.execute("INSERT INTO Inventory VALUES (:1, :2, :3)", record)
-                update_terminal_output(f"Inserted into Inventory: {record}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Duplicate record skipped in Inventory: {record}")
 
-        for record in product_supplier:
-            try:
-                cursor.execute("INSERT INTO ProductSupplier VALUES (:1, :2)", record)
-                update_terminal_output(f"Inserted into ProductSupplier: {record}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Duplicate record skipped in ProductSupplier: {record}")
+def populate_tables():
+    update_terminal_output("\n----- EXECUTING populate_tables -----")
+    close_custom_sql_stream()
 
-        for record in music:
-            try:
-                cursor.execute("INSERT INTO Music VALUES (:1, :2, :3, :4)", record)
-                update_terminal_output(f"Inserted into Music: {record}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Duplicate record skipped in Music: {record}")
+    data = sample_data.ROWS
 
-        for record in movie:
-            try:
-                cursor.execute("INSERT INTO Movie VALUES (:1, :2, :3, :4)", record)
-                update_terminal_output(f"Inserted into Movie: {record}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Duplicate record skipped in Movie: {record}")
+    try:
+        # Insert every table with executemany in foreign key order, one commit per batch
+        try:
+            summary, elapsed = bulk_load.load_tables(
+                require_backend(), data, batch_size=POPULATE_BATCH_SIZE,
+                on_progress=lambda table_name, done: job_runner.report(f"{table_name}: {done} rows"),
+                tables=table_metadata
+            )
+        finally:
+            invalidate_cache(*data)  # Batches are committed as they go, even when a later one fails
+        update_terminal_output(bulk_load.summary_line(summary, elapsed))
 
-        for customer in customers:
-            try:
-                cursor.execute("INSERT INTO Customer VALUES (:1, :2, :3, :4, :5)", customer)
-                update_terminal_output(f"Inserted into Customer: {customer}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into Customer: {e}")
+        if report_rejected_rows(summary):
+            update_terminal_output("\nTables populated, some rows were rejected.", logging.WARNING)
+        else:
+            update_terminal_output("\nAll tables populated successfully.")
+        build_search_index()
 
-        for rental in rentals:
-            try:
-                cursor.execute(
-                    "INSERT INTO Rentals VALUES (:1, TO_DATE(:2, 'YYYY-MM-DD'), TO_DATE(:3, 'YYYY-MM-DD'), :4, :5)",
-                    rental)
-                update_terminal_output(f"Inserted into Rentals: {rental}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into Rentals: {e}")
-
-        for transaction in transactions:
-            try:
-                cursor.execute("INSERT INTO Transactions VALUES (:1, TO_DATE(:2, 'YYYY-MM-DD'), :3, :4, :5, :6)",
-                               transaction)
-                update_terminal_output(f"Inserted into Transactions: {transaction}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into Transactions: {e}")
+    except backends.DatabaseError as e:
+        update_terminal_output(f"Error populating tables: {e}", logging.ERROR)
 
-        for inventory_customer in inventory_customers:
-            try:
-                cursor.execute(
-                    "INSERT INTO InventoryCustomer VALUES (:1, :2)",
-                    inventory_customer
-                )
-                update_terminal_output(f"Inserted into InventoryCustomer: {inventory_customer}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into InventoryCustomer: {e}")
-
-        for inventory_product in inventory_products:
-            try:
-                cursor.execute(
-                    "INSERT INTO InventoryProduct VALUES (:1, :2)",
-                    inventory_product
-                )
-                update_terminal_output(f"Inserted into InventoryProduct: {inventory_product}")
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error inserting into InventoryProduct: {e}")
 
-        connection.commit()
-        update_terminal_output("\nAll tables populated successfully.")
+def report_rejected_rows(summary):
+    """List the rows a bulk load rejected (only the first few per table); returns True if there were any."""
+    for table_name, (inserted, errors) in summary.items():
+        for row_number, message in errors[:MAX_REPORTED_ERRORS]:
+            update_terminal_output(f"Rejected {table_name} row {row_number}: {message}", logging.WARNING)
+        if len(errors) > MAX_REPORTED_ERRORS:
+            update_terminal_output(f"... {len(errors) - MAX_REPORTED_ERRORS} more rows rejected in {table_name}", logging.WARNING)
+    return any(errors for inserted, errors in summary.values())
+
+
+def export_table(table_name):
+    """Ask for a file and stream the selected table into it."""
+    if table_name not in schema.PRIMARY_KEYS:
+        update_terminal_output("Select a table to export first.", logging.WARNING)
+        return
+    path = filedialog.asksaveasfilename(
+        title=f"Export {table_name}", initialfile=f"{table_name}.csv", defaultextension=".csv",
+        filetypes=[("CSV", "*.csv"), ("CSV, gzip", "*.csv.gz"), ("JSON Lines", "*.jsonl"), ("JSON Lines, gzip", "*.jsonl.gz")])
+    if path:
+        job_runner.submit("export_table", run_export, table_name, path, timeout=TRANSFER_TIMEOUT)
 
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error populating tables: {e}")
+
+def run_export(table_name, path):
+    """Stream a table to a CSV/JSON Lines file (runs on a worker thread)."""
+    update_terminal_output(f"\n----- EXECUTING export_table ({table_name}) -----")
+    try:
+        count, elapsed = transfer.export_table(
+            require_backend(), table_name, path,
+            on_progress=lambda done: job_runner.report(f"{table_name}: {done} rows written"))
+        update_terminal_output(f"Exported {count} rows from {table_name} to {path} in {elapsed:.2f}s.")
+    except (OSError, ValueError) + backends.DatabaseError as e:
+        update_terminal_output(f"Error exporting {table_name}: {e}", logging.ERROR)
+
+
+def import_tables():
+    """Ask for export files (named after their tables) and load them."""
+    paths = filedialog.askopenfilenames(
+        title="Import Tables",
+        filetypes=[("Exports", "*.csv *.csv.gz *.jsonl *.jsonl.gz"), ("All files", "*.*")])
+    if paths:
+        job_runner.submit("import_tables", run_import, list(paths), timeout=TRANSFER_TIMEOUT)
+
+
+def run_import(paths):
+    """Load export files parents first, one batch at a time (runs on a worker thread)."""
+    update_terminal_output("\n----- EXECUTING import_tables -----")
+    close_custom_sql_stream()
+    tables = set()
+    try:
+        tables = {transfer.table_of(path) for path in paths} - {None}
+        summary, elapsed = transfer.import_files(
+            require_backend(), paths, batch_size=POPULATE_BATCH_SIZE,
+            on_progress=lambda table_name, done: job_runner.report(f"{table_name}: {done} rows"),
+            metadata_tables=table_metadata)
+        update_terminal_output(bulk_load.summary_line(summary, elapsed))
+        if report_rejected_rows(summary):
+            update_terminal_output("Import finished, some rows were rejected.", logging.WARNING)
+        build_search_index()
+    except (OSError, ValueError) + backends.DatabaseError as e:
+        update_terminal_output(f"Error importing: {e}", logging.ERROR)
+    finally:
+        invalidate_cache(*tables)  # Batches are committed as they go, even when a later one fails
 
 def execute_custom_sql():
     """Execute the SQL code entered in the custom SQL textarea."""
     sql_code = sql_text_area.get("1.0", "end").strip()  # Get the SQL code from the textarea
+    job_runner.submit("execute_custom_sql", run_custom_sql, sql_code, timeout=CUSTOM_SQL_TIMEOUT)
+
+
+def run_custom_sql(sql_code):
+    """Run custom SQL and print the outcome (runs on a worker thread)."""
+    global custom_sql_stream
+    close_custom_sql_stream()
     try:
-        cursor.execute(sql_code)  # Execute the SQL command
-        if sql_code.lower().startswith("select"):
-            results = cursor.fetchall()  # Fetch results for SELECT queries
-            columns = [desc[0] for desc in cursor.description]  # Get column names
-            table = tabulate(results, headers=columns, tablefmt="grid")  # Format as a table
-            update_terminal_output(f"Results:\n{table}")
+        # SELECTs over store tables may be answered from the cache when repeated
+        tables = result_cache.tables_read(sql_code) if query_cache is not None else None
+        if tables is not None:
+            cached = query_cache.get(sql_code)
+            if cached is not None:
+                update_terminal_output("Results (cached):")
+                result_stream.render_rows(*cached, update_terminal_output, chunk_rows=CUSTOM_SQL_ARRAYSIZE)
+                update_terminal_output(f"({len(cached[1])} rows)")
+                return
+            generation = query_cache.generation(tables)
+
+        stream = result_stream.ResultStream(
+            require_backend(), sql_code, row_limit=CUSTOM_SQL_ROW_LIMIT, byte_limit=CUSTOM_SQL_BYTE_LIMIT,
+            arraysize=CUSTOM_SQL_ARRAYSIZE, keep_rows=tables is not None)
+        if stream.is_query:
+            custom_sql_stream = stream
+            update_terminal_output("Results:")
+            stream_custom_sql_rows(stream)
+            # Only results that fit in the first batch are kept
+            if tables is not None and stream.kept_rows is not None and not job_runner.is_cancelled():
+                query_cache.put(sql_code, None, stream.column_names, stream.kept_rows, tables, generation)
         else:
-            connection.commit()  # Commit changes for non-SELECT queries
+            # Refill the attribute tables of Music/Movie rows the statement may have changed, same transaction
+            try:
+                written = result_cache.tables_written(sql_code) or set()
+                for table_name in attributes.VIEWS:
+                    if table_name.upper() in written:
+                        attributes.rebuild(stream.connection, table_name)
+                stream.connection.commit()  # Commit changes for non-SELECT queries
+            except BaseException:
+                stream.connection.rollback()  # Nothing half done stays open on the pooled connection
+                raise
+            finally:
+                stream.close()
+            if query_cache is not None:
+                query_cache.invalidate_sql(sql_code)  # Every cached result if the statement can't be matched to a table
             update_terminal_output("SQL executed successfully.")
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error executing SQL: {e}")
+            if search_index is not None and search_index.indexes:
+                search_index.mark_stale()  # We can't tell which rows changed, search the DB until rebuilt
+                update_terminal_output("Search index marked stale, use 'Rebuild Search Index' to refresh it.")
+    except backends.DatabaseError as e:
+        update_terminal_output(f"Error executing SQL: {e}", logging.ERROR)
+
+
+def stream_custom_sql_rows(stream):
+    """Print the next batch of a custom SELECT chunk by chunk (runs on a worker thread)."""
+    try:
+        stream.fetch(update_terminal_output, should_stop=job_runner.is_cancelled)
+    except backends.DatabaseError as e:
+        stream.close()
+        if not job_runner.is_cancelled():
+            raise
+        update_terminal_output(f"Query interrupted: {e}", logging.ERROR)
+    if job_runner.is_cancelled():
+        stream.close()
+        update_terminal_output(f"Cancelled after {stream.rows_fetched} rows.")
+    elif stream.exhausted:
+        update_terminal_output(f"({stream.rows_fetched} rows)")
+    else:
+        update_terminal_output(f"Showing {stream.rows_fetched} rows so far, press 'Fetch More Rows' for more.")
+
+
+def fetch_more_custom_sql():
+    """Continue the last custom SELECT where it stopped."""
+    stream = custom_sql_stream
+    if stream is None or stream.exhausted:
+        update_terminal_output("No more rows to fetch.")
+        return
+    job_runner.submit("fetch more rows", stream_custom_sql_rows, stream, timeout=CUSTOM_SQL_TIMEOUT)
+
+
+def close_custom_sql_stream():
+    """Release the cursor of the last custom SELECT (on SQLite an open cursor blocks writers)."""
+    global custom_sql_stream
+    stream, custom_sql_stream = custom_sql_stream, None
+    if stream is not None:
+        stream.close()
 
 
 # function has been replace with manage_entries
@@ -373,9 +529,11 @@ def show_table(table_selector):
     try:
         # Get the selected table
         selected_table = table_selector.get()
-        cursor.execute(f"SELECT * FROM {selected_table}")
-        records = cursor.fetchall()
-        column_names = [col[0] for col in cursor.description]
+        with borrow_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT * FROM {selected_table}")
+            records = cursor.fetchall()
+            column_names = [col[0] for col in cursor.description]
 
         if not records:
             update_terminal_output(f"The table {selected_table} is empty.")
@@ -426,182 +584,489 @@ def show_table(table_selector):
         footer_label.pack(anchor="w", pady=2)
 
         update_terminal_output(f"Displayed contents of table: {selected_table}")
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error fetching data from table {selected_table}: {e}")
+    except backends.DatabaseError as e:
+        update_terminal_output(f"Error fetching data from table {selected_table}: {e}", logging.ERROR)
         
 def manage_entries(selected_table):
     """Open a window to manage entries in a selected table."""
-    try:
-        if not selected_table:
-            update_terminal_output("Please select a table to manage entries.")
+    if not selected_table:
+        update_terminal_output("Please select a table to manage entries.")
+        return
+    if backend is None:
+        update_terminal_output("Connect to the database first.", logging.WARNING)
+        return
+    info = table_info(selected_table)
+    if info is None:
+        update_terminal_output(f"Table {selected_table} doesn't exist, press Create Tables first.", logging.WARNING)
+        return
+    # The window is built from the cached metadata, the grid then fetches its pages on demand
+    open_manage_window(info.name, info)
+
+
+def open_manage_window(selected_table, info):
+    """Build the manage window from the table's metadata and load the first page."""
+    column_names = info.column_names
+    # Create a new pop-up window
+    manage_window = ctk.CTkToplevel()
+    manage_window.title(f"Manage Entries in {selected_table}")
+    manage_window.geometry("900x850")
+    manage_window.focus_force()  # Bring the window to the front
+
+    # Typeahead picker for the record to modify/remove: the rows of the page shown, or the
+    # records whose key or name starts with what is typed (record_picker.py)
+    picker_frame = ctk.CTkFrame(manage_window)
+    record_picker = RecordPicker(
+        picker_frame,
+        backend,
+        record_lookup(selected_table),
+        runner=job_runner,
+        on_matches=lambda count: matches_label.configure(text=f"{count} records"),
+        on_error=lambda e: update_terminal_output(f"Error looking up records in {selected_table}: {e}", logging.ERROR),
+        height=40,
+        width=600
+    )
+    record_picker.pack(side="left", padx=5)
+    matches_label = ctk.CTkLabel(picker_frame, text="", width=100)
+    matches_label.pack(side="left", padx=5)
+
+    def show_page_records(page_records):
+        """Offer the rows of the visible page in the picker."""
+        record_picker.offer_page(table_grid.keys, page_records)
+
+    def show_change(old_key, key, row):
+        """Apply one added, modified (or, with row None, removed) record to the grid and picker."""
+        if old_key is None:
+            table_grid.insert_row(row)
+        elif row is None:
+            table_grid.remove_row(old_key)
+        else:
+            table_grid.update_row(old_key, row)
+        record_picker.replace(old_key, key, row)
+
+    def index_change(old_key, key, row):
+        """Keep the search index in step with one changed record (runs on a worker thread)."""
+        if search_index is None:
             return
+        if old_key is not None and old_key != key:
+            search_index.remove_row(selected_table, old_key[0])
+        search_index.apply_row(selected_table, key[0], row)
+
+    # Show the table content one page at a time
+    table_grid = TableGrid(
+        manage_window,
+        backend,
+        selected_table,
+        column_names,
+        dialect=backend.dialect,
+        runner=job_runner,
+        on_page=show_page_records,
+        cache=query_cache,
+        on_error=lambda e: update_terminal_output(f"Error fetching data from table {selected_table}: {e}", logging.ERROR)
+    )
+    table_grid.pack(pady=10, padx=10, fill="both", expand=True)
+    table_grid.refresh()
+    picker_frame.pack(pady=10)
+
+    def show_remote_changes(changed):
+        """Move the rows other terminals changed into the page and picker (None: re-read the page)."""
+        if changed is None:
+            table_grid.refresh()
+            return
+        rows = changed.get(selected_table)
+        if rows:
+            record_picker.apply_changes(rows)
+            table_grid.apply_changes(rows)
+
+    change_listeners.append((manage_window, show_remote_changes))
+
+    # Modify and Remove only apply while the record still has the row version it had when it was
+    # picked (records.py); when someone else changed it in between, the conflict window shows the
+    # record as it is now and the clerk retries on it or merges by hand
+    def modify_record(key, seen, column, new_value, on_done=None):
+        """Set one column of a record, as long as nobody changed it since `seen` was read."""
+
+        def modify():
+            with borrow_connection() as connection:
+                cursor = connection.cursor()
+                new_key, row = records.update_value(cursor, selected_table, key, column, new_value, info=info,
+                                                    version=info.version_of(seen))
+                connection.commit()
+            invalidate_cache(selected_table)
+            if row is not None:
+                index_change(key, new_key, row)
+            return new_key, row
+
+        def modified(result):
+            new_key, row = result
+            if on_done is not None:
+                on_done()
+            if row is None:
+                update_terminal_output(f"Record {key} no longer exists, it was removed from the list.", logging.WARNING)
+                show_change(key, key, None)
+                return
+            update_terminal_output(f"Modified record: {row}")
+            show_change(key, new_key, row)
 
-        cursor.execute(f"SELECT * FROM {selected_table}")
-        records = cursor.fetchall()
-        column_names = [col[0] for col in cursor.description]
+        def failed(e):
+            if not isinstance(e, records.ConflictError):
+                update_terminal_output(f"Error modifying record: {e}", logging.ERROR)
+                return
+            if on_done is not None:
+                on_done()
+            open_conflict_window(key, seen, e.row, {column: new_value})
 
-        # Create a new pop-up window
-        manage_window = ctk.CTkToplevel()
-        manage_window.title(f"Manage Entries in {selected_table}")
-        manage_window.geometry("900x700")
-        manage_window.focus_force()  # Bring the window to the front
+        job_runner.submit("modify record", modify, on_done=modified, on_error=failed)
 
-        # Show the table content
-        def format_row(row, col_widths):
-            """Helper function to format a row with fixed-width columns."""
-            return "| " + " | ".join(f"{str(cell):<{col_widths[i]}}" for i, cell in enumerate(row)) + " |"
+    def remove_record(key, seen):
+        """Remove a record, as long as nobody changed it since `seen` was read."""
 
-        col_widths = [
-            max(len(str(col)), max(len(str(row[i])) for row in records)) + 2
-            for i, col in enumerate(column_names)
-        ]
-        scrollable_frame = ctk.CTkScrollableFrame(manage_window, width=850, height=300)
-        scrollable_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        def remove():
+            with borrow_connection() as connection:
+                records.delete(connection.cursor(), selected_table, key, version=info.version_of(seen))
+                connection.commit()
+            invalidate_cache(selected_table)
+            index_change(key, key, None)
 
-        separator = "+-" + "-+-".join("-" * w for w in col_widths) + "-+"
-        header = format_row(column_names, col_widths)
-        ctk.CTkLabel(scrollable_frame, text=separator, font=("Courier", 10)).pack(anchor="w", pady=2)
-        ctk.CTkLabel(scrollable_frame, text=header, font=("Courier", 10)).pack(anchor="w", pady=2)
-        ctk.CTkLabel(scrollable_frame, text=separator, font=("Courier", 10)).pack(anchor="w", pady=2)
-        for row in records:
-            row_text = format_row(row, col_widths)
-            ctk.CTkLabel(scrollable_frame, text=row_text, font=("Courier", 10)).pack(anchor="w", pady=2)
-        ctk.CTkLabel(scrollable_frame, text=separator, font=("Courier", 10)).pack(anchor="w", pady=2)
-
-        # Dropdown for selecting a record to modify/remove
-        selected_record = ctk.StringVar()
-        record_dropdown = ctk.CTkComboBox(
-            manage_window, 
-            values=[str(record) for record in records], 
-            variable=selected_record, 
+        def removed(result):
+            update_terminal_output(f"Removed record: {seen}")
+            show_change(key, key, None)
+
+        def failed(e):
+            if isinstance(e, records.ConflictError):
+                open_conflict_window(key, seen, e.row)
+                return
+            update_terminal_output(f"Error removing record: {e}", logging.ERROR)
+
+        job_runner.submit("remove record", remove, on_done=removed, on_error=failed)
+
+    def open_conflict_window(key, seen, current, values=None, on_retry=None, on_keep=None):
+        """Show a record changed by someone else since it was picked, next to the change that was refused.
+
+        values is {column: new value} of a refused modification, None for a removal. Retry applies
+        the change to the record as it is now; Merge (a single modification) opens the modify window
+        on it with the refused value filled in, to be combined by hand. A staged batch passes
+        on_retry and on_keep instead, which re-stage or unstage its change.
+        """
+        update_terminal_output(f"Record {key} was changed by someone else since you picked it, nothing was written.",
+                               logging.WARNING)
+        show_change(key, schema.key_of(selected_table, column_names, current), current)
+        conflict_window = ctk.CTkToplevel()
+        conflict_window.title(f"Conflict in {selected_table}")
+        conflict_window.geometry("800x500")
+        conflict_window.focus_force()
+
+        refused = {column.upper(): value for column, value in (values or {}).items()}
+        lines = []
+        for position, name in enumerate(column_names):
+            was, now = seen[position], current[position]
+            line = [("* " if was != now else "  ") + name, was, now]
+            if values is not None:
+                line.append(refused.get(name.upper(), ""))
+            lines.append(line)
+        headers = ["Column", "When picked", "Now"] + (["Your change"] if values is not None else [])
+        both = [column for column in values or {}
+                if seen[schema.column_position(column_names, column)] != current[schema.column_position(column_names, column)]]
+        if values is None:
+            summary = "The record was changed before it could be removed (changed columns are marked *)."
+        elif both:
+            summary = f"{', '.join(both)} changed by someone else too: Retry overwrites their value."
+        else:
+            summary = f"Other columns were changed by someone else: Retry sets {', '.join(values)} and keeps their changes."
+        ctk.CTkLabel(conflict_window, text=summary).pack(pady=10)
+        table_label = ctk.CTkLabel(conflict_window, text=tabulate(lines, headers=headers, tablefmt="simple"),
+                                   font=("Courier", 10), justify=tk.LEFT, anchor="w")
+        table_label.pack(pady=5, padx=10, fill="both", expand=True)
+
+        buttons = ctk.CTkFrame(conflict_window)
+        buttons.pack(pady=10)
+        if on_retry is not None:
+            ctk.CTkButton(buttons, text="Retry",
+                          command=lambda: (conflict_window.destroy(), on_retry())).pack(side="left", padx=5)
+        elif values is None:
+            ctk.CTkButton(buttons, text="Remove Anyway",
+                          command=lambda: (conflict_window.destroy(), remove_record(key, current))).pack(side="left", padx=5)
+        else:
+            (column, new_value), = values.items()
+            ctk.CTkButton(buttons, text="Retry",
+                          command=lambda: modify_record(key, current, column, new_value,
+                                                        on_done=conflict_window.destroy)).pack(side="left", padx=5)
+            ctk.CTkButton(buttons, text="Merge",
+                          command=lambda: (conflict_window.destroy(),
+                                           open_modify_window(column, new_value))).pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Keep Theirs",
+                      command=lambda: (conflict_window.destroy(), on_keep and on_keep())).pack(side="left", padx=5)
+
+    # Modify Entry Button
+    def open_modify_window(column=None, value=None):
+        """Open a window to modify a selected record (column and value filled in when given)."""
+        key, seen = record_picker.selected()
+        if key is None:
+            update_terminal_output("Please select a record to modify.")
+            return
+        modify_window = ctk.CTkToplevel()
+        modify_window.title(f"Modify Record in {selected_table}")
+        modify_window.geometry("500x400")
+        modify_window.focus_force()  # Bring the modify window to the front
+
+        # Dropdown for selecting the column to modify (the row version isn't edited by hand)
+        selected_column = ctk.StringVar(value=column or "")
+        column_dropdown = ctk.CTkComboBox(
+            modify_window, 
+            values=info.data_column_names, 
+            variable=selected_column, 
             height=40, 
-            width=700
+            width=300
         )
-        record_dropdown.pack(pady=10)
-
-        # Modify Entry Button
-        def open_modify_window():
-            """Open a window to modify a selected record."""
-            record = selected_record.get()
-            if not record:
-                update_terminal_output("Please select a record to modify.")
+        column_dropdown.pack(pady=10)
+
+        # Entry for new value
+        new_value_entry = ctk.CTkEntry(modify_window, width=300, placeholder_text="Enter new value")
+        new_value_entry.pack(pady=10)
+        if value:
+            new_value_entry.insert(0, value)
+
+        def apply_modification():
+            """Apply the modification to the selected record."""
+            column = selected_column.get()
+            new_value = new_value_entry.get()
+            if not column or not new_value:
+                update_terminal_output("Please select a column and enter a new value.")
                 return
-            modify_window = ctk.CTkToplevel()
-            modify_window.title(f"Modify Record in {selected_table}")
-            modify_window.geometry("500x400")
-            modify_window.focus_force()  # Bring the modify window to the front
-
-            selected_row = eval(record)  # Convert the string back to a tuple
-
-            # Dropdown for selecting the column to modify
-            selected_column = ctk.StringVar()
-            column_dropdown = ctk.CTkComboBox(
-                modify_window, 
-                values=column_names, 
-                variable=selected_column, 
-                height=40, 
-                width=300
-            )
-            column_dropdown.pack(pady=10)
-
-            # Entry for new value
-            new_value_entry = ctk.CTkEntry(modify_window, width=300, placeholder_text="Enter new value")
-            new_value_entry.pack(pady=10)
-
-            def apply_modification():
-                """Apply the modification to the selected record."""
-                column = selected_column.get()
-                new_value = new_value_entry.get()
-                if not column or not new_value:
-                    update_terminal_output("Please select a column and enter a new value.")
-                    return
-                primary_key = column_names[0]  # Assuming first column is the primary key
-                primary_value = selected_row[0]
-                try:
-                    cursor.execute(
-                        f"UPDATE {selected_table} SET {column} = :new_value WHERE {primary_key} = :primary_value",
-                        {"new_value": new_value, "primary_value": primary_value}
-                    )
-                    connection.commit()
-                    update_terminal_output(f"Modified record: {record}")
+            try:
+                info.convert(column, new_value)
+            except ValueError as e:
+                update_terminal_output(str(e), logging.WARNING)
+                return
+            if batch_mode.get():
+                keys = [row_key for row_key in table_grid.keys if row_key not in batch.deletes] if whole_page.get() else [key]
+
+                def stage_updates():
+                    for row_key in keys:
+                        batch.stage_update(row_key, column, new_value,
+                                           seen=seen if row_key == key else table_grid.row_for(row_key))
+                if stage(stage_updates):
                     modify_window.destroy()
-                    manage_window.destroy()  # Close the current manage window
-                    manage_entries(selected_table)  # Reopen the manage entries window
-                except cx_Oracle.DatabaseError as e:
-                    update_terminal_output(f"Error modifying record: {e}")
-
-            apply_button = ctk.CTkButton(modify_window, text="Apply", command=apply_modification)
-            apply_button.pack(pady=10)
-
-        modify_button = ctk.CTkButton(manage_window, text="Modify Record", command=open_modify_window, height=40, width=200)
-        modify_button.pack(pady=5)
-
-        # Remove Entry Button
-        def remove_entry():
-            """Remove the selected record."""
-            record = selected_record.get()
-            if not record:
-                update_terminal_output("Please select a record to remove.")
                 return
-            selected_row = eval(record)  # Convert the string back to a tuple
-            primary_key = column_names[0]  # Assuming first column is the primary key
-            primary_value = selected_row[0]
+            modify_record(key, seen, column, new_value, on_done=modify_window.destroy)
+
+        # With batch edit on, the same value can be staged for every row of the page (e.g. a new price)
+        whole_page = ctk.BooleanVar(value=False)
+        if batch_mode.get():
+            ctk.CTkCheckBox(modify_window, text="Stage for every row on this page", variable=whole_page).pack(pady=5)
+
+        apply_button = ctk.CTkButton(modify_window, text="Stage" if batch_mode.get() else "Apply", command=apply_modification)
+        apply_button.pack(pady=10)
+
+    modify_button = ctk.CTkButton(manage_window, text="Modify Record", command=open_modify_window, height=40, width=200)
+    modify_button.pack(pady=5)
+
+    # Remove Entry Button
+    def remove_entry():
+        """Remove the selected record."""
+        key, record = record_picker.selected()
+        if key is None:
+            update_terminal_output("Please select a record to remove.")
+            return
+        if batch_mode.get():
+            stage(lambda: batch.stage_delete(key, seen=record))
+            return
+        remove_record(key, record)
+
+    remove_button = ctk.CTkButton(manage_window, text="Remove Record", command=remove_entry, height=40, width=200)
+    remove_button.pack(pady=5)
+
+    # Add Entry Button
+    def open_add_entry_window():
+        """Open a window to add a new record."""
+        add_window = ctk.CTkToplevel()
+        add_window.title(f"Add Record to {selected_table}")
+        add_window.geometry("500x600")
+        add_window.focus_force()  # Bring the add window to the front
+
+        # Required columns (NOT NULL and key columns) are marked with *
+        entry_fields = []
+        for column in info.data_columns:
+            required = "" if column.nullable else " *"
+            label = ctk.CTkLabel(add_window, text=f"{column.name} ({column.describe()}){required}:", font=("Arial", 12))
+            label.pack(pady=5)
+            entry = ctk.CTkEntry(add_window, width=400)
+            entry.pack(pady=5)
+            entry_fields.append(entry)
+
+        def add_record():
+            """Add a new record to the table."""
+            values = [entry.get() for entry in entry_fields]
             try:
-                cursor.execute(f"DELETE FROM {selected_table} WHERE {primary_key} = :primary_value", {"primary_value": primary_value})
-                connection.commit()
-                update_terminal_output(f"Removed record: {record}")
-                manage_window.destroy()  # Close the current manage window
-                manage_entries(selected_table)  # Reopen the manage entries window
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error removing record: {e}")
-
-        remove_button = ctk.CTkButton(manage_window, text="Remove Record", command=remove_entry, height=40, width=200)
-        remove_button.pack(pady=5)
-
-        # Add Entry Button
-        def open_add_entry_window():
-            """Open a window to add a new record."""
-            add_window = ctk.CTkToplevel()
-            add_window.title(f"Add Record to {selected_table}")
-            add_window.geometry("500x600")
-            add_window.focus_force()  # Bring the add window to the front
-
-            entry_fields = []
-            for column in column_names:
-                label = ctk.CTkLabel(add_window, text=f"{column}:", font=("Arial", 12))
-                label.pack(pady=5)
-                entry = ctk.CTkEntry(add_window, width=400)
-                entry.pack(pady=5)
-                entry_fields.append(entry)
-
-            def add_record():
-                """Add a new record to the table."""
-                values = [entry.get() for entry in entry_fields]
-                if any(value.strip() == "" for value in values):
-                    update_terminal_output("All fields must be filled.")
-                    return
-                try:
-                    placeholders = ", ".join([":" + str(i + 1) for i in range(len(values))])
-                    cursor.execute(
-                        f"INSERT INTO {selected_table} VALUES ({placeholders})", 
-                        values
-                    )
-                    connection.commit()
-                    update_terminal_output(f"Added record: {values}")
+                info.convert_row(values)  # Refuse bad input before anything is sent
+            except ValueError as e:
+                update_terminal_output(str(e), logging.WARNING)
+                return
+            if batch_mode.get():
+                if stage(lambda: batch.stage_insert(values)):
                     add_window.destroy()
-                    manage_window.destroy()  # Close the current manage window
-                    manage_entries(selected_table)  # Reopen the manage entries window
-                except cx_Oracle.DatabaseError as e:
-                    update_terminal_output(f"Error adding record: {e}")
+                return
 
-            add_button = ctk.CTkButton(add_window, text="Add Record", command=add_record)
-            add_button.pack(pady=10)
+            def add():
+                with borrow_connection() as connection:
+                    cursor = connection.cursor()
+                    key, row = records.insert(cursor, selected_table, info.data_column_names, values, info=info)
+                    connection.commit()
+                invalidate_cache(selected_table)
+                index_change(None, key, row)
+                return key, row
+
+            def added(result):
+                key, row = result
+                update_terminal_output(f"Added record: {row}")
+                add_window.destroy()
+                show_change(None, key, row)
+
+            job_runner.submit("add record", add, on_done=added,
+                              on_error=lambda e: update_terminal_output(f"Error adding record: {e}", logging.ERROR))
+
+        add_button = ctk.CTkButton(add_window, text="Add Record", command=add_record)
+        add_button.pack(pady=10)
+
+    add_button = ctk.CTkButton(manage_window, text="Add Record", command=open_add_entry_window, height=40, width=200)
+    add_button.pack(pady=5)
+
+    # Batch edit: Modify, Remove and Add stage their change, Preview Batch shows the diff and
+    # applies everything in one transaction (batch_edit.py)
+    batch = batch_edit.EditBatch(selected_table, info)
+    batch_state = {"applying": False, "failed": []}  # failed: change numbers the last apply reported
+    batch_mode = ctk.BooleanVar(value=False)
+    batch_frame = ctk.CTkFrame(manage_window)
+    batch_frame.pack(pady=5)
+    ctk.CTkCheckBox(batch_frame, text="Batch edit (stage changes)", variable=batch_mode).pack(side="left", padx=5)
+    batch_label = ctk.CTkLabel(batch_frame, text="0 staged changes", width=150)
+    batch_label.pack(side="left", padx=5)
+
+    def stage(add_change):
+        """Stage a change through add_change(); returns whether it was staged."""
+        if batch_state["applying"]:
+            update_terminal_output("The staged batch is being applied, wait for it to finish.", logging.WARNING)
+            return False
+        try:
+            add_change()
+        except ValueError as e:
+            update_terminal_output(f"Not staged: {e}", logging.WARNING)
+            return False
+        show_staged()
+        return True
+
+    def show_staged():
+        batch_label.configure(text=f"{len(batch)} staged changes")
+
+    def discard_batch():
+        if batch_state["applying"]:
+            update_terminal_output("The staged batch is being applied, wait for it to finish.", logging.WARNING)
+            return
+        batch.clear()
+        batch_state["failed"] = []
+        show_staged()
+
+    def drop_failed():
+        """Unstage the changes the last apply reported, keeping the rest for another try."""
+        if batch_state["applying"] or not batch_state["failed"]:
+            update_terminal_output("No failed changes to drop.")
+            return
+        batch.drop(batch_state["failed"])
+        update_terminal_output(f"Dropped {len(batch_state['failed'])} failed changes, {len(batch)} still staged.")
+        batch_state["failed"] = []
+        show_staged()
+
+    def open_batch_preview():
+        """Show the staged changes against the stored rows, with Apply and Discard."""
+        if not len(batch):
+            update_terminal_output("No staged changes to preview.")
+            return
 
-        add_button = ctk.CTkButton(manage_window, text="Add Record", command=open_add_entry_window, height=40, width=200)
-        add_button.pack(pady=5)
+        def read_preview():
+            with borrow_connection() as connection:
+                return batch.preview(connection.cursor())
+
+        job_runner.submit("preview batch", read_preview, on_done=show_batch_preview,
+                          on_error=lambda e: update_terminal_output(f"Error previewing batch: {e}", logging.ERROR))
+
+    def show_batch_preview(preview):
+        lines, missing = preview
+        preview_window = ctk.CTkToplevel()
+        preview_window.title(f"Staged Changes to {selected_table}")
+        preview_window.geometry("900x500")
+        preview_window.focus_force()
+        preview_text = ctk.CTkTextbox(preview_window, font=("Courier", 11), wrap="none")
+        preview_text.pack(fill="both", expand=True, padx=10, pady=10)
+        summary = f"{len(batch)} changes: - removed, ~ modified, + added"
+        if missing:
+            summary += f"; {missing} rows no longer exist, applying will fail"
+        preview_text.insert(tk.END, summary + "\n\n" + "\n".join(lines))
+
+        def apply_batch():
+            preview_window.destroy()
+            start_batch()
+
+        def discard():
+            preview_window.destroy()
+            discard_batch()
+
+        controls = ctk.CTkFrame(preview_window)
+        controls.pack(pady=(0, 10))
+        ctk.CTkButton(controls, text="Apply All", command=apply_batch, width=150).pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Discard All", command=discard, width=150).pack(side="left", padx=5)
+
+    def start_batch():
+        batch_state["applying"] = True
+        job_runner.submit("apply batch", run_batch, on_done=batch_applied, on_error=batch_failed)
+
+    def run_batch():
+        """Apply the staged batch in one transaction (runs on a worker thread)."""
+        with borrow_connection() as connection:
+            results, errors = batch.apply(connection, backend.dialect)
+        if not errors:
+            invalidate_cache(selected_table)
+            for old_key, key, row in results:
+                index_change(old_key, key, row)
+        return results, errors
+
+    def batch_applied(outcome):
+        results, errors = outcome
+        batch_state["applying"] = False
+        if errors:
+            staged = batch.changes()
+            for number, message in errors[:MAX_REPORTED_ERRORS]:
+                kind, key, values = staged[number - 1]
+                update_terminal_output(f"Change {number} ({kind} {key if key is not None else tuple(values)}): {message}",
+                                       logging.ERROR)
+            if len(errors) > MAX_REPORTED_ERRORS:
+                update_terminal_output(f"... and {len(errors) - MAX_REPORTED_ERRORS} more failed changes", logging.ERROR)
+            batch_state["failed"] = [number for number, message in errors]
+            update_terminal_output(f"Batch rolled back, nothing was changed ({len(errors)} of {len(batch)} changes failed). "
+                                   f"Drop Failed unstages them, or stage corrections and apply again.", logging.ERROR)
+            return
+        update_terminal_output(f"Applied {len(results)} changes to {selected_table} in one transaction.")
+        discard_batch()
+        table_grid.refresh()
+
+    def batch_failed(e):
+        batch_state["applying"] = False
+        if isinstance(e, records.ConflictError) and e.key in batch.seen:
+            # Retry applies the staged change to the record as it is now, Keep Theirs unstages it
+            key = e.key
+
+            def keep_theirs():
+                batch.unstage(key)
+                show_staged()
+                update_terminal_output(f"Unstaged the change to {key}, {len(batch)} still staged.")
+
+            update_terminal_output("Batch rolled back, nothing was changed.", logging.WARNING)
+            open_conflict_window(key, batch.seen[key], e.row, batch.updates.get(key),
+                                 on_retry=lambda: (batch.rebase(key, e.row), start_batch()), on_keep=keep_theirs)
+            return
+        update_terminal_output(f"Error applying batch, nothing was changed: {e}", logging.ERROR)
 
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error fetching data from table {selected_table}: {e}")
+    ctk.CTkButton(batch_frame, text="Preview Batch", command=open_batch_preview, width=150).pack(side="left", padx=5)
+    ctk.CTkButton(batch_frame, text="Drop Failed", command=drop_failed, width=120).pack(side="left", padx=5)
+    ctk.CTkButton(batch_frame, text="Discard Batch", command=discard_batch, width=120).pack(side="left", padx=5)
 
 def search_tables():
     """Search specific tables for the term in the search field."""
@@ -609,96 +1074,357 @@ def search_tables():
     if not search_term:
         update_terminal_output("Please enter a search term.")
         return
-    
-    # List of tables to search
-    tables = [
-        "InventoryProduct",
-        "Transactions",
-        "InventoryCustomer",
-        "Rentals",
-        "Customer",
-        "Movie",
-        "Music",
-        "ProductSupplier",
-        "Inventory",
-        "Product",
-        "Supplier",
-    ]
+    if backend is None:
+        update_terminal_output("Connect to the database first.", logging.WARNING)
+        return
 
+    # The popup opens right away and every table's matches are added as they arrive
+    popup = ctk.CTkToplevel()
+    popup.title(f"Search Results for '{search_term}'")
+    popup.geometry("800x600")
+    status = ctk.CTkLabel(popup, text="Searching...", font=("Arial", 12))
+    status.pack(anchor="w", padx=10, pady=(10, 0))
+    scrollable_frame = ctk.CTkScrollableFrame(popup, width=750, height=550)
+    scrollable_frame.pack(pady=10, padx=10, fill="both", expand=True)
+    matched = []
+
+    def show_match(table_name, formatted_table):
+        if not popup.winfo_exists():
+            return  # Closed while the search was running
+        matched.append(table_name)
+        header_label = ctk.CTkLabel(scrollable_frame, text=f"Found Entry in Table: {table_name}", font=("Arial", 14, "bold"))
+        header_label.pack(anchor="w", pady=5)
+        result_label = ctk.CTkLabel(scrollable_frame, text=formatted_table, font=("Courier", 10))
+        result_label.pack(anchor="w", pady=5)
+        status.configure(text=f"Searching... matches in {len(matched)} tables")
+
+    def search_done(result):
+        searched, late = result
+        summary = f"Matches in {len(matched)} of {len(searched)} tables searched" if matched else "No matching records found"
+        if late:
+            summary += f"; {', '.join(late)} didn't answer within {SEARCH_DEADLINE}s"
+        if popup.winfo_exists():
+            status.configure(text=summary)
+        update_terminal_output(f"Search completed for term: {search_term} ({summary})")
+
+    def search_failed(e):
+        if popup.winfo_exists():
+            status.configure(text=f"Search failed: {e}")
+        update_terminal_output(f"Error during search: {e}", logging.ERROR)
+
+    job_runner.submit(
+        "search_tables",
+        find_matches,
+        search_term,
+        lambda table_name, formatted_table: job_runner.call_on_ui(show_match, table_name, formatted_table),
+        on_done=search_done,
+        on_error=search_failed
+    )
+
+
+def find_matches(search_term, on_match):
+    """Search every table at once and pass (table name, formatted matches) to on_match as
+    each table answers (runs on a worker thread); returns (tables searched, tables past the deadline).
+    """
+    def found(table_name, result):
+        columns, matching_rows, truncated = result
+        # If there are matching rows, format them as a table (still off the Tk thread)
+        if matching_rows:
+            formatted_table = tabulate(matching_rows, headers=columns, tablefmt="grid")
+            if truncated:
+                formatted_table += f"\n(showing first {len(matching_rows)} matches)"
+            on_match(table_name, formatted_table)
+
+    # The database filters each table on its text columns, several tables at a time
+    job_runner.report("searching")
+    searched, late, errors = search.search_all(
+        require_backend(), search_term, found, workers=SEARCH_WORKERS, deadline=SEARCH_DEADLINE,
+        cache=query_cache, index=search_index, cancelled=job_runner.is_cancelled)
+    for table_name, e in errors:
+        update_terminal_output(f"Error querying table {table_name}: {e}", logging.ERROR)
+    return searched, late
+
+def rebuild_search_index():
+    """Rebuild the in-memory search index from scratch in the background."""
+    if search_index is None:
+        return
+    job_runner.submit("rebuild_search_index", build_search_index)
+
+def build_search_index():
+    """Rebuild the in-memory search index from scratch (runs on a worker thread)."""
+    if search_index is None:
+        return
     try:
-        # List to store results
-        results = []
+        with borrow_connection() as connection:
+            cursor = connection.cursor()
+            search_index.rebuild(cursor)
+            size_mb = search_index.size_bytes() / (1024 * 1024)
+            update_terminal_output(f"Search index built for {len(search_index.indexes)} tables ({size_mb:.1f} MB).")
+            if search_index.skipped:
+                update_terminal_output(f"Not indexed (searched in the DB instead): {', '.join(search_index.skipped)}")
+    except backends.DatabaseError as e:
+        search_index.clear()
+        update_terminal_output(f"Error building search index: {e}", logging.ERROR)
+
+def open_rental_desk():
+    """Window for checking copies out to a customer and back in, each in one transaction."""
+    desk = ctk.CTkToplevel()
+    desk.title("Rental Desk")
+    desk.geometry("520x330")
+
+    ctk.CTkLabel(desk, text="Customer ID:").grid(row=0, column=0, padx=10, pady=(15, 5), sticky="w")
+    customer_entry = ctk.CTkEntry(desk, width=300)
+    customer_entry.grid(row=0, column=1, padx=10, pady=(15, 5))
+    ctk.CTkLabel(desk, text="Product IDs:").grid(row=1, column=0, padx=10, pady=5, sticky="w")
+    products_entry = ctk.CTkEntry(desk, width=300, placeholder_text="e.g. 12, 12, 40 (two copies of 12)")
+    products_entry.grid(row=1, column=1, padx=10, pady=5)
+
+    def check_out():
+        try:
+            customer_id = int(customer_entry.get())
+            product_ids = rentals.parse_ids(products_entry.get())
+        except ValueError:
+            update_terminal_output("Enter a numeric customer ID.", logging.WARNING)
+            return
+        except rentals.RentalError as e:
+            update_terminal_output(str(e), logging.WARNING)
+            return
+        job_runner.submit("rental_checkout", run_checkout, customer_id, product_ids)
 
-        # Loop through all tables and search for the term
-        for table_name in tables:
-            try:
-                # Query all records from the table
-                query = f"SELECT * FROM {table_name}"
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-
-                # Filter rows that contain the search term
-                matching_rows = []
-                for row in rows:
-                    for value in row:
-                        # If the value is a string and contains the search term, add the row to the matching_rows list
-                        if isinstance(value, str) and search_term.lower() in value.lower():
-                            matching_rows.append(row)
-                            break  # No need to search further in this row, move to the next one
-
-                # If there are matching rows, format them as a table
-                if matching_rows:
-                    formatted_table = tabulate(matching_rows, headers=columns, tablefmt="grid")
-                    results.append((table_name, formatted_table))
-
-            except cx_Oracle.DatabaseError as e:
-                update_terminal_output(f"Error querying table {table_name}: {e}")
-
-        # If no results found, display message
-        if not results:
-            update_terminal_output(f"No matching records found for '{search_term}'.")
+    ctk.CTkButton(desk, text="Check Out", command=check_out, height=40, width=200).grid(row=2, column=1, pady=10)
+
+    ctk.CTkLabel(desk, text="Copies (Inventory IDs):").grid(row=3, column=0, padx=10, pady=(25, 5), sticky="w")
+    copies_entry = ctk.CTkEntry(desk, width=300)
+    copies_entry.grid(row=3, column=1, padx=10, pady=(25, 5))
+
+    def check_in():
+        try:
+            inventory_ids = rentals.parse_ids(copies_entry.get())
+        except rentals.RentalError as e:
+            update_terminal_output(str(e), logging.WARNING)
             return
+        job_runner.submit("rental_return", run_return, inventory_ids)
 
-        # Create a new window to display the results
-        popup = ctk.CTkToplevel()
-        popup.title(f"Search Results for '{search_term}'")
-        popup.geometry("800x600")
+    ctk.CTkButton(desk, text="Return", command=check_in, height=40, width=200).grid(row=4, column=1, pady=10)
 
-        # Add results to the popup window
-        scrollable_frame = ctk.CTkScrollableFrame(popup, width=750, height=550)
-        scrollable_frame.pack(pady=10, padx=10, fill="both", expand=True)
 
-        for table_name, formatted_table in results:
-            header_label = ctk.CTkLabel(scrollable_frame, text=f"Found Entry in Table: {table_name}", font=("Arial", 14, "bold"))
-            header_label.pack(anchor="w", pady=5)
+def run_checkout(customer_id, product_ids):
+    """Check copies out to a customer (runs on a worker thread)."""
+    update_terminal_output("\n----- EXECUTING rental_checkout -----")
+    try:
+        result = rentals.checkout(require_backend(), rental_keys, customer_id, product_ids)
+    except (rentals.RentalError,) + backends.DatabaseError as e:
+        update_terminal_output(f"Checkout refused: {e}", logging.ERROR)
+        return
+    finally:
+        invalidate_cache(*rentals.TABLES_WRITTEN)
+    copies = ", ".join(f"{inventory_id} (product {product_id})" for product_id, inventory_id in result["copies"])
+    update_terminal_output(f"Rental {result['rental_id']} for customer {customer_id}: copies {copies}, "
+                           f"{result['amount']:.2f} charged, due back {result['due']}.")
+    refresh_products({product_id for product_id, inventory_id in result["copies"]})
+
 
-            result_label = ctk.CTkLabel(scrollable_frame, text=formatted_table, font=("Courier", 10))
-            result_label.pack(anchor="w", pady=5)
+def run_return(inventory_ids):
+    """Check rented copies back in (runs on a worker thread)."""
+    update_terminal_output("\n----- EXECUTING rental_return -----")
+    try:
+        result = rentals.return_copies(require_backend(), inventory_ids)
+    except (rentals.RentalError,) + backends.DatabaseError as e:
+        update_terminal_output(f"Return refused: {e}", logging.ERROR)
+        return
+    finally:
+        invalidate_cache(*rentals.TABLES_WRITTEN)
+    update_terminal_output(f"Returned {result['copies']} copies, {result['rentals_closed']} rentals closed.")
+    refresh_products(result["products"])
 
-        update_terminal_output(f"Search completed for term: {search_term}")
 
-    except cx_Oracle.DatabaseError as e:
-        update_terminal_output(f"Error during search: {e}")
+def refresh_products(product_ids):
+    """Re-read Product rows whose stock changed into the search index."""
+    if search_index is None:
+        return
+    with borrow_connection() as connection:
+        cursor = connection.cursor()
+        for product_id in product_ids:
+            search_index.refresh_row(cursor, "Product", product_id)
 
-def update_terminal_output(message):
-    """Update the terminal output (console window)."""
-    terminal_output.insert(tk.END, message + '\n')
-    terminal_output.yview(tk.END)
+
+def open_reports_window():
+    """Dashboard of the store reports, brought up to date from the change log when opened (reports.py)."""
+    if backend is None:
+        update_terminal_output("Connect to the database first.", logging.WARNING)
+        return
+    reports_window = ctk.CTkToplevel()
+    reports_window.title("Reports")
+    reports_window.geometry("1000x700")
+
+    reports_text = ctk.CTkTextbox(reports_window, font=("Courier", 11), wrap="none")
+    reports_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def read_reports(rebuild):
+        """Refresh the summaries and read the dashboard (runs on a worker thread)."""
+        with borrow_connection() as connection:
+            rebuilt = reports.refresh(connection, backend.dialect, rebuild=rebuild)
+            sections = reports.dashboard(connection.cursor(), dialect=backend.dialect)
+        if rebuilt:
+            update_terminal_output(f"Reports rebuilt from scratch: {', '.join(rebuilt)}")
+        return "\n\n".join(f"{title}\n{tabulate(rows, headers=columns) if rows else '(none)'}"
+                           for title, columns, rows in sections)
+
+    def show(text):
+        if reports_window.winfo_exists():
+            reports_text.delete("1.0", tk.END)
+            reports_text.insert(tk.END, text + "\n")
+
+    def load(rebuild=False):
+        job_runner.submit("reports", read_reports, rebuild, on_done=show,
+                          on_error=lambda e: update_terminal_output(f"Error reading reports: {e}", logging.ERROR))
+
+    buttons = ctk.CTkFrame(reports_window)
+    buttons.pack(pady=(0, 10))
+    ctk.CTkButton(buttons, text="Refresh", command=load).pack(side="left", padx=5)
+    ctk.CTkButton(buttons, text="Rebuild", command=lambda: load(rebuild=True)).pack(side="left", padx=5)
+    load()
+
+
+def open_wishlist_window():
+    """Customers whose wishlist item is back in stock, found from the change log when opened (wishlist.py)."""
+    if backend is None:
+        update_terminal_output("Connect to the database first.", logging.WARNING)
+        return
+    wishlist_window = ctk.CTkToplevel()
+    wishlist_window.title("Wishlist Notices")
+    wishlist_window.geometry("1000x600")
+
+    notices_text = ctk.CTkTextbox(wishlist_window, font=("Courier", 11), wrap="none")
+    notices_text.pack(fill="both", expand=True, padx=10, pady=10)
+    shown = []  # [(CustomerID, ProductID)] of the notices listed
+
+    def read_notices(rebuild):
+        """Apply the product and customer changes, then read the notices (runs on a worker thread)."""
+        with borrow_connection() as connection:
+            rebuilt, notices = wishlist.refresh(connection, backend.dialect, rebuild=rebuild)
+            columns, rows = wishlist.pending(connection.cursor(), dialect=backend.dialect)
+        if rebuilt:
+            update_terminal_output("Wishlist matches rebuilt from scratch.")
+        if notices:
+            update_terminal_output(f"{len(notices)} new wishlist notices.")
+        return columns, rows
+
+    def show(found):
+        columns, rows = found
+        if not wishlist_window.winfo_exists():
+            return
+        shown[:] = [(row[1], row[4]) for row in rows]  # CustomerID, ProductID
+        notices_text.delete("1.0", tk.END)
+        notices_text.insert(tk.END, (tabulate(rows, headers=columns) if rows else "No customers to notify.") + "\n")
+
+    def failed(e):
+        update_terminal_output(f"Error reading wishlist notices: {e}", logging.ERROR)
+
+    def load(rebuild=False):
+        job_runner.submit("wishlist notices", read_notices, rebuild, on_done=show, on_error=failed)
+
+    def mark_notified():
+        """Drop the notices listed, once the customers have been told."""
+        if not shown:
+            return
+
+        def dismiss(notices):
+            with borrow_connection() as connection:
+                wishlist.dismiss(connection, notices)
+            return read_notices(False)
+
+        job_runner.submit("dismiss wishlist notices", dismiss, list(shown), on_done=show, on_error=failed)
+
+    buttons = ctk.CTkFrame(wishlist_window)
+    buttons.pack(pady=(0, 10))
+    ctk.CTkButton(buttons, text="Refresh", command=load).pack(side="left", padx=5)
+    ctk.CTkButton(buttons, text="Mark Notified", command=mark_notified).pack(side="left", padx=5)
+    ctk.CTkButton(buttons, text="Rebuild", command=lambda: load(rebuild=True)).pack(side="left", padx=5)
+    load()
+
+
+def open_timings_window():
+    """Show the slowest statements and the time spent per operation, refreshed while open."""
+    if tracer is None:
+        update_terminal_output("Query tracing is off (TRACE_QUERIES = False).")
+        return
+    timings_window = ctk.CTkToplevel()
+    timings_window.title("Query Timings")
+    timings_window.geometry("1100x650")
+
+    timings_text = ctk.CTkTextbox(timings_window, font=("Courier", 11), wrap="none")
+    timings_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def refresh():
+        if not timings_window.winfo_exists():
+            return
+        operations = tabulate(
+            [(name, count, f"{elapsed:.1f}", rows, trips) for name, count, elapsed, rows, trips in tracer.by_operation()],
+            headers=["Operation", "Statements", "Total ms", "Rows", "Round trips"])
+        slowest = tabulate(
+            [(f"{entry['elapsed_ms']:.1f}", entry["rows"], entry["round_trips"], entry["binds"], entry["operation"],
+              entry["sql"][:80]) for entry in tracer.slowest()],
+            headers=["ms", "Rows", "Trips", "Binds", "Operation", "SQL"])
+        position = timings_text.yview()[0]
+        cache = "Result cache: off"
+        if query_cache is not None:
+            stats = query_cache.stats()
+            cache = (f"Result cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+                     f"{stats['uncacheable']} uncacheable, {stats['entries']} entries ({stats['size_mb']:.1f} MB), "
+                     f"{stats['evictions']} evicted, {stats['invalidations']} invalidated")
+        timings_text.delete("1.0", tk.END)
+        timings_text.insert(tk.END, f"{cache}\n\nPer operation\n{operations}\n\nSlowest statements\n{slowest}\n")
+        timings_text.yview_moveto(position)
+        timings_window.after(TIMINGS_REFRESH_MS, refresh)
+
+    def export(extension):
+        path = filedialog.asksaveasfilename(parent=timings_window, defaultextension=extension,
+                                            filetypes=[(extension.upper()[1:], "*" + extension)])
+        if not path:
+            return
+        try:
+            if extension == ".json":
+                tracer.export_json(path)
+            else:
+                tracer.export_csv(path)
+            update_terminal_output(f"Query trace written to {path}")
+        except OSError as e:
+            update_terminal_output(f"Error writing query trace: {e}", logging.ERROR)
+
+    def profile_next_action():
+        job_runner.wrap_next(lambda name, work: query_trace.profiled(name, work, update_terminal_output))
+        update_terminal_output("The next action will run under cProfile, its profile is printed here.")
+
+    controls = ctk.CTkFrame(timings_window)
+    controls.pack(fill="x", padx=10, pady=(0, 10))
+    ctk.CTkButton(controls, text="Export JSON", command=lambda: export(".json"), width=120).pack(side="left", padx=5)
+    ctk.CTkButton(controls, text="Export CSV", command=lambda: export(".csv"), width=120).pack(side="left", padx=5)
+    ctk.CTkButton(controls, text="Clear", command=tracer.clear, width=120).pack(side="left", padx=5)
+    ctk.CTkButton(controls, text="Profile Next Action", command=profile_next_action, width=160).pack(side="left", padx=5)
+    refresh()
+
+def update_terminal_output(message, level=logging.INFO):
+    """Add a message to the terminal output (console window); safe to call from any thread."""
+    log.log(level, message)
 
 def update_status(message):
     """Update the status box with a final completion message."""
+    if not job_runner.on_ui_thread():
+        job_runner.call_on_ui(update_status, message)
+        return
     status_label.configure(text=message)
 
 def main():
     # Initialize GUI
-    global root, connect_button, status_label, cursor, connection, sql_text_area, terminal_output, selected_table
+    global root, connect_button, status_label, sql_text_area, terminal_output, selected_table, job_runner, tracer
     root = ctk.CTk()
 
     # Set window title and size
     root.title("Movie and Music Store Database")
-    root.geometry("1200x500")  # Fixed window size
-    root.resizable(False, False)  # Prevent resizing
+    # Status, the two text boxes, nine rows of buttons and the activity line
+    root.geometry("1200x820")
+    root.minsize(1200, 600)  # The text boxes keep their width; shorter screens can shrink the window
 
     # Configure grid layout
     root.grid_rowconfigure(0, weight=0)  # Top row fixed height
@@ -722,23 +1448,39 @@ def main():
     terminal_output.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="n")
     terminal_output.grid_propagate(False)  # Prevent resizing of the terminal box
 
+    # Messages reach the terminal box in batches, and optionally a log file
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.addHandler(TerminalLog(root, terminal_output, max_lines=LOG_MAX_LINES, flush_ms=LOG_FLUSH_MS, level=LOG_LEVEL))
+    if LOG_FILE:
+        log.addHandler(terminal_log.file_sink(LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS))
+
     # Custom SQL Text Area
     sql_text_area = ctk.CTkTextbox(root, width=600, height=200, corner_radius=10, border_width=2)
     sql_text_area.grid(row=1, column=1, padx=20, pady=(0, 10), sticky="n")
     sql_text_area.grid_propagate(False)  # Prevent resizing of the text area
 
+    # Runs database work on a worker thread so the window stays responsive
+    job_runner = JobRunner(
+        root,
+        workers=DB_WORKERS,
+        cancel_hook=cancel_running_query,
+        on_activity=lambda text: activity_label.configure(text=text),
+        on_failure=lambda e: update_terminal_output(f"Error: {e}", logging.ERROR)
+    )
+
     # Create the "Connect" button
     connect_button = ctk.CTkButton(root, text="Connect to DB", command=connect_to_db, height=40, width=200)
     connect_button.grid(row=2, column=0, pady=5)
 
     # Create buttons for actions
-    create_button = ctk.CTkButton(root, text="Create Tables", command=create_tables, height=40, width=200)
+    create_button = ctk.CTkButton(root, text="Create Tables", command=lambda: job_runner.submit("create_tables", create_tables), height=40, width=200)
     create_button.grid(row=3, column=0, pady=5)
 
-    drop_button = ctk.CTkButton(root, text="Drop Tables", command=drop_tables, height=40, width=200)
+    drop_button = ctk.CTkButton(root, text="Drop Tables", command=lambda: job_runner.submit("drop_tables", drop_tables), height=40, width=200)
     drop_button.grid(row=4, column=0, pady=5)
 
-    populate_button = ctk.CTkButton(root, text="Populate Tables", command=populate_tables, height=40, width=200)
+    populate_button = ctk.CTkButton(root, text="Populate Tables", command=lambda: job_runner.submit("populate_tables", populate_tables, timeout=POPULATE_TIMEOUT), height=40, width=200)
     populate_button.grid(row=5, column=0, pady=5)
     
     execute_sql_button = ctk.CTkButton(root, text="Execute SQL Command", command=execute_custom_sql, height=40, width=200)
@@ -773,6 +1515,45 @@ def main():
     select_table_button = ctk.CTkButton(root, text="Search", command=search_tables, height=40, width=200)
     select_table_button.grid(row=5, column=1, pady=5)  
 
+    rebuild_index_button = ctk.CTkButton(root, text="Rebuild Search Index", command=rebuild_search_index, height=40, width=200)
+    rebuild_index_button.grid(row=6, column=1, pady=5)
+
+    # Cancel whatever database job is running and show what the worker is doing
+    cancel_button = ctk.CTkButton(root, text="Cancel Running Job", command=job_runner.cancel, height=40, width=200)
+    cancel_button.grid(row=6, column=0, pady=5)
+
+    # Time every statement, grouped by the job that ran it
+    if TRACE_QUERIES:
+        tracer = query_trace.Tracer(TRACE_MAX_ENTRIES, operation_of=job_runner.current_job_name)
+    timings_button = ctk.CTkButton(root, text="Query Timings", command=open_timings_window, height=40, width=200)
+    timings_button.grid(row=7, column=0, pady=5)
+
+    # Next batch of the last custom SELECT
+    fetch_more_button = ctk.CTkButton(root, text="Fetch More Rows", command=fetch_more_custom_sql, height=40, width=200)
+    fetch_more_button.grid(row=7, column=1, pady=5)
+
+    # Stream the selected table to a file, and load files back (parents before children)
+    export_button = ctk.CTkButton(root, text="Export Table", command=lambda: export_table(table_selector.get()), height=40, width=200)
+    export_button.grid(row=8, column=0, pady=5)
+
+    import_button = ctk.CTkButton(root, text="Import Tables", command=import_tables, height=40, width=200)
+    import_button.grid(row=8, column=1, pady=5)
+
+    # Check copies out and back in, each as one transaction
+    rental_button = ctk.CTkButton(root, text="Rental Desk", command=open_rental_desk, height=40, width=200)
+    rental_button.grid(row=9, column=0, pady=5)
+
+    # Revenue, rentals and stock summaries kept up to date from the change log
+    reports_button = ctk.CTkButton(root, text="Reports", command=open_reports_window, height=40, width=200)
+    reports_button.grid(row=9, column=1, pady=5)
+
+    # Customers to call when a product they wished for is restocked
+    wishlist_button = ctk.CTkButton(root, text="Wishlist Notices", command=open_wishlist_window, height=40, width=200)
+    wishlist_button.grid(row=10, column=0, pady=5)
+
+    activity_label = ctk.CTkLabel(root, text="Idle", font=("Arial", 12))
+    activity_label.grid(row=11, column=0, columnspan=2, pady=(0, 5))
+
     # Start the GUI loop
     root.mainloop()
 
@@ -0,0 +1,278 @@
+# Schema metadata read from the database once at connect time
+# Column names, types, lengths, nullability, primary and foreign keys of every store table come
+# from the Oracle data dictionary (user_tab_columns, user_constraints) or SQLite's PRAGMAs.
+# Forms are built from it without querying the table, and the write paths (records.py,
+# batch_edit.py) convert entered text to the column's type before binding and declare the bind
+# types up front with setinputsizes(), so Oracle neither converts strings implicitly nor
+# re-parses a statement because a bind changed type or grew longer.
+#
+# declared() describes a table from schema.py instead, for tables the database doesn't have yet.
+
+import datetime
+import decimal
+import re
+
+import backends
+import schema
+
+KINDS = ("INT", "DECIMAL", "DATE", "VARCHAR")
+
+
+def parse_date(value):
+    """ISO date, or date and time as exported from Oracle DATE columns."""
+    if len(value) == 10:
+        return datetime.date.fromisoformat(value)
+    return datetime.datetime.fromisoformat(value)
+
+
+# Text to value, per column kind
+CONVERTERS = {
+    "INT": int,
+    "DECIMAL": lambda value: decimal.Decimal(str(value)),  # str() first so JSON floats keep their digits
+    "DATE": parse_date,
+    "VARCHAR": str,
+}
+
+# Oracle VARCHAR2 binds without a declared length
+DEFAULT_VARCHAR_SIZE = 4000
+
+
+class Column:
+    """One column: its kind (INT, DECIMAL, DATE or VARCHAR), limits and nullability."""
+
+    def __init__(self, name, kind, nullable=True, length=None, precision=None, scale=None):
+        self.name = name
+        self.kind = kind
+        self.nullable = nullable
+        self.length = length  # VARCHAR characters
+        self.precision = precision  # DECIMAL digits, of which `scale` after the point
+        self.scale = scale
+
+    def describe(self):
+        """Type as shown next to form fields, e.g. DECIMAL(10, 2) or DATE (YYYY-MM-DD)."""
+        if self.kind == "VARCHAR" and self.length:
+            return f"VARCHAR({self.length})"
+        if self.kind == "DECIMAL" and self.precision:
+            return f"DECIMAL({self.precision}, {self.scale or 0})"
+        if self.kind == "DATE":
+            return "DATE (YYYY-MM-DD)"
+        return self.kind
+
+    def convert(self, text):
+        """Typed value of entered text ('' is NULL); raises ValueError when it can't be stored."""
+        if text is None or (isinstance(text, str) and not text.strip()):
+            if not self.nullable:
+                raise ValueError(f"{self.name} is required")
+            return None
+        if not isinstance(text, str):
+            return text  # Already typed
+        try:
+            value = CONVERTERS[self.kind](text if self.kind == "VARCHAR" else text.strip())
+        except (ArithmeticError, ValueError):
+            raise ValueError(f"{self.name} expects {self.describe()}, got {text!r}") from None
+        if self.kind == "VARCHAR" and self.length and len(value) > self.length:
+            raise ValueError(f"{self.name} holds at most {self.length} characters, got {len(value)}")
+        if self.kind == "DECIMAL" and self.precision and abs(value) >= 10 ** (self.precision - (self.scale or 0)):
+            raise ValueError(f"{self.name} is too large for {self.describe()}")
+        return value
+
+    def input_size(self):
+        """Bind type for cx_Oracle's setinputsizes()."""
+        if self.kind == "VARCHAR":
+            return self.length or DEFAULT_VARCHAR_SIZE
+        if self.kind == "DATE":
+            return backends.cx_Oracle.DATETIME
+        return backends.cx_Oracle.NUMBER
+
+
+class TableInfo:
+    """Columns (in table order), primary key and foreign keys of one table."""
+
+    def __init__(self, name, columns, primary_key, foreign_keys, dialect=None):
+        self.name = name
+        self.columns = columns
+        self.primary_key = primary_key
+        self.foreign_keys = foreign_keys  # [(column, parent table, parent column)]
+        self.dialect = dialect  # backend the metadata was read from, None when declared()
+        self.by_name = {column.name.upper(): column for column in columns}
+        # Row version column (schema.VERSION_COLUMN), None when the table has none
+        self.version = self.by_name.get(schema.VERSION_COLUMN.upper())
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    @property
+    def data_columns(self):
+        """The columns a user enters and edits: all but the row version."""
+        return [column for column in self.columns if column is not self.version]
+
+    @property
+    def data_column_names(self):
+        return [column.name for column in self.data_columns]
+
+    def version_of(self, row):
+        """Row version of a SELECT * row, None when the table has no version column."""
+        if self.version is None or row is None:
+            return None
+        return row[self.columns.index(self.version)]
+
+    def column(self, name):
+        """Column by name, ignoring case."""
+        try:
+            return self.by_name[name.upper()]
+        except KeyError:
+            raise ValueError(f"{self.name} has no column {name}") from None
+
+    def convert(self, name, text):
+        return self.column(name).convert(text)
+
+    def convert_row(self, texts):
+        """Typed values of one entered row, in data column order."""
+        return [column.convert(text) for column, text in zip(self.data_columns, texts)]
+
+    def declare_binds(self, cursor, columns=None, **named):
+        """Declare bind types before execute: positional binds for `columns` (the data columns by default),
+        or named binds given as bind name=column name. Does nothing on SQLite.
+        """
+        if self.dialect != "oracle":
+            return
+        if named:
+            cursor.setinputsizes(**{bind: self.column(name).input_size() for bind, name in named.items()})
+        else:
+            cursor.setinputsizes(*[self.column(name).input_size() for name in (columns or self.data_column_names)])
+
+
+# Reading the metadata
+
+SQLITE_TYPE = re.compile(r"^\s*(\w+)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?", re.IGNORECASE)
+
+
+def _sqlite_kind(declared_type):
+    """(kind, length, precision, scale) of a SQLite declared type such as VARCHAR(255)."""
+    match = SQLITE_TYPE.match(declared_type or "")
+    name = match.group(1).upper() if match else ""
+    size = int(match.group(2)) if match and match.group(2) else None
+    scale = int(match.group(3)) if match and match.group(3) else 0
+    if "INT" in name:
+        return "INT", None, None, None
+    if name in ("DECIMAL", "NUMERIC", "NUMBER", "REAL", "FLOAT", "DOUBLE"):
+        return "DECIMAL", None, size, scale
+    if name in ("DATE", "DATETIME", "TIMESTAMP"):
+        return "DATE", None, None, None
+    return "VARCHAR", size, None, None
+
+
+def _oracle_kind(data_type, char_length, precision, scale):
+    if data_type == "NUMBER":
+        if scale == 0:
+            return "INT", None, None, None
+        return "DECIMAL", None, precision, scale
+    if data_type == "DATE" or data_type.startswith("TIMESTAMP"):
+        return "DATE", None, None, None
+    return "VARCHAR", char_length or None, None, None
+
+
+def _canonical(table_name, column_name):
+    """Column name as written in schema.py (Oracle reports them upper-case)."""
+    for declared, kind in schema.COLUMN_TYPES.get(table_name, []):
+        if declared.upper() == column_name.upper():
+            return declared
+    return column_name
+
+
+def load(cursor, dialect="oracle"):
+    """{table name: TableInfo} of the store tables that exist in the database."""
+    if dialect == "sqlite":
+        return _load_sqlite(cursor)
+    return _load_oracle(cursor)
+
+
+def _load_sqlite(cursor):
+    tables = {}
+    for table_name in schema.TABLES:
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        rows = cursor.fetchall()
+        if not rows:
+            continue  # Not created
+        columns = []
+        key = []
+        for position, name, declared_type, not_null, default, key_position in rows:
+            kind, length, precision, scale = _sqlite_kind(declared_type)
+            name = _canonical(table_name, name)
+            columns.append(Column(name, kind, not (not_null or key_position), length, precision, scale))
+            if key_position:
+                key.append((key_position, name))
+        cursor.execute(f"PRAGMA foreign_key_list({table_name})")
+        foreign_keys = []
+        for row in cursor.fetchall():
+            parent = next((t for t in schema.TABLES if t.upper() == row[2].upper()), row[2])
+            foreign_keys.append((_canonical(table_name, row[3]), parent, _canonical(parent, row[4] or "")))
+        tables[table_name] = TableInfo(table_name, columns, [name for position, name in sorted(key)],
+                                       foreign_keys, "sqlite")
+    return tables
+
+
+def _load_oracle(cursor):
+    store = {table_name.upper(): table_name for table_name in schema.TABLES}
+    in_list = ", ".join(f":t{i}" for i in range(len(store)))
+    binds = {f"t{i}": name for i, name in enumerate(store)}
+
+    columns = {}
+    cursor.execute(f"SELECT table_name, column_name, data_type, char_length, data_precision, data_scale, nullable "
+                   f"FROM user_tab_columns WHERE table_name IN ({in_list}) ORDER BY table_name, column_id", binds)
+    for table, name, data_type, char_length, precision, scale, nullable in cursor.fetchall():
+        kind, length, precision, scale = _oracle_kind(data_type, char_length, precision, scale)
+        table_name = store[table]
+        columns.setdefault(table_name, []).append(
+            Column(_canonical(table_name, name), kind, nullable == "Y", length, precision, scale))
+
+    keys = {}
+    foreign_keys = {}
+    cursor.execute(f"SELECT c.table_name, c.constraint_type, cc.column_name, r.table_name, rc.column_name "
+                   f"FROM user_constraints c "
+                   f"JOIN user_cons_columns cc ON cc.constraint_name = c.constraint_name "
+                   f"LEFT JOIN user_constraints r ON r.constraint_name = c.r_constraint_name "
+                   f"LEFT JOIN user_cons_columns rc ON rc.constraint_name = c.r_constraint_name "
+                   f"AND rc.position = cc.position "
+                   f"WHERE c.constraint_type IN ('P', 'R') AND c.table_name IN ({in_list}) "
+                   f"ORDER BY c.table_name, c.constraint_name, cc.position", binds)
+    for table, constraint_type, name, parent, parent_column in cursor.fetchall():
+        table_name = store[table]
+        if constraint_type == "P":
+            keys.setdefault(table_name, []).append(_canonical(table_name, name))
+        else:
+            parent = store.get(parent, parent)
+            foreign_keys.setdefault(table_name, []).append(
+                (_canonical(table_name, name), parent, _canonical(parent, parent_column)))
+
+    tables = {}
+    for table_name, table_columns in columns.items():
+        key = keys.get(table_name, [])
+        for column in table_columns:
+            if column.name in key:
+                column.nullable = False
+        tables[table_name] = TableInfo(table_name, table_columns, key, foreign_keys.get(table_name, []), "oracle")
+    return tables
+
+
+DECLARED_COLUMN = re.compile(r"^\s*(\w+)\s+(INT|VARCHAR|DECIMAL|DATE)\b(?:\((\d+)(?:,\s*(\d+))?\))?(.*)$",
+                             re.IGNORECASE | re.MULTILINE)
+
+
+def declared(table_name):
+    """TableInfo of a table as schema.py declares it."""
+    sql = next(sql for sql in schema.CREATE_SQL if re.search(rf"CREATE TABLE {table_name}\b", sql))
+    key = schema.PRIMARY_KEYS[table_name]
+    columns = []
+    for name, kind, size, scale, rest in DECLARED_COLUMN.findall(sql):
+        kind = kind.upper()
+        rest = rest.upper()
+        nullable = "NOT NULL" not in rest and "PRIMARY KEY" not in rest and name not in key
+        columns.append(Column(name, kind, nullable,
+                              length=int(size) if size and kind == "VARCHAR" else None,
+                              precision=int(size) if size and kind == "DECIMAL" else None,
+                              scale=int(scale) if scale else (0 if kind == "DECIMAL" and size else None)))
+    foreign_keys = [(column, parent, schema.PRIMARY_KEYS[parent][0])
+                    for child, column, parent in schema.FOREIGN_KEYS if child == table_name]
+    return TableInfo(table_name, columns, list(key), foreign_keys)
@@ -0,0 +1,96 @@
+# Keyset pagination queries for the manage_entries grid
+# A page is read by continuing after the last row shown, ordered by (sort column, primary key),
+# so reading page 1000 costs the same as reading page 1 and no COUNT(*) is ever needed.
+
+import schema
+import search
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def order_columns(table_name, sort_column=None):
+    """Columns that define the page order: the sort column first, then the rest of the key."""
+    primary_key = schema.PRIMARY_KEYS[table_name]
+    if not sort_column:
+        return list(primary_key)
+    return [sort_column] + [column for column in primary_key if column.upper() != sort_column.upper()]
+
+
+def _after_predicate(columns, op, start):
+    """(c0 op :k0 OR (c0 = :k0 AND (c1 op :k1 OR ...))) over non-null key columns."""
+    column = columns[0]
+    if len(columns) == 1:
+        return f"{column} {op} :k{start}"
+    rest = _after_predicate(columns[1:], op, start + 1)
+    return f"({column} {op} :k{start} OR ({column} = :k{start} AND {rest}))"
+
+
+def build_page_query(table_name, after=None, sort_column=None, descending=False,
+                     filter_column=None, filter_value=None, page_size=DEFAULT_PAGE_SIZE, dialect="oracle"):
+    """Build the SELECT for one page and its binds.
+
+    `after` holds the order column values of the last row of the previous page (see order_columns).
+    The sort column may contain NULLs, they are always placed last.
+    One extra row is requested so the caller knows whether a next page exists.
+    """
+    columns = order_columns(table_name, sort_column)
+    op = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+    nullable_sort = bool(sort_column) and sort_column.upper() not in [c.upper() for c in schema.PRIMARY_KEYS[table_name]]
+
+    conditions = []
+    binds = {}
+
+    if filter_column and filter_value:
+        if filter_column.upper() in [c.upper() for c in search.TEXT_COLUMNS.get(table_name, [])]:
+            conditions.append(f"LOWER({filter_column}) LIKE :filter ESCAPE '\\'")
+            binds["filter"] = search.like_pattern(filter_value)
+        else:
+            conditions.append(f"{filter_column} = :filter")
+            binds["filter"] = filter_value
+
+    if after is not None:
+        for i, value in enumerate(after):
+            binds[f"k{i}"] = value
+        if nullable_sort:
+            rest = _after_predicate(columns[1:], op, 1)
+            if after[0] is None:
+                del binds["k0"]
+                conditions.append(f"({columns[0]} IS NULL AND {rest})")
+            else:
+                conditions.append(f"({columns[0]} {op} :k0 OR {columns[0]} IS NULL OR ({columns[0]} = :k0 AND {rest}))")
+        else:
+            conditions.append(_after_predicate(columns, op, 0))
+
+    sql = f"SELECT * FROM {table_name}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    order = [f"{columns[0]} {direction} NULLS LAST" if nullable_sort else f"{columns[0]} {direction}"]
+    order += [f"{column} {direction}" for column in columns[1:]]
+    sql += " ORDER BY " + ", ".join(order)
+    if dialect == "sqlite":
+        sql += " LIMIT :page_size"
+    else:
+        sql += " FETCH FIRST :page_size ROWS ONLY"
+    binds["page_size"] = page_size + 1
+    return sql, binds
+
+
+def fetch_page(cursor, table_name, after=None, page_size=DEFAULT_PAGE_SIZE, dialect="oracle", cache=None, **options):
+    """Run one page query and return (column_names, rows, has_more).
+
+    With a result_cache.ResultCache the page may come from memory.
+    """
+    sql, binds = build_page_query(table_name, after=after, page_size=page_size, dialect=dialect, **options)
+    if cache is not None:
+        column_names, rows = cache.fetch(cursor, sql, binds)
+    else:
+        cursor.execute(sql, binds)
+        rows = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+    return column_names, rows[:page_size], len(rows) > page_size
+
+
+def after_values(table_name, column_names, row, sort_column=None):
+    """Keyset values of a row, to pass as `after` for the next page."""
+    return tuple(row[schema.column_position(column_names, column)] for column in order_columns(table_name, sort_column))
@@ -0,0 +1,213 @@
+# Timing of every database call made through a backend
+# Backend.connection() hands out connections wrapped by Tracer.wrap(), whose cursors record
+# one entry per statement: the operation (button action) that ran it, SQL text, bind count,
+# elapsed time including fetches, rows and round trips. Entries live in a bounded buffer that
+# the "Query Timings" window reads and that can be exported to JSON or CSV.
+#
+# Round trips are estimated the way cx_Oracle fetches: the execute brings back the first
+# prefetchrows rows, then every arraysize rows need another trip. SQLite has no network, the
+# same estimate shows what the statement would cost against a server.
+
+import collections
+import cProfile
+import csv
+import io
+import json
+import math
+import pstats
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 5000
+
+# cx_Oracle's defaults: rows returned with the execute, and rows per fetch round trip
+DEFAULT_PREFETCH_ROWS = 2
+DEFAULT_ARRAYSIZE = 100
+
+CSV_FIELDS = ["started", "operation", "sql", "binds", "elapsed_ms", "rows", "round_trips", "thread"]
+
+
+def bind_count(parameters):
+    if parameters is None:
+        return 0
+    return len(parameters)
+
+
+class Tracer:
+    """Collects statement entries from traced connections on any thread."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, operation_of=None):
+        self.entries = collections.deque(maxlen=max_entries)
+        self.operation_of = operation_of  # returns the name of the action running on the calling thread
+        self.lock = threading.Lock()
+        self.enabled = True
+
+    def wrap(self, connection):
+        return TracedConnection(connection, self) if self.enabled else connection
+
+    def start(self, sql, binds, rows=0, round_trips=1):
+        """Record a statement that was just sent and return its entry for fetches to update."""
+        operation = self.operation_of() if self.operation_of is not None else None
+        entry = {
+            "started": time.time(),
+            "operation": operation or "ui",
+            "sql": " ".join(sql.split()),
+            "binds": binds,
+            "elapsed_ms": 0.0,
+            "rows": rows,
+            "round_trips": round_trips,
+            "thread": threading.current_thread().name,
+        }
+        with self.lock:
+            self.entries.append(entry)
+        return entry
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def slowest(self, count=25):
+        """The `count` slowest statements recorded."""
+        return sorted(self.snapshot(), key=lambda entry: entry["elapsed_ms"], reverse=True)[:count]
+
+    def by_operation(self):
+        """Totals per operation: [(operation, statements, elapsed ms, rows, round trips)], slowest first."""
+        totals = {}
+        for entry in self.snapshot():
+            total = totals.setdefault(entry["operation"], [0, 0.0, 0, 0])
+            total[0] += 1
+            total[1] += entry["elapsed_ms"]
+            total[2] += entry["rows"]
+            total[3] += entry["round_trips"]
+        return sorted(((operation, *total) for operation, total in totals.items()), key=lambda row: row[2], reverse=True)
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(self.snapshot(), trace_file, indent=1)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as trace_file:
+            writer = csv.DictWriter(trace_file, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.snapshot())
+
+
+class TracedConnection:
+    """Connection proxy whose cursors and commits are timed."""
+
+    def __init__(self, connection, tracer):
+        self._connection = connection
+        self._tracer = tracer
+
+    def cursor(self):
+        return TracedCursor(self._connection.cursor(), self._tracer)
+
+    def commit(self):
+        entry = self._tracer.start("COMMIT", 0)
+        start = time.perf_counter()
+        try:
+            self._connection.commit()
+        finally:
+            entry["elapsed_ms"] += (time.perf_counter() - start) * 1000
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class TracedCursor:
+    """Cursor proxy that records every execute and the fetches that follow it."""
+
+    def __init__(self, cursor, tracer):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_entry", None)
+        object.__setattr__(self, "_buffered", 0)  # rows the client already holds for the current statement
+
+    def _timed(self, entry, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            entry["elapsed_ms"] += (time.perf_counter() - start) * 1000
+
+    def execute(self, sql, parameters=None, **kwargs):
+        entry = self._tracer.start(sql, bind_count(parameters))
+        object.__setattr__(self, "_entry", entry)
+        object.__setattr__(self, "_buffered", getattr(self._cursor, "prefetchrows", DEFAULT_PREFETCH_ROWS))
+        if parameters is None:
+            return self._timed(entry, self._cursor.execute, sql, **kwargs)
+        return self._timed(entry, self._cursor.execute, sql, parameters, **kwargs)
+
+    def executemany(self, sql, rows, **kwargs):
+        rows = rows if isinstance(rows, list) else list(rows)
+        entry = self._tracer.start(sql, bind_count(rows[0]) * len(rows) if rows else 0, rows=len(rows))
+        object.__setattr__(self, "_entry", None)  # Nothing to fetch after array DML
+        return self._timed(entry, self._cursor.executemany, sql, rows, **kwargs)
+
+    def _arraysize(self):
+        if hasattr(self._cursor, "prefetchrows"):
+            return max(1, self._cursor.arraysize)
+        return max(DEFAULT_ARRAYSIZE, self._cursor.arraysize)  # sqlite3 defaults to 1 but fetchall() ignores it
+
+    def _fetched(self, count):
+        entry = self._entry
+        if entry is None:
+            return
+        entry["rows"] += count
+        if entry["rows"] > self._buffered:
+            arraysize = self._arraysize()
+            trips = math.ceil((entry["rows"] - self._buffered) / arraysize)
+            entry["round_trips"] += trips
+            object.__setattr__(self, "_buffered", self._buffered + trips * arraysize)
+
+    def fetchone(self):
+        if self._entry is None:
+            return self._cursor.fetchone()
+        row = self._timed(self._entry, self._cursor.fetchone)
+        if row is not None:
+            self._fetched(1)
+        return row
+
+    def fetchmany(self, *args):
+        if self._entry is None:
+            return self._cursor.fetchmany(*args)
+        rows = self._timed(self._entry, self._cursor.fetchmany, *args)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._entry is None:
+            return self._cursor.fetchall()
+        rows = self._timed(self._entry, self._cursor.fetchall)
+        self._fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self._arraysize())
+            if not rows:
+                return
+            yield from rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # arraysize, prefetchrows, ...
+
+
+def profiled(name, work, report, top=25):
+    """Wrap work so one run happens under cProfile and report(text) gets the hottest functions."""
+    def run(*args):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(work, *args)
+        finally:
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+            report(f"Profile of {name}:\n{output.getvalue().rstrip()}")
+    return run
@@ -0,0 +1,122 @@
+# Typeahead record picker used by manage_entries
+# Instead of a dropdown holding every row of the table, the picker offers the rows of the page
+# shown in the grid, and as soon as the user types it looks records up by key or name prefix
+# (typeahead.py). Lookups wait until typing pauses, run on the job runner and only the newest
+# one is shown; prefixes already looked up are answered from the lookup cache without a job.
+
+import customtkinter as ctk
+
+# Milliseconds typing has to pause before a lookup is sent
+DEBOUNCE_MS = 250
+
+
+class RecordPicker(ctk.CTkComboBox):
+    """Combo box whose entries come from prefix lookups as the user types."""
+
+    def __init__(self, master, backend, lookups, runner=None, on_matches=None, on_error=None,
+                 debounce_ms=DEBOUNCE_MS, **kwargs):
+        self.variable = ctk.StringVar()
+        super().__init__(master, values=[], variable=self.variable, **kwargs)
+        self.backend = backend
+        self.lookups = lookups  # typeahead.Typeahead of the table
+        self.runner = runner  # jobs.JobRunner the lookups run on (None looks up inline)
+        self.on_matches = on_matches  # called with the number of records offered after every lookup
+        self.on_error = on_error
+        self.debounce_ms = debounce_ms
+        self.page = []  # [(key, row)] of the grid page, offered while nothing is typed
+        self.entries = []  # [(key, row)] offered right now, in the order shown
+        self.pending = None  # after() id of the lookup waiting for typing to pause
+        self.latest = 0  # number of the newest lookup, older answers are dropped
+        self.bind("<KeyRelease>", self._typed)
+
+    def offer_page(self, keys, rows):
+        """Offer the rows of the page the grid shows while the box holds no search text."""
+        self.page = list(zip(keys, rows))
+        if not self._prefix():
+            self._show(self.page)
+
+    def selected(self):
+        """(key, row) of the record picked, (None, None) when the text isn't one of the entries."""
+        picked = self._picked()
+        return picked if picked is not None else (None, None)
+
+    def replace(self, old_key, key, row):
+        """Apply an added (old_key None), edited or (row None) removed record to the entries offered."""
+        if old_key is None:
+            self.entries.insert(0, (key, row))
+        for entries in (self.page, self.entries):
+            for position, (entry_key, entry_row) in enumerate(entries):
+                if entry_key == old_key:
+                    if row is None:
+                        del entries[position]
+                    else:
+                        entries[position] = (key, row)
+                    break
+        self.configure(values=[str(entry_row) for entry_key, entry_row in self.entries])
+        self.variable.set("" if row is None else str(row))
+
+    def apply_changes(self, rows):
+        """Show rows changed elsewhere ({key: row, None when deleted}) in the entries offered."""
+        picked_key = self.selected()[0]
+        self.entries = [(key, rows.get(key, row)) for key, row in self.entries if rows.get(key, row) is not None]
+        self.configure(values=[str(row) for key, row in self.entries])
+        if picked_key in rows:
+            self.variable.set("" if rows[picked_key] is None else str(rows[picked_key]))
+
+    def _prefix(self):
+        return self.variable.get().strip()
+
+    def _picked(self):
+        text = self.variable.get()
+        for key, row in self.entries:
+            if str(row) == text:
+                return key, row
+        return None
+
+    def _show(self, entries):
+        self.entries = list(entries)
+        self.configure(values=[str(row) for key, row in self.entries])
+        if self.on_matches is not None:
+            self.on_matches(len(self.entries))
+
+    def _typed(self, event):
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+        self.pending = self.after(self.debounce_ms, self._look_up)
+
+    def _look_up(self):
+        self.pending = None
+        prefix = self._prefix()
+        if self._picked() is not None:
+            return  # A record was picked from the list, nothing to look up
+        self.latest += 1
+        number = self.latest
+        if not prefix:
+            self._show(self.page)
+            return
+        found = self.lookups.cached(prefix)
+        if found is not None:
+            self._answer(number, found)
+            return
+
+        def look_up():
+            with self.backend.connection() as connection:
+                return self.lookups.lookup(connection.cursor(), prefix)
+
+        if self.runner is None:
+            self._answer(number, look_up())
+            return
+        self.runner.submit(f"look up {self.lookups.table_name}", look_up,
+                           on_done=lambda found: self._answer(number, found),
+                           on_error=self._failed, background=True)
+
+    def _answer(self, number, found):
+        if number != self.latest or not self.winfo_exists():
+            return  # The user kept typing, or closed the window
+        column_names, rows = found
+        self._show([(self.lookups.key_of(column_names, row), row) for row in rows])
+
+    def _failed(self, e):
+        if self.on_error is None:
+            raise e
+        self.on_error(e)
@@ -0,0 +1,156 @@
+# Single-record reads and writes by primary key for manage_entries
+# Every statement targets one row through its full primary key (composite keys included),
+# and writes hand back the row as stored so the open window can show it in place instead of
+# reloading the table. Writes to Music and Movie also rewrite the row's attribute values
+# (attributes.py) in the same transaction.
+#
+# Given the row version the user saw (schema.VERSION_COLUMN), updates and deletes only match the
+# row while it still has that version: the check costs no extra round trip, and when no row was
+# matched the current row is read back and handed over in a ConflictError.
+
+import attributes
+import schema
+
+
+class ConflictError(Exception):
+    """A versioned write found the row changed by someone else since it was read.
+
+    row is the row as it is stored now.
+    """
+
+    def __init__(self, table_name, key, row):
+        super().__init__(f"{table_name} record {key} was changed by someone else since it was read")
+        self.table_name = table_name
+        self.key = key
+        self.row = row
+
+
+def key_condition(table_name):
+    """WHERE clause matching one row by primary key, with binds :key0, :key1, ..."""
+    return " AND ".join(f"{column} = :key{i}" for i, column in enumerate(schema.PRIMARY_KEYS[table_name]))
+
+
+def key_columns(table_name):
+    """{bind name: column} of the binds key_condition() uses."""
+    return {f"key{i}": column for i, column in enumerate(schema.PRIMARY_KEYS[table_name])}
+
+
+def key_binds(key):
+    return {f"key{i}": value for i, value in enumerate(key)}
+
+
+def fetch_row(cursor, table_name, key):
+    """Read one row by primary key, None if it doesn't exist."""
+    cursor.execute(f"SELECT * FROM {table_name} WHERE {key_condition(table_name)}", key_binds(key))
+    return cursor.fetchone()
+
+
+def fetch_rows(cursor, table_name, keys, lock=False, chunk_size=100):
+    """Read many rows by primary key, chunk_size keys per statement; returns {key: row} for those found.
+
+    With lock=True the rows are locked (FOR UPDATE) until the transaction ends; Oracle only.
+    """
+    key_columns = schema.PRIMARY_KEYS[table_name]
+    found = {}
+    keys = list(keys)
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        binds = {f"key{i}_{j}": value for i, key in enumerate(chunk) for j, value in enumerate(key)}
+        if len(key_columns) == 1:
+            condition = f"{key_columns[0]} IN ({', '.join(f':key{i}_0' for i in range(len(chunk)))})"
+        else:
+            condition = " OR ".join(
+                "(" + " AND ".join(f"{column} = :key{i}_{j}" for j, column in enumerate(key_columns)) + ")"
+                for i in range(len(chunk)))
+        cursor.execute(f"SELECT * FROM {table_name} WHERE {condition}" + (" FOR UPDATE" if lock else ""), binds)
+        rows = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+        found.update((schema.key_of(table_name, column_names, row), row) for row in rows)
+    return found
+
+
+def stored_key(cursor, table_name, row):
+    """Primary key of a row just read with fetch_row(), typed as the database returned it."""
+    return schema.key_of(table_name, [desc[0] for desc in cursor.description], row)
+
+
+def changed_key(table_name, key, column, value):
+    """Primary key of a row after `column` is set to `value`."""
+    return tuple(value if key_column.upper() == column.upper() else key_value
+                 for key_column, key_value in zip(schema.PRIMARY_KEYS[table_name], key))
+
+
+def _versioned(condition, binds, version):
+    """Add the row version check to a key condition; returns (SET addition, condition)."""
+    if version is None:
+        return "", condition
+    binds["version"] = version
+    return (f", {schema.VERSION_COLUMN} = {schema.VERSION_COLUMN} + 1",
+            f"{condition} AND {schema.VERSION_COLUMN} = :version")
+
+
+def _conflict(cursor, table_name, key):
+    """After a versioned write matched nothing: raise ConflictError if the row is still there."""
+    row = fetch_row(cursor, table_name, key)
+    if row is not None:
+        raise ConflictError(table_name, key, row)
+
+
+def update_value(cursor, table_name, key, column, value, info=None, version=None):
+    """Set one column of one row.
+
+    With info (metadata.TableInfo) value is converted to the column's type and the binds are
+    declared before the statement runs. With version, the row is only updated while it still
+    has that row version, otherwise ConflictError is raised; the caller rolls back. Returns
+    (new key, row as stored); the row is None when no row had that key any more.
+    """
+    if info is not None:
+        value = info.convert(column, value)
+    binds = key_binds(key)
+    binds["new_value"] = value
+    bump, condition = _versioned(key_condition(table_name), binds, version)
+    attributes.delete_values(cursor, table_name, key[0])  # Attribute rows would block a ProductID change
+    if info is not None:
+        info.declare_binds(cursor, new_value=column, **key_columns(table_name))
+    cursor.execute(f"UPDATE {table_name} SET {column} = :new_value{bump} WHERE {condition}", binds)
+    if cursor.rowcount == 0:
+        if version is not None:
+            _conflict(cursor, table_name, key)
+        return key, None
+    row = fetch_row(cursor, table_name, changed_key(table_name, key, column, value))
+    new_key = stored_key(cursor, table_name, row)
+    attributes.insert_values(cursor, table_name, [desc[0] for desc in cursor.description], [row])
+    return new_key, row
+
+
+def delete(cursor, table_name, key, version=None):
+    """Delete one row; returns False when it was already gone.
+
+    With version, the row is only deleted while it still has that row version, otherwise
+    ConflictError is raised; the caller rolls back.
+    """
+    binds = key_binds(key)
+    condition = _versioned(key_condition(table_name), binds, version)[1]
+    attributes.delete_values(cursor, table_name, key[0])
+    cursor.execute(f"DELETE FROM {table_name} WHERE {condition}", binds)
+    if cursor.rowcount > 0:
+        return True
+    if version is not None:
+        _conflict(cursor, table_name, key)
+    return False
+
+
+def insert(cursor, table_name, column_names, values, info=None):
+    """Insert one row (values of column_names, in order) and return (key, row as stored).
+
+    With info (metadata.TableInfo) the values are converted to the column types first.
+    """
+    placeholders = ", ".join(":" + str(i + 1) for i in range(len(values)))
+    if info is not None:
+        values = info.convert_row(values)
+        info.declare_binds(cursor, column_names)
+    cursor.execute(f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES ({placeholders})", values)
+    row = fetch_row(cursor, table_name, schema.key_of(table_name, column_names, values))
+    key = stored_key(cursor, table_name, row)
+    attributes.insert_values(cursor, table_name, [desc[0] for desc in cursor.description], [row])
+    return key, row
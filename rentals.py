@@ -0,0 +1,290 @@
+# Rental checkout and return, each a single transaction
+# A checkout claims an Available copy of every requested product, marks it Rented, links it to
+# the customer (InventoryCustomer), writes one Rentals row plus one Rental transaction per copy
+# and takes the copies off Product.StockQuantity. A return does the reverse and closes the
+# customer's open rentals once they hold no rented copies. Either everything is committed or
+# nothing is, so two clerks can never rent out the same copy.
+#
+# On Oracle copies are claimed with SELECT ... FOR UPDATE SKIP LOCKED: a terminal skips copies
+# another terminal is in the middle of renting instead of queueing behind it. SQLite has no row
+# locks, there the transaction starts with BEGIN IMMEDIATE so writers take turns. Product rows
+# are updated last and in ProductID order, so concurrent checkouts can't deadlock on them and
+# hold their locks for as short a time as possible.
+#
+# Keys for new Rentals and Transactions rows come in blocks from the KeyCounter table
+# (KeyAllocator), reserved in their own short transaction, so terminals don't collide on MAX + 1.
+
+import collections
+import datetime
+import threading
+
+import backends
+import schema
+
+# Days a copy may be kept; Rentals.ReturnDate holds this due date until the copy comes back
+RENTAL_DAYS = 7
+
+# Copies per checkout or return (keeps IN lists far below Oracle's 1000 expressions)
+MAX_ITEMS = 100
+
+# Keys reserved from KeyCounter per round trip
+KEY_BLOCK_SIZE = 50
+
+# Attempts of a checkout or return that lost a race (lock timeout, deadlock, key collision)
+MAX_ATTEMPTS = 3
+
+# Tables a checkout or return writes, for cache invalidation
+TABLES_WRITTEN = ["Inventory", "InventoryCustomer", "Rentals", "Transactions", "Product"]
+
+
+class RentalError(Exception):
+    """The checkout or return was refused; nothing was changed."""
+
+
+# Keys
+
+def reserve_keys(connection, table_name, count):
+    """Reserve `count` consecutive keys of table_name in KeyCounter (commits); returns the first.
+
+    The counter starts after the highest key in the table, so rows loaded with explicit keys
+    before it existed are never reused.
+    """
+    key = schema.PRIMARY_KEYS[table_name][0]
+    cursor = connection.cursor()
+    binds = {"table_name": table_name, "count": count}
+    for attempt in range(MAX_ATTEMPTS):
+        cursor.execute("UPDATE KeyCounter SET NextID = NextID + :count WHERE TableName = :table_name", binds)
+        if cursor.rowcount:
+            break
+        try:
+            cursor.execute(f"INSERT INTO KeyCounter (TableName, NextID) "
+                           f"SELECT :table_name, COALESCE(MAX({key}), 0) + 1 + :count FROM {table_name}", binds)
+            break
+        except backends.DatabaseError:
+            connection.rollback()  # Another terminal created the counter first, update it instead
+    else:
+        raise RentalError(f"Could not reserve keys for {table_name}")
+    cursor.execute("SELECT NextID FROM KeyCounter WHERE TableName = :table_name", {"table_name": table_name})
+    end = cursor.fetchone()[0]
+    connection.commit()
+    return end - count
+
+
+def resync_keys(connection, table_name):
+    """Move the counter past rows inserted with explicit keys since it was created (commits)."""
+    key = schema.PRIMARY_KEYS[table_name][0]
+    connection.cursor().execute(
+        f"UPDATE KeyCounter SET NextID = (SELECT COALESCE(MAX({key}), 0) + 1 FROM {table_name}) "
+        f"WHERE TableName = :table_name AND NextID <= (SELECT COALESCE(MAX({key}), 0) FROM {table_name})",
+        {"table_name": table_name})
+    connection.commit()
+
+
+class KeyAllocator:
+    """Hands out new primary keys from blocks reserved in KeyCounter, shared by every thread."""
+
+    def __init__(self, block_size=KEY_BLOCK_SIZE):
+        self.block_size = block_size
+        self.blocks = {}  # table -> (next key, end of block)
+        self.lock = threading.Lock()
+
+    def take(self, connection, table_name, count):
+        """`count` unused keys of table_name; commits when a new block has to be reserved."""
+        with self.lock:
+            next_key, end = self.blocks.get(table_name, (0, 0))
+            if end - next_key < count:
+                size = max(count, self.block_size)
+                next_key = reserve_keys(connection, table_name, size)
+                end = next_key + size
+            self.blocks[table_name] = (next_key + count, end)
+            return list(range(next_key, next_key + count))
+
+    def reset(self, connection, table_name):
+        """Forget the current block and resync the counter, after a key turned out to be taken."""
+        with self.lock:
+            self.blocks.pop(table_name, None)
+            resync_keys(connection, table_name)
+
+
+# Checkout and return
+
+def _begin(cursor, dialect):
+    """Start the write transaction; on SQLite take the write lock before reading anything."""
+    if dialect == "sqlite":
+        cursor.execute("BEGIN IMMEDIATE")
+
+
+def _in_list(values, prefix):
+    """(":id0, :id1, ...", binds) for an IN list."""
+    binds = {f"{prefix}{i}": value for i, value in enumerate(values)}
+    return ", ".join(":" + name for name in binds), binds
+
+
+def _is_key_collision(error):
+    text = str(error)
+    return "UNIQUE constraint failed" in text or "ORA-00001" in text
+
+
+def _is_transient(error):
+    text = str(error)
+    return "locked" in text or "ORA-00060" in text or _is_key_collision(error)
+
+
+def claim_copies(cursor, product_id, count, dialect="oracle"):
+    """InventoryIDs of up to `count` Available copies of a product, locked for this transaction.
+
+    Oracle locks SKIP LOCKED rows as they are fetched, so only `count` rows are prefetched and
+    the copies left unfetched stay free for other terminals.
+    """
+    binds = {"product_id": product_id}
+    sql = "SELECT InventoryID FROM Inventory WHERE ProductID = :product_id AND Status = 'Available'"
+    if dialect == "sqlite":
+        sql += " LIMIT :row_limit"
+        binds["row_limit"] = count
+    else:
+        sql += " FOR UPDATE SKIP LOCKED"
+    cursor.arraysize = count
+    if hasattr(cursor, "prefetchrows"):  # cx_Oracle 8+
+        cursor.prefetchrows = count
+    cursor.execute(sql, binds)
+    return [row[0] for row in cursor.fetchmany(count)]
+
+
+def _retrying(backend, keys, work):
+    """Run work(connection) in a transaction, again when it lost a race to another terminal."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            with backend.connection() as connection:
+                return work(connection)
+        except backends.DatabaseError as e:
+            if attempt == MAX_ATTEMPTS or not _is_transient(e):
+                raise
+            if keys is not None and _is_key_collision(e):
+                with backend.connection() as connection:
+                    for table_name in ("Rentals", "Transactions"):
+                        keys.reset(connection, table_name)
+
+
+def checkout(backend, keys, customer_id, product_ids, today=None):
+    """Rent one copy of every product in product_ids (repeat an ID for more copies) in one transaction.
+
+    Returns {"rental_id", "copies": [(product ID, inventory ID)], "amount", "due"}. Raises
+    RentalError, with nothing changed, when a product is unknown or has no copy left.
+    """
+    counts = collections.Counter(product_ids)
+    if not counts:
+        raise RentalError("Nothing to check out")
+    if sum(counts.values()) > MAX_ITEMS:
+        raise RentalError(f"At most {MAX_ITEMS} copies per checkout")
+    today = today or datetime.date.today()
+    due = today + datetime.timedelta(days=RENTAL_DAYS)
+
+    def work(connection):
+        # Keys first: reserving a block commits, so it has to happen before the transaction starts
+        rental_id = keys.take(connection, "Rentals", 1)[0]
+        transaction_ids = keys.take(connection, "Transactions", sum(counts.values()))
+        cursor = connection.cursor()
+        _begin(cursor, backend.dialect)
+
+        in_list, binds = _in_list(sorted(counts), "product")
+        cursor.execute(f"SELECT ProductID, RentalPrice FROM Product WHERE ProductID IN ({in_list})", binds)
+        prices = dict(cursor.fetchall())
+        unknown = [str(product_id) for product_id in sorted(counts) if product_id not in prices]
+        if unknown:
+            raise RentalError(f"No product {', '.join(unknown)}")
+
+        copies = []
+        for product_id in sorted(counts):
+            claimed = claim_copies(cursor, product_id, counts[product_id], backend.dialect)
+            if len(claimed) < counts[product_id]:
+                raise RentalError(f"Only {len(claimed)} of {counts[product_id]} copies of product {product_id} available")
+            copies.extend((product_id, inventory_id) for inventory_id in claimed)
+
+        cursor.executemany("UPDATE Inventory SET Status = 'Rented' WHERE InventoryID = :1 AND Status = 'Available'",
+                           [(inventory_id,) for product_id, inventory_id in copies])
+        if cursor.rowcount != len(copies):
+            raise RentalError("A copy was rented by another terminal, try again")
+        links = [(customer_id, inventory_id) for product_id, inventory_id in copies]
+        cursor.executemany("DELETE FROM InventoryCustomer WHERE CustomerID = :1 AND InventoryID = :2", links)
+        cursor.executemany("INSERT INTO InventoryCustomer (CustomerID, InventoryID) VALUES (:1, :2)", links)
+        cursor.execute("INSERT INTO Rentals (RentalID, RentalDate, ReturnDate, Status, CustomerID) "
+                       "VALUES (:1, :2, :3, 'Rented', :4)", [rental_id, today, due, customer_id])
+        cursor.executemany(
+            "INSERT INTO Transactions (TransactionID, TransactionDate, TransactionType, AmountExchanged, "
+            "CustomerID, InventoryID) VALUES (:1, :2, 'Rental', :3, :4, :5)",
+            [(transaction_id, today, prices[product_id], customer_id, inventory_id)
+             for transaction_id, (product_id, inventory_id) in zip(transaction_ids, copies)])
+
+        stock = [{"product_id": product_id, "count": count} for product_id, count in sorted(counts.items())]
+        cursor.executemany("UPDATE Product SET StockQuantity = StockQuantity - :count "
+                           "WHERE ProductID = :product_id AND StockQuantity >= :count", stock)
+        if cursor.rowcount != len(stock):
+            raise RentalError("Product.StockQuantity is lower than the copies being rented")
+        connection.commit()
+        amount = sum((prices[product_id] or 0) for product_id, inventory_id in copies)
+        return {"rental_id": rental_id, "copies": copies, "amount": amount, "due": due}
+
+    return _retrying(backend, keys, work)
+
+
+def return_copies(backend, inventory_ids, today=None):
+    """Check rented copies back in, in one transaction.
+
+    Returns {"copies", "products", "customers", "rentals_closed"}. Raises RentalError, with nothing changed,
+    when a copy is unknown or not rented out.
+    """
+    inventory_ids = sorted(set(inventory_ids))
+    if not inventory_ids:
+        raise RentalError("Nothing to return")
+    if len(inventory_ids) > MAX_ITEMS:
+        raise RentalError(f"At most {MAX_ITEMS} copies per return")
+    today = today or datetime.date.today()
+
+    def work(connection):
+        cursor = connection.cursor()
+        _begin(cursor, backend.dialect)
+        in_list, binds = _in_list(inventory_ids, "copy")
+        sql = (f"SELECT i.InventoryID, i.ProductID, ic.CustomerID FROM Inventory i "
+               f"LEFT JOIN InventoryCustomer ic ON ic.InventoryID = i.InventoryID "
+               f"WHERE i.InventoryID IN ({in_list}) AND i.Status = 'Rented'")
+        if backend.dialect != "sqlite":
+            sql += " FOR UPDATE OF i.Status"  # Wait for (rather than skip) a copy being checked in elsewhere
+        cursor.execute(sql, binds)
+        rows = cursor.fetchall()
+        products = {inventory_id: product_id for inventory_id, product_id, customer_id in rows}
+        not_rented = [str(inventory_id) for inventory_id in inventory_ids if inventory_id not in products]
+        if not_rented:
+            raise RentalError(f"Not rented out: copy {', '.join(not_rented)}")
+        customers = sorted({customer_id for inventory_id, product_id, customer_id in rows if customer_id is not None})
+
+        cursor.executemany("UPDATE Inventory SET Status = 'Available' WHERE InventoryID = :1 AND Status = 'Rented'",
+                           [(inventory_id,) for inventory_id in inventory_ids])
+        if cursor.rowcount != len(inventory_ids):
+            raise RentalError("A copy was returned by another terminal, try again")
+        cursor.executemany("DELETE FROM InventoryCustomer WHERE InventoryID = :1",
+                           [(inventory_id,) for inventory_id in inventory_ids])
+        # Close the rentals of customers who no longer hold any rented copy
+        cursor.executemany(
+            "UPDATE Rentals SET Status = 'Returned', ReturnDate = :today "
+            "WHERE CustomerID = :customer_id AND Status IN ('Rented', 'Overdue') AND NOT EXISTS ("
+            "SELECT 1 FROM InventoryCustomer ic JOIN Inventory i ON i.InventoryID = ic.InventoryID "
+            "WHERE ic.CustomerID = :customer_id AND i.Status = 'Rented')",
+            [{"today": today, "customer_id": customer_id} for customer_id in customers])
+        rentals_closed = max(cursor.rowcount, 0) if customers else 0
+
+        stock = collections.Counter(products.values())
+        cursor.executemany("UPDATE Product SET StockQuantity = StockQuantity + :count WHERE ProductID = :product_id",
+                           [{"product_id": product_id, "count": count} for product_id, count in sorted(stock.items())])
+        connection.commit()
+        return {"copies": len(inventory_ids), "products": sorted(stock), "customers": customers,
+                "rentals_closed": rentals_closed}
+
+    return _retrying(backend, None, work)
+
+
+def parse_ids(text):
+    """[int] from text such as "12, 12 40"; a product repeated rents several copies."""
+    try:
+        return [int(value) for value in text.replace(",", " ").split()]
+    except ValueError:
+        raise RentalError(f"Expected numbers separated by commas or spaces, got {text!r}") from None
@@ -0,0 +1,259 @@
+# Store reports backed by summary tables
+# Daily revenue per transaction type, rentals per product and stock value per supplier are kept
+# in the Report* tables (schema.py) and refreshed from the change log (changes.py): a refresh
+# reads only the rows logged since the previous one, with set-based statements joined to that
+# window of ChangeLog (MERGE on Oracle, INSERT ... ON CONFLICT on SQLite), never the history.
+# The dashboard then reads a bounded slice of every summary through its key or an index, so it
+# costs the same with one year of transactions as with twenty. Outstanding and overdue rentals
+# need no summary: open rentals are a small set whatever the history, read through
+# IX_RENTALS_STATUS (Status, ReturnDate).
+#
+# The change log holds keys, not old values, so a summary adding up Transactions can't take
+# back a transaction updated or deleted after it was counted; a window with such a change
+# rebuilds that summary from scratch, as does a refresh older than the log keeps
+# (changes.KEEP_DAYS). The stock summary is recomputed per affected supplier and never has to.
+
+import datetime
+
+import changes
+import metadata
+
+# Days of daily revenue, and rows of the other lists, shown on the dashboard
+DASHBOARD_DAYS = 14
+TOP_COUNT = 10
+OVERDUE_LIMIT = 20
+
+# TransactionType of transactions without one (it is part of the summary key)
+NO_TYPE = "(none)"
+
+OPEN_RENTALS = "Status IN ('Rented', 'Overdue')"
+RENTAL_TRANSACTIONS = "t.TransactionType = 'Rental'"
+
+# ChangeLog entries of one refresh: after the summary's LastChangeID, up to the refresh's end
+WINDOW = "c.ChangeID > :since AND c.ChangeID <= :upto"
+
+
+def _day(column, dialect):
+    return f"DATE({column})" if dialect == "sqlite" else f"TRUNC({column})"
+
+
+def _limit_clause(dialect):
+    return " LIMIT :row_limit" if dialect == "sqlite" else " FETCH FIRST :row_limit ROWS ONLY"
+
+
+def _where(*conditions):
+    conditions = [condition for condition in conditions if condition]
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def _inserted(table_name):
+    """SELECT of the keys of table_name rows inserted in the window."""
+    return f"SELECT c.Key1 FROM ChangeLog c WHERE c.TableName = '{table_name}' AND c.Operation = 'I' AND {WINDOW}"
+
+
+def revenue_select(dialect, condition=None):
+    day = _day("t.TransactionDate", dialect)
+    kind = f"COALESCE(t.TransactionType, '{NO_TYPE}')"
+    return (f"SELECT {day} AS RevenueDate, {kind} AS TransactionType, COALESCE(SUM(t.AmountExchanged), 0) AS Revenue, "
+            f"COUNT(*) AS TransactionCount FROM Transactions t{_where(condition)} GROUP BY {day}, {kind}")
+
+
+def product_rentals_select(dialect, condition=None):
+    return (f"SELECT i.ProductID, COUNT(*) AS RentalCount FROM Transactions t "
+            f"JOIN Inventory i ON i.InventoryID = t.InventoryID"
+            f"{_where(RENTAL_TRANSACTIONS, condition)} GROUP BY i.ProductID")
+
+
+def supplier_stock_select(dialect, condition=None):
+    return (f"SELECT ps.SupplierID, COALESCE(SUM(p.StockQuantity), 0) AS StockQuantity, "
+            f"COALESCE(SUM(p.StockQuantity * p.Price), 0) AS StockValue FROM ProductSupplier ps "
+            f"JOIN Product p ON p.ProductID = ps.ProductID{_where(condition)} GROUP BY ps.SupplierID")
+
+
+# Suppliers whose stock value a window can change: their links, their products or themselves changed
+SUPPLIERS_CHANGED = (
+    f"SELECT c.Key2 FROM ChangeLog c WHERE c.TableName = 'ProductSupplier' AND {WINDOW} "
+    f"UNION SELECT ps.SupplierID FROM ChangeLog c JOIN ProductSupplier ps ON ps.ProductID = c.Key1 "
+    f"WHERE c.TableName = 'Product' AND {WINDOW} "
+    f"UNION SELECT c.Key1 FROM ChangeLog c WHERE c.TableName = 'Supplier' AND {WINDOW}"
+)
+
+
+def add_sql(table_name, keys, values, select, dialect="oracle"):
+    """Statement adding the rows of select to a summary: new keys are inserted, existing ones summed."""
+    columns = ", ".join(keys + values)
+    if dialect == "sqlite":
+        # select always has a WHERE here, so SQLite can't read ON CONFLICT as a join's ON
+        sums = ", ".join(f"{value} = {value} + excluded.{value}" for value in values)
+        return f"INSERT INTO {table_name} ({columns}) {select} ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {sums}"
+    match = " AND ".join(f"r.{key} = s.{key}" for key in keys)
+    sums = ", ".join(f"r.{value} = r.{value} + s.{value}" for value in values)
+    return (f"MERGE INTO {table_name} r USING ({select}) s ON ({match}) "
+            f"WHEN MATCHED THEN UPDATE SET {sums} "
+            f"WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({', '.join('s.' + column for column in keys + values)})")
+
+
+def rewritten(cursor, table_name, window):
+    """Whether rows of table_name counted by an earlier refresh were updated or deleted in the window."""
+    cursor.execute(f"SELECT COUNT(*) FROM ChangeLog c WHERE c.TableName = :table_name AND c.Operation <> 'I' "
+                   f"AND {WINDOW} AND NOT EXISTS (SELECT 1 FROM ChangeLog n WHERE n.TableName = c.TableName "
+                   f"AND n.Key1 = c.Key1 AND n.Operation = 'I' AND n.ChangeID > :since AND n.ChangeID < c.ChangeID)",
+                   dict(window, table_name=table_name))
+    return cursor.fetchone()[0] > 0
+
+
+class Summary:
+    """One summary table and how a window of the change log is applied to it.
+
+    An additive summary adds up the source rows inserted in the window; otherwise the summary
+    rows of the keys `changed` selects are recomputed from the source tables.
+    """
+
+    def __init__(self, name, table_name, keys, values, select, filter_column, source=None, changed=None):
+        self.name = name  # ReportState.ReportName
+        self.table_name = table_name
+        self.keys = keys
+        self.values = values
+        self.select = select  # select(dialect, condition) of the summary rows, condition limits the source rows
+        self.filter_column = filter_column  # source column `condition` restricts
+        self.source = source  # table whose inserted rows an additive summary adds up
+        self.changed = changed  # SELECT of the summary keys a window changes, None when additive
+
+    def rebuild(self, cursor, dialect):
+        cursor.execute(f"DELETE FROM {self.table_name}")
+        cursor.execute(f"INSERT INTO {self.table_name} ({', '.join(self.keys + self.values)}) {self.select(dialect)}")
+
+    def apply(self, cursor, window, dialect):
+        """Bring the summary up to date with one window; returns False when it has to be rebuilt instead."""
+        if self.changed is None:
+            if rewritten(cursor, self.source, window):
+                return False
+            select = self.select(dialect, f"{self.filter_column} IN ({_inserted(self.source)})")
+            cursor.execute(add_sql(self.table_name, self.keys, self.values, select, dialect), window)
+            return True
+        cursor.execute(f"DELETE FROM {self.table_name} WHERE {self.keys[0]} IN ({self.changed})", window)
+        select = self.select(dialect, f"{self.filter_column} IN ({self.changed})")
+        cursor.execute(f"INSERT INTO {self.table_name} ({', '.join(self.keys + self.values)}) {select}", window)
+        return True
+
+
+SUMMARIES = [
+    Summary("DailyRevenue", "ReportDailyRevenue", ["RevenueDate", "TransactionType"], ["Revenue", "TransactionCount"],
+            revenue_select, "t.TransactionID", source="Transactions"),
+    Summary("ProductRentals", "ReportProductRentals", ["ProductID"], ["RentalCount"],
+            product_rentals_select, "t.TransactionID", source="Transactions"),
+    Summary("SupplierStock", "ReportSupplierStock", ["SupplierID"], ["StockQuantity", "StockValue"],
+            supplier_stock_select, "ps.SupplierID", changed=SUPPLIERS_CHANGED),
+]
+
+# Tables a rebuild reads; on Oracle they are share-locked so no change is in flight meanwhile
+REBUILD_SOURCES = ["Transactions", "Inventory", "Product", "ProductSupplier"]
+
+
+def frontier(cursor, since, gap_seconds=changes.GAP_SECONDS, dialect="oracle"):
+    """Highest ChangeID up to which every change after `since` is committed or given up on.
+
+    A missing ChangeID (an Oracle sequence value not committed yet) holds the refresh back until
+    a change after it is older than gap_seconds, like changes.ChangeFeed does.
+    """
+    settled = ("ChangedAt < SYSDATE - :gap_seconds / 86400" if dialect != "sqlite"
+               else "ChangedAt < DATETIME('now', '-' || :gap_seconds || ' seconds')")
+    cursor.execute(f"SELECT ChangeID, CASE WHEN {settled} THEN 1 ELSE 0 END FROM ChangeLog "
+                   f"WHERE ChangeID > :since ORDER BY ChangeID", {"since": since, "gap_seconds": gap_seconds})
+    upto = since
+    for change_id, old in cursor.fetchall():
+        if change_id != upto + 1 and not old:
+            break
+        upto = change_id
+    return upto
+
+
+def _as_datetime(value):
+    return metadata.parse_date(value) if isinstance(value, str) else value
+
+
+def refresh(connection, dialect="oracle", rebuild=False, gap_seconds=changes.GAP_SECONDS,
+            keep_days=changes.KEEP_DAYS):
+    """Bring every summary up to date in one transaction (committed).
+
+    Only the changes logged since the last refresh are read; returns the names of the summaries
+    that had to be rebuilt instead (all of them with rebuild=True, and on the first refresh).
+    """
+    cursor = connection.cursor()
+    if dialect == "sqlite":
+        cursor.execute("BEGIN IMMEDIATE")  # Refreshes take turns, and nobody writes in between
+    else:
+        cursor.execute("LOCK TABLE ReportState IN EXCLUSIVE MODE")  # Refreshes take turns
+    cursor.execute("SELECT ReportName, LastChangeID, RefreshedAt FROM ReportState")
+    state = {name: (last, _as_datetime(refreshed)) for name, last, refreshed in cursor.fetchall()}
+    now = datetime.datetime.now().replace(microsecond=0)
+    stale = now - datetime.timedelta(days=keep_days - 1)  # a day's margin before the log is purged
+    current = {name: last for name, (last, refreshed) in state.items() if refreshed >= stale}
+    upto = frontier(cursor, min(current.values()), gap_seconds, dialect) if current else 0
+
+    positions = {}
+    stale_summaries = []
+    for summary in SUMMARIES:
+        since = current.get(summary.name)
+        if rebuild or since is None:
+            stale_summaries.append(summary)
+        elif since >= upto or summary.apply(cursor, {"since": since, "upto": upto}, dialect):
+            positions[summary.name] = max(since, upto)
+        else:
+            stale_summaries.append(summary)
+
+    if stale_summaries:
+        if dialect != "sqlite":
+            # Waits for writers in flight, so every change up to MAX(ChangeID) is in what is read
+            cursor.execute(f"LOCK TABLE {', '.join(REBUILD_SOURCES)} IN SHARE MODE")
+        cursor.execute("SELECT MAX(ChangeID) FROM ChangeLog")
+        last = cursor.fetchone()[0] or 0
+        for summary in stale_summaries:
+            summary.rebuild(cursor, dialect)
+            positions[summary.name] = last
+
+    for name, position in positions.items():
+        binds = {"name": name, "last": position, "refreshed": now}
+        cursor.execute("UPDATE ReportState SET LastChangeID = :last, RefreshedAt = :refreshed "
+                       "WHERE ReportName = :name", binds)
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO ReportState (ReportName, LastChangeID, RefreshedAt) "
+                           "VALUES (:name, :last, :refreshed)", binds)
+    connection.commit()
+    return [summary.name for summary in stale_summaries]
+
+
+def dashboard(cursor, today=None, dialect="oracle", days=DASHBOARD_DAYS, top=TOP_COUNT, overdue_limit=OVERDUE_LIMIT):
+    """[(title, column names, rows)] of every report, each a bounded read of a summary or an index."""
+    today = today or datetime.date.today()
+    limit = _limit_clause(dialect)
+    sections = []
+
+    def section(title, sql, binds=None):
+        cursor.execute(sql, binds or {})
+        sections.append((title, [desc[0] for desc in cursor.description], cursor.fetchall()))
+
+    section(f"Daily revenue, last {days} days",
+            "SELECT RevenueDate, TransactionType, Revenue, TransactionCount FROM ReportDailyRevenue "
+            "WHERE RevenueDate >= :first_day ORDER BY RevenueDate DESC, TransactionType",
+            {"first_day": today - datetime.timedelta(days=days - 1)})
+    section("Rentals",
+            f"SELECT COUNT(*) AS Outstanding, COALESCE(SUM(CASE WHEN ReturnDate < :today THEN 1 ELSE 0 END), 0) "
+            f"AS Overdue FROM Rentals WHERE {OPEN_RENTALS}",
+            {"today": today})
+    section("Overdue rentals, longest overdue first",
+            f"SELECT r.RentalID, r.CustomerID, c.Name, c.PhoneNumber, r.RentalDate, r.ReturnDate AS DueDate "
+            f"FROM (SELECT * FROM Rentals WHERE {OPEN_RENTALS} AND ReturnDate < :today ORDER BY ReturnDate{limit}) r "
+            f"LEFT JOIN Customer c ON c.CustomerID = r.CustomerID ORDER BY r.ReturnDate, r.RentalID",
+            {"today": today, "row_limit": overdue_limit})
+    section(f"Top {top} products by rentals",
+            f"SELECT r.ProductID, p.Name, r.RentalCount FROM (SELECT ProductID, RentalCount FROM ReportProductRentals "
+            f"ORDER BY RentalCount DESC{limit}) r LEFT JOIN Product p ON p.ProductID = r.ProductID "
+            f"ORDER BY r.RentalCount DESC, r.ProductID",
+            {"row_limit": top})
+    section(f"Stock value by supplier, top {top}",
+            f"SELECT r.SupplierID, s.Name, r.StockQuantity, r.StockValue FROM (SELECT SupplierID, StockQuantity, "
+            f"StockValue FROM ReportSupplierStock ORDER BY StockValue DESC{limit}) r "
+            f"LEFT JOIN Supplier s ON s.SupplierID = r.SupplierID ORDER BY r.StockValue DESC, r.SupplierID",
+            {"row_limit": top})
+    return sections
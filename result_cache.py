@@ -0,0 +1,201 @@
+# Read-through cache of query results
+# Results are keyed on the normalized SQL text plus its binds and remember which store tables
+# the query reads. Any write made through the app invalidates exactly those tables; a TTL
+# bounds how stale a result can get when someone else writes to the database. Entries are
+# evicted least recently used first once the memory budget is reached.
+#
+# Queries reading anything that isn't a store table (views, other schemas) are never cached,
+# because a write to the tables underneath could not be matched to them.
+
+import collections
+import re
+import sys
+import threading
+import time
+
+import schema
+
+DEFAULT_BUDGET_MB = 64
+DEFAULT_TTL_SECONDS = 30
+
+# A single result may use at most this share of the budget
+MAX_ENTRY_SHARE = 0.25
+
+READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][\w$#.]*(?:\s*(?:[A-Za-z_]\w*)?\s*,\s*[A-Za-z_][\w$#.]*)*)", re.IGNORECASE)
+WRITTEN_TABLE = re.compile(r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE|MERGE\s+INTO|TRUNCATE\s+TABLE)\s+([A-Za-z_][\w$#.]*)",
+                           re.IGNORECASE)
+QUERY = re.compile(r"^\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+LOCKING_READ = re.compile(r"\bFOR\s+UPDATE\b", re.IGNORECASE)
+STORE_TABLES = {table_name.upper(): table_name for table_name in schema.TABLES}
+# String literals and quoted identifiers, whose whitespace is part of their value
+QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+# Attribute tables written along with their base table (see attributes.py)
+DEPENDENT_TABLES = {}
+for (base, column), attribute_table in schema.ATTRIBUTE_TABLES.items():
+    DEPENDENT_TABLES.setdefault(base.upper(), set()).add(attribute_table.upper())
+
+
+def normalize_sql(sql):
+    """SQL text with whitespace outside quotes collapsed and a trailing semicolon removed."""
+    parts = QUOTED.split(sql.strip().rstrip(";"))  # Odd positions are the quoted parts
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)).strip()
+
+
+def tables_read(sql):
+    """Upper-case names of the tables a SELECT reads, or None if it reads anything else (or isn't a query)."""
+    if not QUERY.match(sql) or LOCKING_READ.search(sql):
+        return None
+    tables = set()
+    for match in READ_TABLES.finditer(sql):
+        for item in match.group(1).split(","):
+            name = item.split()[0].upper()
+            if name == "DUAL":
+                continue
+            if name not in STORE_TABLES:
+                return None
+            tables.add(name)
+    return tables
+
+
+def tables_written(sql):
+    """Upper-case names of the tables a DML statement changes, or None when that can't be told (DDL, PL/SQL)."""
+    match = WRITTEN_TABLE.match(sql)
+    if match is None:
+        return None
+    name = match.group(1).upper()
+    return {name} if name in STORE_TABLES else None
+
+
+def bind_key(binds):
+    if binds is None:
+        return ()
+    if isinstance(binds, dict):
+        return tuple(sorted(binds.items()))
+    return tuple(binds)
+
+
+def estimate_size(column_names, rows):
+    """Rough bytes held by a result (tuples plus their values)."""
+    size = sum(sys.getsizeof(name) for name in column_names)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class ResultCache:
+    """LRU cache of (column names, rows) with a memory budget, TTL and per-table invalidation."""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.ttl_seconds = ttl_seconds
+        self.entries = collections.OrderedDict()  # key -> (column names, rows, tables, size, expires)
+        self.size_bytes = 0
+        self.generations = {}  # table -> number of invalidations, so a read that raced a write isn't stored
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, sql, binds=None):
+        """Return (column names, rows) if cached and fresh, else None."""
+        key = (normalize_sql(sql), bind_key(binds))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[4] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def generation(self, tables):
+        with self.lock:
+            return tuple(self.generations.get(table, 0) for table in sorted(tables))
+
+    def put(self, sql, binds, column_names, rows, tables, generation):
+        """Store a result read while the tables were at `generation` (see generation())."""
+        size = estimate_size(column_names, rows)
+        if size > self.budget_bytes * MAX_ENTRY_SHARE:
+            return
+        key = (normalize_sql(sql), bind_key(binds))
+        with self.lock:
+            if tuple(self.generations.get(table, 0) for table in sorted(tables)) != generation:
+                return  # A write to one of the tables landed while the query ran
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (column_names, rows, tables, size, time.monotonic() + self.ttl_seconds)
+            self.size_bytes += size
+            while self.size_bytes > self.budget_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def fetch(self, cursor, sql, binds=None):
+        """Read-through: return (column names, rows) from the cache or by running the query."""
+        tables = tables_read(sql)
+        if tables is None:
+            with self.lock:
+                self.uncacheable += 1
+            cursor.execute(sql, binds or {})
+            return [desc[0] for desc in cursor.description], cursor.fetchall()
+        cached = self.get(sql, binds)
+        if cached is not None:
+            return cached
+        generation = self.generation(tables)
+        cursor.execute(sql, binds or {})
+        rows = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+        self.put(sql, binds, column_names, rows, tables, generation)
+        return column_names, rows
+
+    def invalidate(self, *table_names):
+        """Drop every cached result that reads one of these tables."""
+        tables = {table_name.upper() for table_name in table_names}
+        for table in list(tables):
+            tables |= DEPENDENT_TABLES.get(table, set())
+        with self.lock:
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+            stale = [key for key, entry in self.entries.items() if entry[2] & tables]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def invalidate_sql(self, sql):
+        """Invalidate what a write statement touched; everything when that can't be told."""
+        tables = tables_written(sql)
+        if tables is None:
+            self.clear()
+        else:
+            self.invalidate(*tables)
+
+    def clear(self):
+        """Drop everything, e.g. after DDL or a bulk load."""
+        with self.lock:
+            for table in STORE_TABLES:
+                self.generations[table] = self.generations.get(table, 0) + 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def _remove(self, key):
+        self.size_bytes -= self.entries.pop(key)[3]
+
+    def stats(self):
+        """Counters for the Query Timings window."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "uncacheable": self.uncacheable,
+                "entries": len(self.entries),
+                "size_mb": self.size_bytes / (1024 * 1024),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,141 @@
+# Streaming of query results for execute_custom_sql
+# Rows are fetched arraysize at a time with fetchmany() and rendered as fixed-width text one
+# chunk at a time, so memory stays flat whatever the size of the result. Each batch stops at
+# a row or byte limit; the cursor (and the pooled connection it lives on) stays open until
+# the next batch is asked for, the rows run out, or close() is called.
+
+import contextlib
+import threading
+
+# Rows per fetchmany() round trip (Oracle also prefetches this many with the execute)
+DEFAULT_ARRAYSIZE = 500
+
+# Rows and characters of rendered text per batch before the user has to ask for more
+DEFAULT_ROW_LIMIT = 1000
+DEFAULT_BYTE_LIMIT = 1000000
+
+MAX_CELL_WIDTH = 30
+
+
+def format_row(row, col_widths):
+    """Helper function to format a row with fixed-width columns."""
+    cells = []
+    for i, cell in enumerate(row):
+        text = str(cell)
+        if len(text) > col_widths[i]:
+            text = text[:col_widths[i] - 3] + "..."
+        cells.append(f"{text:<{col_widths[i]}}")
+    return "| " + " | ".join(cells) + " |"
+
+
+def separator(col_widths):
+    return "+-" + "-+-".join("-" * w for w in col_widths) + "-+"
+
+
+def column_widths(column_names, rows, max_width=MAX_CELL_WIDTH):
+    """Width of every column from its name and a sample of rows, capped at max_width."""
+    return [
+        min(max_width, max([len(str(name))] + [len(str(row[i])) for row in rows]) + 2)
+        for i, name in enumerate(column_names)
+    ]
+
+
+def format_chunk(column_names, col_widths, rows, first=False, last=False):
+    """Rows as table text; the first chunk carries the header and the last one the closing line."""
+    lines = []
+    if first:
+        lines += [separator(col_widths), format_row(column_names, col_widths), separator(col_widths)]
+    lines += [format_row(row, col_widths) for row in rows]
+    if last:
+        lines.append(separator(col_widths))
+    return "\n".join(lines)
+
+
+def render_rows(column_names, rows, on_text, chunk_rows=DEFAULT_ARRAYSIZE):
+    """Render a result that is already in memory the way ResultStream renders a fetched one."""
+    col_widths = column_widths(column_names, rows[:chunk_rows])
+    for start in range(0, max(1, len(rows)), chunk_rows):
+        on_text(format_chunk(column_names, col_widths, rows[start:start + chunk_rows],
+                             first=start == 0, last=start + chunk_rows >= len(rows)))
+
+
+def tune_cursor(cursor, arraysize=DEFAULT_ARRAYSIZE):
+    """Set the fetch batch size; call before execute() so Oracle's prefetch applies to it."""
+    cursor.arraysize = arraysize
+    if hasattr(cursor, "prefetchrows"):  # cx_Oracle 8+
+        cursor.prefetchrows = arraysize + 1  # +1 so a result that fits needs no extra round trip to see its end
+
+
+class ResultStream:
+    """A statement executed on a borrowed connection whose rows are fetched in batches."""
+
+    def __init__(self, backend, sql, row_limit=DEFAULT_ROW_LIMIT, byte_limit=DEFAULT_BYTE_LIMIT,
+                 arraysize=DEFAULT_ARRAYSIZE, keep_rows=False):
+        self.row_limit = row_limit
+        self.byte_limit = byte_limit
+        self.arraysize = arraysize
+        self.rows_fetched = 0
+        self.col_widths = None  # fixed from the first chunk so later chunks line up
+        self.kept_rows = [] if keep_rows else None  # whole result, kept only while it fits in the first batch
+        self.lock = threading.Lock()  # one batch at a time, and no close() in the middle of one
+        self.backend = backend
+        self.borrowed = contextlib.ExitStack()
+        self.connection = self.borrowed.enter_context(backend.connection())
+        try:
+            self.cursor = self.connection.cursor()
+            tune_cursor(self.cursor, arraysize)
+            self.cursor.execute(sql)
+        except BaseException as e:
+            self.borrowed.__exit__(type(e), e, e.__traceback__)  # Roll back and return the connection
+            raise
+        self.is_query = self.cursor.description is not None
+        self.column_names = [desc[0] for desc in self.cursor.description] if self.is_query else []
+        self.exhausted = not self.is_query
+
+    def fetch(self, on_text, should_stop=None):
+        """Fetch the next batch, calling on_text(text) once per rendered chunk.
+
+        Stops early when should_stop() returns True. Returns the number of rows fetched.
+        """
+        with self.lock:
+            self.backend.claim(self.connection)  # Cancelling the job fetching this batch interrupts it
+            fetched = 0
+            written = 0
+            while not self.exhausted and fetched < self.row_limit and written < self.byte_limit:
+                if should_stop is not None and should_stop():
+                    break
+                size = min(self.arraysize, self.row_limit - fetched)
+                rows = self.cursor.fetchmany(size)
+                # fetchmany() only comes back short at the end of the result
+                if len(rows) < size:
+                    self.exhausted = True
+                first = self.col_widths is None
+                if first:
+                    self.col_widths = column_widths(self.column_names, rows)
+                if self.kept_rows is not None:
+                    self.kept_rows.extend(rows)
+                fetched += len(rows)
+                self.rows_fetched += len(rows)
+                text = format_chunk(self.column_names, self.col_widths, rows, first=first, last=self.exhausted)
+                written += len(text) + 1
+                on_text(text)
+            if not self.exhausted:
+                self.kept_rows = None  # Bigger than one batch, not worth keeping
+            if self.exhausted:
+                self._close()
+            return fetched
+
+    def close(self):
+        """Release the cursor and give the connection back to the pool."""
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        self.exhausted = True
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass  # Interrupted or already closed
+            self.cursor = None
+            self.borrowed.close()
@@ -0,0 +1,60 @@
+# Sample rows inserted by Populate Tables (main.py) and `cli.py populate`
+
+import datetime
+
+SUPPLIERS = [
+    (1, 'Universal Suppliers', 'Movies', 123, 'King St W', 'Toronto', 'ON', 'Canada', 'M5V1E3'),
+    (2, 'Global Music Co', 'Music', 456, 'Queen St E', 'Toronto', 'ON', 'Canada', 'M5A1S3')]
+
+PRODUCTS = [
+    (1, 'Inception Blu-ray', 10, datetime.date(2022, 1, 1), 19.99, 5.99),
+    (2, 'Imagine Dragons Album', 20, datetime.date(2023, 1, 1), 15.99, 4.99)]
+
+INVENTORY = [
+    (1, 'Available', 1),
+    (2, 'Rented', 2)]
+
+PRODUCT_SUPPLIER = [
+    (1, 1),
+    (2, 2)]
+
+MUSIC = [
+    (2, 'Rock', 'Imagine Dragons', 'Alex Da Kid')]
+
+MOVIE = [
+    (1, 'Sci-Fi', 'Christopher Nolan', 'Paramount Pictures')]
+
+CUSTOMERS = [
+    (1, 'John Doe', '123-456-7890', 'Good', 'Interstellar Blu-ray'),
+    (2, 'Jane Smith', '987-654-3210', 'Average', 'Imagine Dragons Album')]
+
+RENTALS = [
+    (1, datetime.date(2024, 11, 1), datetime.date(2024, 11, 10), 'Returned', 1),
+    (2, datetime.date(2024, 11, 1), datetime.date(2024, 11, 15), 'Rented', 2)]
+
+TRANSACTIONS = [
+    (1, datetime.date(2024, 11, 1), 'Purchase', 19.99, 1, 1),
+    (2, datetime.date(2024, 11, 1), 'Rental', 5.99, 2, 2)]
+
+INVENTORY_CUSTOMERS = [
+    (1, 1),
+    (2, 2)]
+
+INVENTORY_PRODUCTS = [
+    (1, 1),
+    (2, 1)]
+
+# Rows inserted by Populate Tables, per table
+ROWS = {
+    "Supplier": SUPPLIERS,
+    "Product": PRODUCTS,
+    "Inventory": INVENTORY,
+    "ProductSupplier": PRODUCT_SUPPLIER,
+    "Music": MUSIC,
+    "Movie": MOVIE,
+    "Customer": CUSTOMERS,
+    "Rentals": RENTALS,
+    "Transactions": TRANSACTIONS,
+    "InventoryCustomer": INVENTORY_CUSTOMERS,
+    "InventoryProduct": INVENTORY_PRODUCTS,
+}
@@ -0,0 +1,502 @@
+# Shared description of the store schema (see tables.sql)
+
+import re
+
+import backends
+
+# Store tables, children before parents (the order they are dropped in)
+TABLES = [
+    "MusicGenre",
+    "MusicArtist",
+    "MusicProducer",
+    "MovieGenre",
+    "MovieDirector",
+    "InventoryProduct",
+    "Transactions",
+    "InventoryCustomer",
+    "Rentals",
+    "Customer",
+    "Movie",
+    "Music",
+    "ProductSupplier",
+    "Inventory",
+    "Product",
+    "Supplier",
+    "KeyCounter",
+    "ChangeLog",
+    "ReportState",
+    "ReportDailyRevenue",
+    "ReportProductRentals",
+    "ReportSupplierStock",
+    "WishlistProduct",
+    "WishlistEntry",
+    "WishlistMatch",
+    "WishlistNotice",
+]
+
+# CREATE TABLE statements in foreign key order (same as tables.sql)
+CREATE_SQL = [
+    """
+    CREATE TABLE Supplier (
+        SupplierID INT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        ProductType VARCHAR(255),
+        StreetNumber INT,
+        StreetName VARCHAR(255),
+        CityName VARCHAR(255),
+        Province VARCHAR(255),
+        Country VARCHAR(255),
+        PostalCode VARCHAR(6)
+    )
+    """,
+    """
+    CREATE TABLE Product (
+        ProductID INT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        StockQuantity INT DEFAULT 0 CHECK (StockQuantity >= 0),
+        ReleaseDate DATE,
+        Price DECIMAL(10, 2) CHECK (Price >= 0),
+        RentalPrice DECIMAL(10, 2) CHECK (RentalPrice >= 0)
+    )
+    """,
+    """
+    CREATE TABLE Inventory (
+        InventoryID INT PRIMARY KEY,
+        Status VARCHAR(255),
+        ProductID INT,
+        FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
+    )
+    """,
+    """
+    CREATE TABLE ProductSupplier (
+        ProductID INT,
+        SupplierID INT,
+        PRIMARY KEY (ProductID, SupplierID),
+        FOREIGN KEY (ProductID) REFERENCES Product(ProductID),
+        FOREIGN KEY (SupplierID) REFERENCES Supplier(SupplierID)
+    )
+    """,
+    """
+    CREATE TABLE Music (
+        ProductID INT PRIMARY KEY,
+        Genre VARCHAR(255), -- comma separated multi-value attribute
+        Artist VARCHAR(255), -- comma separated multi-value attribute
+        Producer VARCHAR(255), -- comma separated multi-value attribute
+        FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
+    )
+    """,
+    """
+    CREATE TABLE Movie (
+        ProductID INT PRIMARY KEY,
+        Genre VARCHAR(255), -- comma separated multi-value attribute
+        Director VARCHAR(255), -- comma separated multi-value attribute
+        Studio VARCHAR(255),
+        FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
+    )
+    """,
+    """
+    CREATE TABLE MusicGenre (
+        ProductID INT,
+        Genre VARCHAR(255),
+        PRIMARY KEY (ProductID, Genre),
+        FOREIGN KEY (ProductID) REFERENCES Music(ProductID) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE MusicArtist (
+        ProductID INT,
+        Artist VARCHAR(255),
+        PRIMARY KEY (ProductID, Artist),
+        FOREIGN KEY (ProductID) REFERENCES Music(ProductID) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE MusicProducer (
+        ProductID INT,
+        Producer VARCHAR(255),
+        PRIMARY KEY (ProductID, Producer),
+        FOREIGN KEY (ProductID) REFERENCES Music(ProductID) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE MovieGenre (
+        ProductID INT,
+        Genre VARCHAR(255),
+        PRIMARY KEY (ProductID, Genre),
+        FOREIGN KEY (ProductID) REFERENCES Movie(ProductID) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE MovieDirector (
+        ProductID INT,
+        Director VARCHAR(255),
+        PRIMARY KEY (ProductID, Director),
+        FOREIGN KEY (ProductID) REFERENCES Movie(ProductID) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE Customer (
+        CustomerID INT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        PhoneNumber VARCHAR(20),
+        StoreStanding VARCHAR(255),
+        WishlistItem VARCHAR(255)
+    )
+    """,
+    """
+    CREATE TABLE Rentals (
+        RentalID INT PRIMARY KEY,
+        RentalDate DATE NOT NULL,
+        ReturnDate DATE,
+        Status VARCHAR(255),
+        CustomerID INT,
+        FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID)
+    )
+    """,
+    """
+    CREATE TABLE InventoryCustomer (
+        CustomerID INT,
+        InventoryID INT,
+        PRIMARY KEY (CustomerID, InventoryID),
+        FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID),
+        FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID)
+    )
+    """,
+    """
+    CREATE TABLE Transactions (
+        TransactionID INT PRIMARY KEY,
+        TransactionDate DATE NOT NULL,
+        TransactionType VARCHAR(255),
+        AmountExchanged DECIMAL(10, 2),
+        CustomerID INT,
+        InventoryID INT,
+        FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID),
+        FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID)
+    )
+    """,
+    """
+    CREATE TABLE InventoryProduct (
+        InventoryID INT,
+        ProductID INT,
+        PRIMARY KEY (InventoryID, ProductID),
+        FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID),
+        FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
+    )
+    """,
+    """
+    CREATE TABLE KeyCounter (
+        TableName VARCHAR(30) PRIMARY KEY,
+        NextID INT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE ChangeLog (
+        ChangeID INT PRIMARY KEY,
+        TableName VARCHAR(30) NOT NULL,
+        Key1 INT NOT NULL,
+        Key2 INT,
+        Operation VARCHAR(1) NOT NULL CHECK (Operation IN ('I', 'U', 'D')),
+        ChangedAt DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE ReportState (
+        ReportName VARCHAR(30) PRIMARY KEY,
+        LastChangeID INT NOT NULL,
+        RefreshedAt DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE ReportDailyRevenue (
+        RevenueDate DATE,
+        TransactionType VARCHAR(255),
+        Revenue DECIMAL(14, 2) NOT NULL,
+        TransactionCount INT NOT NULL,
+        PRIMARY KEY (RevenueDate, TransactionType)
+    )
+    """,
+    """
+    CREATE TABLE ReportProductRentals (
+        ProductID INT PRIMARY KEY,
+        RentalCount INT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE ReportSupplierStock (
+        SupplierID INT PRIMARY KEY,
+        StockQuantity INT NOT NULL,
+        StockValue DECIMAL(14, 2) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE WishlistProduct (
+        ProductID INT PRIMARY KEY,
+        NameKey VARCHAR(255) NOT NULL,
+        InStock INT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE WishlistEntry (
+        CustomerID INT PRIMARY KEY,
+        NameKey VARCHAR(255) NOT NULL,
+        MatchKind VARCHAR(10)
+    )
+    """,
+    """
+    CREATE TABLE WishlistMatch (
+        ProductID INT,
+        CustomerID INT,
+        PRIMARY KEY (ProductID, CustomerID)
+    )
+    """,
+    """
+    CREATE TABLE WishlistNotice (
+        CustomerID INT,
+        ProductID INT,
+        RestockedAt DATE NOT NULL,
+        PRIMARY KEY (CustomerID, ProductID)
+    )
+    """
+]
+
+# Primary key columns of every table, composite keys in declaration order
+PRIMARY_KEYS = {
+    "Supplier": ["SupplierID"],
+    "Product": ["ProductID"],
+    "Inventory": ["InventoryID"],
+    "ProductSupplier": ["ProductID", "SupplierID"],
+    "Music": ["ProductID"],
+    "Movie": ["ProductID"],
+    "Customer": ["CustomerID"],
+    "Rentals": ["RentalID"],
+    "InventoryCustomer": ["CustomerID", "InventoryID"],
+    "Transactions": ["TransactionID"],
+    "InventoryProduct": ["InventoryID", "ProductID"],
+    "MusicGenre": ["ProductID", "Genre"],
+    "MusicArtist": ["ProductID", "Artist"],
+    "MusicProducer": ["ProductID", "Producer"],
+    "MovieGenre": ["ProductID", "Genre"],
+    "MovieDirector": ["ProductID", "Director"],
+    "KeyCounter": ["TableName"],
+    "ChangeLog": ["ChangeID"],
+    "ReportState": ["ReportName"],
+    "ReportDailyRevenue": ["RevenueDate", "TransactionType"],
+    "ReportProductRentals": ["ProductID"],
+    "ReportSupplierStock": ["SupplierID"],
+    "WishlistProduct": ["ProductID"],
+    "WishlistEntry": ["CustomerID"],
+    "WishlistMatch": ["ProductID", "CustomerID"],
+    "WishlistNotice": ["CustomerID", "ProductID"],
+}
+
+# Tables the app keeps for itself rather than clerks: no change tracking and no row versions
+BOOKKEEPING_TABLES = ["KeyCounter", "ChangeLog", "ReportState", "ReportDailyRevenue", "ReportProductRentals",
+                      "ReportSupplierStock", "WishlistProduct", "WishlistEntry", "WishlistMatch", "WishlistNotice"]
+
+# Multi-valued attributes: (base table, column) -> table holding one row per value. The base
+# tables keep the comma separated text, attributes.py keeps these tables in step with it. Their
+# rows go with the base row (ON DELETE CASCADE), so custom SQL can delete Music and Movie rows.
+ATTRIBUTE_TABLES = {
+    ("Music", "Genre"): "MusicGenre",
+    ("Music", "Artist"): "MusicArtist",
+    ("Music", "Producer"): "MusicProducer",
+    ("Movie", "Genre"): "MovieGenre",
+    ("Movie", "Director"): "MovieDirector",
+}
+
+# Foreign keys as (child table, column, parent table)
+FOREIGN_KEYS = [
+    ("Inventory", "ProductID", "Product"),
+    ("ProductSupplier", "ProductID", "Product"),
+    ("ProductSupplier", "SupplierID", "Supplier"),
+    ("Music", "ProductID", "Product"),
+    ("Movie", "ProductID", "Product"),
+    ("Rentals", "CustomerID", "Customer"),
+    ("InventoryCustomer", "CustomerID", "Customer"),
+    ("InventoryCustomer", "InventoryID", "Inventory"),
+    ("Transactions", "CustomerID", "Customer"),
+    ("Transactions", "InventoryID", "Inventory"),
+    ("InventoryProduct", "InventoryID", "Inventory"),
+    ("InventoryProduct", "ProductID", "Product"),
+] + [(attribute_table, "ProductID", base) for (base, column), attribute_table in ATTRIBUTE_TABLES.items()]
+
+# Secondary indexes: name -> (table, columns). Foreign key columns that don't lead a primary key,
+# then the columns records are looked up by. Names stay under Oracle's 30 character limit.
+INDEXES = {
+    "IX_INVENTORY_PRODUCT": ("Inventory", ["ProductID"]),
+    "IX_PRODSUPP_SUPPLIER": ("ProductSupplier", ["SupplierID"]),
+    "IX_RENTALS_CUSTOMER": ("Rentals", ["CustomerID"]),
+    "IX_INVCUST_INVENTORY": ("InventoryCustomer", ["InventoryID"]),
+    "IX_TRANS_CUSTOMER": ("Transactions", ["CustomerID"]),
+    "IX_TRANS_INVENTORY": ("Transactions", ["InventoryID"]),
+    "IX_INVPROD_PRODUCT": ("InventoryProduct", ["ProductID"]),
+    "IX_PRODUCT_NAME": ("Product", ["Name"]),
+    "IX_CUSTOMER_NAME": ("Customer", ["Name"]),
+    "IX_CUSTOMER_PHONE": ("Customer", ["PhoneNumber"]),
+    "IX_RENTALS_STATUS": ("Rentals", ["Status", "ReturnDate"]),
+    "IX_MUSICGENRE_GENRE": ("MusicGenre", ["Genre", "ProductID"]),
+    "IX_MUSICARTIST_ARTIST": ("MusicArtist", ["Artist", "ProductID"]),
+    "IX_MUSICPRODUCER_PRODUCER": ("MusicProducer", ["Producer", "ProductID"]),
+    "IX_MOVIEGENRE_GENRE": ("MovieGenre", ["Genre", "ProductID"]),
+    "IX_MOVIEDIRECTOR_DIRECTOR": ("MovieDirector", ["Director", "ProductID"]),
+    "IX_CHANGELOG_CHANGED": ("ChangeLog", ["ChangedAt"]),
+    "IX_REPORT_RENTAL_COUNT": ("ReportProductRentals", ["RentalCount"]),
+    "IX_REPORT_STOCK_VALUE": ("ReportSupplierStock", ["StockValue"]),
+    "IX_WISHPRODUCT_KEY": ("WishlistProduct", ["NameKey"]),
+    "IX_WISHENTRY_KEY": ("WishlistEntry", ["NameKey"]),
+    "IX_WISHMATCH_CUSTOMER": ("WishlistMatch", ["CustomerID"]),
+    "IX_WISHNOTICE_RESTOCKED": ("WishlistNotice", ["RestockedAt"]),
+}
+
+# Optimistic concurrency: every row of these tables carries a version number that a trigger
+# bumps on each update, whoever makes it. Single-record writes from manage_entries name the version
+# they read in their WHERE clause, so a row changed by someone else in the meantime is simply not
+# matched (records.py). The column is added by add_version_columns(), after the declared ones.
+VERSION_COLUMN = "RowVersion"
+VERSIONED_TABLES = [table_name for table_name in TABLES
+                    if table_name not in ATTRIBUTE_TABLES.values() and table_name not in BOOKKEEPING_TABLES]
+
+# Declared columns of every table in CREATE_SQL order: {table: [(column, type)]} with type one of
+# INT, VARCHAR, DECIMAL or DATE, used to convert imported text back into values
+COLUMN_DEFINITION = re.compile(r"^\s*(\w+)\s+(INT|VARCHAR|DECIMAL|DATE)\b", re.IGNORECASE | re.MULTILINE)
+COLUMN_TYPES = {
+    re.search(r"CREATE TABLE (\w+)", sql).group(1): [(column, kind.upper()) for column, kind in COLUMN_DEFINITION.findall(sql)]
+    for sql in CREATE_SQL
+}
+
+# Common access paths that should start with an indexed column: (table, columns, what uses them)
+ACCESS_PATHS = [
+    (child, [column], f"joins to {parent}, and deletes from {parent} scan and lock {child}")
+    for child, column, parent in FOREIGN_KEYS
+] + [
+    ("Product", ["Name"], "product lookups by name"),
+    ("Customer", ["Name"], "customer lookups by name"),
+    ("Customer", ["PhoneNumber"], "customer lookups by phone number"),
+    ("Rentals", ["Status"], "open and overdue rental lookups"),
+] + [
+    (attribute_table, [column], f"{base} lookups and counts by {column.lower()}")
+    for (base, column), attribute_table in ATTRIBUTE_TABLES.items()
+]
+
+
+def column_position(column_names, column):
+    """Find a column in cursor.description names, ignoring case (Oracle upper-cases them)."""
+    upper_names = [name.upper() for name in column_names]
+    return upper_names.index(column.upper())
+
+
+def key_of(table_name, column_names, row):
+    """Return the primary key values of a row as a tuple."""
+    return tuple(row[column_position(column_names, column)] for column in PRIMARY_KEYS[table_name])
+
+
+def create_missing_tables(connection):
+    """Run every CREATE TABLE, skipping tables that already exist. Returns the number created."""
+    cursor = connection.cursor()
+    created = 0
+    for sql in CREATE_SQL:
+        try:
+            cursor.execute(sql)
+            created += 1
+        except backends.DatabaseError:
+            pass  # Table already exists
+    connection.commit()
+    return created
+
+
+def version_trigger_sql(table_name, dialect="oracle"):
+    """CREATE TRIGGER bumping the row version on every update that doesn't set it itself."""
+    name = f"TRG_VER_{table_name.upper()}"[:30]
+    if dialect == "sqlite":
+        key = " AND ".join(f"{column} = NEW.{column}" for column in PRIMARY_KEYS[table_name])
+        return (f"CREATE TRIGGER IF NOT EXISTS {name} AFTER UPDATE ON {table_name} "
+                f"WHEN NEW.{VERSION_COLUMN} IS OLD.{VERSION_COLUMN} "
+                f"BEGIN UPDATE {table_name} SET {VERSION_COLUMN} = OLD.{VERSION_COLUMN} + 1 WHERE {key}; END")
+    return (f"CREATE OR REPLACE TRIGGER {name} BEFORE UPDATE ON {table_name} FOR EACH ROW "
+            f"WHEN (NEW.{VERSION_COLUMN} = OLD.{VERSION_COLUMN}) "
+            f"BEGIN :NEW.{VERSION_COLUMN} := :OLD.{VERSION_COLUMN} + 1; END;")
+
+
+def add_version_columns(connection, dialect="oracle"):
+    """Add the row version column and its trigger to the versioned tables that exist.
+
+    Existing rows start at version 1. Returns the tables the column was added to (committed).
+    """
+    cursor = connection.cursor()
+    added = []
+    for table_name in VERSIONED_TABLES:
+        try:
+            cursor.execute(f"ALTER TABLE {table_name} ADD {VERSION_COLUMN} INT DEFAULT 1 NOT NULL")
+            added.append(table_name)
+        except backends.DatabaseError:
+            pass  # Already versioned, or the table doesn't exist
+        try:
+            cursor.execute(version_trigger_sql(table_name, dialect))
+        except backends.DatabaseError:
+            pass  # Table doesn't exist
+    connection.commit()
+    return added
+
+
+def index_columns(cursor, dialect="oracle"):
+    """Indexed column lists of every store table, primary key indexes included.
+
+    Returns {TABLE: {INDEX NAME: [COLUMN, ...]}} with upper-case names; tables that don't exist are left out.
+    """
+    indexes = {}
+    if dialect == "sqlite":
+        for table_name in TABLES:
+            cursor.execute(f"PRAGMA index_list({table_name})")
+            for index_row in cursor.fetchall():
+                index_name = index_row[1]
+                cursor.execute(f"PRAGMA index_info('{index_name}')")
+                columns = [info[2].upper() for info in cursor.fetchall()]
+                indexes.setdefault(table_name.upper(), {})[index_name.upper()] = columns
+        return indexes
+    store_tables = {table_name.upper() for table_name in TABLES}
+    cursor.execute("SELECT table_name, index_name, column_name FROM user_ind_columns "
+                   "ORDER BY table_name, index_name, column_position")
+    for table_name, index_name, column_name in cursor:
+        if table_name in store_tables:
+            indexes.setdefault(table_name, {}).setdefault(index_name, []).append(column_name)
+    return indexes
+
+
+def create_indexes(connection, dialect="oracle"):
+    """Create the declared indexes that don't exist yet. Returns the names created."""
+    cursor = connection.cursor()
+    existing = {name for table_indexes in index_columns(cursor, dialect).values() for name in table_indexes}
+    created = []
+    for index_name, (table_name, columns) in INDEXES.items():
+        if index_name not in existing:
+            cursor.execute(f"CREATE INDEX {index_name} ON {table_name} ({', '.join(columns)})")
+            created.append(index_name)
+    connection.commit()
+    return created
+
+
+def drop_indexes(connection, dialect="oracle"):
+    """Drop the declared indexes that exist. Returns the names dropped."""
+    cursor = connection.cursor()
+    existing = {name for table_indexes in index_columns(cursor, dialect).values() for name in table_indexes}
+    dropped = []
+    for index_name in INDEXES:
+        if index_name in existing:
+            cursor.execute(f"DROP INDEX {index_name}")
+            dropped.append(index_name)
+    connection.commit()
+    return dropped
+
+
+def missing_index_warnings(cursor, dialect="oracle"):
+    """One message per access path in ACCESS_PATHS that no index starts with."""
+    indexes = index_columns(cursor, dialect)
+    warnings = []
+    for table_name, columns, used_by in ACCESS_PATHS:
+        table_indexes = indexes.get(table_name.upper())
+        if table_indexes is None:
+            continue  # Table not created
+        wanted = [column.upper() for column in columns]
+        if not any(indexed[:len(wanted)] == wanted for indexed in table_indexes.values()):
+            warnings.append(f"No index on {table_name}({', '.join(columns)}): {used_by}")
+    return warnings
@@ -0,0 +1,171 @@
+# Search helpers used by search_tables() in main.py
+# Every table gets one parameterized query that only looks at its text columns,
+# so the database does the filtering and only matching rows come over the wire.
+# search_all() runs those queries concurrently, each on its own pooled connection, and
+# hands every table's result over as soon as it arrives; a search takes about as long as
+# its slowest table instead of the sum of all of them, and a global deadline interrupts
+# the tables that are still running when it passes.
+
+import concurrent.futures
+import threading
+import time
+
+import backends
+
+# Tables searched, in the same order the results are shown
+SEARCH_TABLES = [
+    "InventoryProduct",
+    "Transactions",
+    "InventoryCustomer",
+    "Rentals",
+    "Customer",
+    "Movie",
+    "Music",
+    "ProductSupplier",
+    "Inventory",
+    "Product",
+    "Supplier",
+]
+
+# String columns of each table (see tables.sql). Tables without any are never queried,
+# the old Python scan could not match them either since it only compared str values.
+TEXT_COLUMNS = {
+    "InventoryProduct": [],
+    "Transactions": ["TransactionType"],
+    "InventoryCustomer": [],
+    "Rentals": ["Status"],
+    "Customer": ["Name", "PhoneNumber", "StoreStanding", "WishlistItem"],
+    "Movie": ["Genre", "Director", "Studio"],
+    "Music": ["Genre", "Artist", "Producer"],
+    "ProductSupplier": [],
+    "Inventory": ["Status"],
+    "Product": ["Name"],
+    "Supplier": ["Name", "ProductType", "StreetName", "CityName", "Province", "Country", "PostalCode"],
+}
+
+# Maximum number of matching rows returned per table
+DEFAULT_ROW_LIMIT = 100
+
+# Tables queried at the same time (each holds a pooled connection), and the seconds a whole
+# search may take before the tables still running are interrupted
+DEFAULT_WORKERS = 4
+DEFAULT_DEADLINE = 10
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so the term is matched literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def like_pattern(search_term):
+    """Build the bind value for a case-insensitive substring match."""
+    return "%" + escape_like(search_term.lower()) + "%"
+
+
+def build_search_query(table_name, columns, dialect="oracle"):
+    """Build the SELECT that matches :term against the given text columns."""
+    predicate = " OR ".join(f"LOWER({column}) LIKE :term ESCAPE '\\'" for column in columns)
+    sql = f"SELECT * FROM {table_name} WHERE {predicate}"
+    if dialect == "sqlite":
+        sql += " LIMIT :row_limit"
+    else:
+        sql += " FETCH FIRST :row_limit ROWS ONLY"
+    return sql
+
+
+def search_table(cursor, table_name, search_term, row_limit=DEFAULT_ROW_LIMIT, dialect="oracle", cache=None):
+    """Search one table and return (columns, rows, truncated).
+
+    Returns None when the table has no text columns to search.
+    One extra row is requested so we can tell whether the cap was hit.
+    With a result_cache.ResultCache a repeated search may come from memory.
+    """
+    columns = TEXT_COLUMNS.get(table_name)
+    if not columns:
+        return None
+    sql = build_search_query(table_name, columns, dialect)
+    binds = {"term": like_pattern(search_term), "row_limit": row_limit + 1}
+    if cache is not None:
+        column_names, rows = cache.fetch(cursor, sql, binds)
+    else:
+        cursor.execute(sql, binds)
+        rows = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+    truncated = len(rows) > row_limit
+    return column_names, rows[:row_limit], truncated
+
+
+def search_all(backend, search_term, on_result, tables=SEARCH_TABLES, row_limit=DEFAULT_ROW_LIMIT,
+               workers=DEFAULT_WORKERS, deadline=DEFAULT_DEADLINE, cache=None, index=None, cancelled=None):
+    """Search several tables at once, one pooled connection per worker thread.
+
+    on_result(table_name, (columns, rows, truncated)) is called on the worker thread as soon as
+    a table with text columns is searched, in whatever order they finish. Tables the index
+    (search_index.SearchIndex) covers are answered from memory first. cancelled() is polled
+    while waiting. Returns (tables searched, tables past the deadline, [(table, error)]).
+    """
+    searched = []
+    errors = []
+    queried = []
+    for table_name in tables:
+        if not TEXT_COLUMNS.get(table_name):
+            continue  # Nothing to search in this table
+        if index is not None and index.covers(table_name):
+            on_result(table_name, index.search(table_name, search_term, row_limit))
+            searched.append(table_name)
+        else:
+            queried.append(table_name)
+    if not queried:
+        return searched, [], errors
+
+    stop = threading.Event()  # Set at the deadline, queued tables then don't start
+    running = {}  # table name -> connection its query runs on, to interrupt at the deadline
+    running_lock = threading.Lock()
+
+    def search_one(table_name):
+        if stop.is_set():
+            return False
+        with backend.connection() as connection:
+            if stop.is_set():
+                return False  # Waited for a connection past the deadline
+            with running_lock:
+                running[table_name] = connection
+            try:
+                found = search_table(connection.cursor(), table_name, search_term, row_limit,
+                                     backend.dialect, cache)
+            finally:
+                with running_lock:
+                    del running[table_name]
+        if stop.is_set():
+            return False
+        on_result(table_name, found)
+        return True
+
+    ends_at = time.monotonic() + deadline
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(queried)),
+                                                     thread_name_prefix="search")
+    try:
+        futures = {executor.submit(search_one, table_name): table_name for table_name in queried}
+        pending = set(futures)
+        while pending:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0 or (cancelled is not None and cancelled()):
+                break
+            done, pending = concurrent.futures.wait(pending, timeout=min(remaining, 0.1),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    if future.result():
+                        searched.append(futures[future])
+                except backends.DatabaseError as e:
+                    errors.append((futures[future], e))
+    finally:
+        stop.set()
+        with running_lock:  # Held so no interrupted connection goes back to the pool meanwhile
+            for connection in running.values():
+                try:
+                    backend.interrupt(connection)
+                except Exception:
+                    pass  # The statement finished in the meantime
+        executor.shutdown(wait=False, cancel_futures=True)
+    return searched, [futures[future] for future in pending], errors
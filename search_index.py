@@ -0,0 +1,184 @@
+# Optional in-memory search index used by search_tables() in main.py
+# Built once at connect time from the text columns listed in search.TEXT_COLUMNS.
+# Each text value is split into lowercase trigrams; a search intersects the posting
+# sets of the term's trigrams and then confirms the substring on the few candidates left.
+# manage_entries keeps it current one row at a time through refresh_row()/remove_row().
+
+import threading
+
+import search
+
+# Tables kept in memory (all keyed by their first column)
+INDEXED_TABLES = ["Product", "Customer", "Music", "Movie", "Supplier"]
+
+# Default memory budget for the whole index, in megabytes
+DEFAULT_BUDGET_MB = 128
+
+# Rough per-item costs used to keep the index under its budget
+ROW_OVERHEAD_BYTES = 200
+POSTING_BYTES = 60
+FETCH_BATCH_SIZE = 1000
+
+
+def trigrams(text):
+    """Return the set of 3-character substrings of an already lowercased string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TableIndex:
+    """Rows and trigram postings for one table."""
+
+    def __init__(self, table_name, column_names):
+        self.table_name = table_name
+        self.column_names = column_names
+        text_columns = [name.upper() for name in search.TEXT_COLUMNS[table_name]]
+        self.text_positions = [i for i, name in enumerate(column_names) if name.upper() in text_columns]
+        self.rows = {}  # key -> row tuple
+        self.texts = {}  # key -> lowercased text values
+        self.postings = {}  # trigram -> set of keys
+        self.size_bytes = 0
+
+    def add(self, row):
+        key = row[0]
+        if key in self.rows:
+            self.remove(key)
+        texts = [row[i].lower() for i in self.text_positions if isinstance(row[i], str)]
+        grams = set()
+        for text in texts:
+            grams |= trigrams(text)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(key)
+        self.rows[key] = row
+        self.texts[key] = texts
+        self.size_bytes += ROW_OVERHEAD_BYTES + sum(len(text) * 2 for text in texts) + len(grams) * POSTING_BYTES
+
+    def remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        texts = self.texts.pop(key)
+        grams = set()
+        for text in texts:
+            grams |= trigrams(text)
+        for gram in grams:
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+        self.size_bytes -= ROW_OVERHEAD_BYTES + sum(len(text) * 2 for text in texts) + len(grams) * POSTING_BYTES
+
+    def search(self, term, row_limit):
+        term = term.lower()
+        if len(term) < 3:
+            candidates = self.rows.keys()  # Too short for trigrams, check every row in memory
+        else:
+            posting_sets = []
+            for gram in trigrams(term):
+                keys = self.postings.get(gram)
+                if not keys:
+                    return [], False
+                posting_sets.append(keys)
+            posting_sets.sort(key=len)
+            candidates = set.intersection(*posting_sets)
+        matches = []
+        for key in candidates:
+            if any(term in text for text in self.texts[key]):
+                matches.append(self.rows[key])
+                if len(matches) > row_limit:
+                    break
+        return matches[:row_limit], len(matches) > row_limit
+
+
+class SearchIndex:
+    """Trigram index over the text columns of INDEXED_TABLES, bounded by a memory budget."""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, tables=None):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.tables = list(tables or INDEXED_TABLES)
+        self.indexes = {}  # table name -> TableIndex, only for tables that fit the budget
+        self.skipped = []  # tables left out because of errors or the budget
+        self.stale = False
+        self.lock = threading.RLock()  # searches and edits arrive from several worker threads
+
+    def size_bytes(self):
+        with self.lock:
+            return sum(index.size_bytes for index in self.indexes.values())
+
+    def covers(self, table_name):
+        """True when searches on this table can be answered from memory."""
+        return not self.stale and table_name in self.indexes
+
+    def rebuild(self, cursor):
+        """Index the tables from scratch, then swap the new index in."""
+        indexes = {}
+        skipped = []
+        used_bytes = 0
+        for table_name in self.tables:
+            cursor.execute(f"SELECT * FROM {table_name}")
+            column_names = [desc[0] for desc in cursor.description]
+            index = TableIndex(table_name, column_names)
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    index.add(row)
+                if used_bytes + index.size_bytes > self.budget_bytes:
+                    break
+            if used_bytes + index.size_bytes > self.budget_bytes:
+                skipped.append(table_name)  # Search falls back to SQL for this table
+                continue
+            indexes[table_name] = index
+            used_bytes += index.size_bytes
+        with self.lock:
+            self.indexes = indexes
+            self.skipped = skipped
+            self.stale = False
+
+    def clear(self):
+        with self.lock:
+            self.indexes = {}
+            self.skipped = []
+            self.stale = False
+
+    def search(self, table_name, search_term, row_limit=search.DEFAULT_ROW_LIMIT):
+        """Return (columns, rows, truncated) like search.search_table()."""
+        with self.lock:
+            index = self.indexes[table_name]
+            rows, truncated = index.search(search_term, row_limit)
+        return index.column_names, rows, truncated
+
+    def refresh_row(self, cursor, table_name, key):
+        """Re-read one row by primary key after an insert or update and apply it in place."""
+        index = self.indexes.get(table_name)
+        if index is None:
+            return
+        cursor.execute(f"SELECT * FROM {table_name} WHERE {index.column_names[0]} = :key", {"key": key})
+        self.apply_row(table_name, key, cursor.fetchone())
+
+    def apply_row(self, table_name, key, row):
+        """Store a row the caller already read (None removes the key), without another query."""
+        with self.lock:
+            index = self.indexes.get(table_name)
+            if index is None:
+                return
+            if row is None:
+                index.remove(key)
+                return
+            index.add(row)
+            if self.size_bytes() > self.budget_bytes and table_name in self.indexes:
+                del self.indexes[table_name]  # Over budget, stop serving this table from memory
+                self.skipped.append(table_name)
+
+    def remove_row(self, table_name, key):
+        """Drop one row after it was deleted."""
+        with self.lock:
+            index = self.indexes.get(table_name)
+            if index is not None:
+                index.remove(key)
+
+    def mark_stale(self):
+        """Stop answering from memory until the next rebuild (e.g. after custom DML)."""
+        if self.indexes:
+            self.stale = True
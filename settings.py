@@ -0,0 +1,73 @@
+# Connection settings shared by the GUI (main.py) and the command line (cli.py)
+# Values start from DEFAULTS, are overridden by the [database] section of an INI file
+# (store.ini, or the file named by STORE_CONFIG) and then by STORE_DB_<NAME> environment
+# variables, so nightly jobs and other machines don't need code edits:
+#
+#     [database]
+#     backend = oracle
+#     user = store
+#     password = secret
+#     service_name = XE
+#
+#     STORE_DB_PASSWORD=secret python cli.py search dragons
+
+import configparser
+import os
+
+CONFIG_FILE = "store.ini"
+
+DEFAULTS = {
+    "backend": "oracle",  # "oracle" or "sqlite" (local testing without an Oracle server)
+    "oracle_lib_dir": "",  # Oracle Instant Client directory, only needed when it isn't on the library path
+    "user": "SYS",  # SYSDBA sessions can't be pooled, use a regular user for a real SessionPool
+    "password": "your_password",
+    "host": "localhost",
+    "port": "1521",
+    "service_name": "XE",  # Default service name for Oracle XE
+    "pool_min": "1",
+    "pool_max": "4",
+    "pool_increment": "1",
+    "sqlite_path": "store.db",
+}
+
+
+def load(path=None):
+    """Settings dict from DEFAULTS, the config file and the environment (in that order)."""
+    values = dict(DEFAULTS)
+    parser = configparser.ConfigParser()
+    parser.read(path or os.environ.get("STORE_CONFIG", CONFIG_FILE), encoding="utf-8")
+    if parser.has_section("database"):
+        values.update((name, value) for name, value in parser["database"].items() if name in DEFAULTS)
+    for name in DEFAULTS:
+        value = os.environ.get(f"STORE_DB_{name.upper()}")
+        if value is not None:
+            values[name] = value
+    return values
+
+
+def describe(values):
+    """What the settings connect to, for status lines."""
+    if values["backend"] == "sqlite":
+        return values["sqlite_path"]
+    return f"{values['user']}@{values['host']}:{values['port']}/{values['service_name']}"
+
+
+def open_backend(values):
+    """Open the backend the settings describe (imports cx_Oracle only for Oracle)."""
+    import backends
+
+    if values["backend"] == "sqlite":
+        return backends.SQLiteBackend(values["sqlite_path"], max_connections=int(values["pool_max"]))
+    if values["backend"] != "oracle":
+        raise ValueError(f"Unknown database backend: {values['backend']}")
+
+    # if not working, try these:
+    # run lsnrctl start in cmd
+    # check services.msc for OracleServiceXElistener
+    dsn = f"{values['host']}:{values['port']}/{values['service_name']}"  # Easy Connect, same as cx_Oracle.makedsn
+    return backends.OracleBackend(
+        values["user"], values["password"], dsn,
+        min_sessions=int(values["pool_min"]), max_sessions=int(values["pool_max"]),
+        increment=int(values["pool_increment"]),
+        sysdba=values["user"].upper() == "SYS", lib_dir=values["oracle_lib_dir"] or None
+    )
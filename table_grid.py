@@ -0,0 +1,260 @@
+# Virtualized table view used by manage_entries
+# Only one page of rows exists at a time: a fixed set of labels is created once and
+# re-filled when the user pages, sorts or filters, and every page is fetched on demand
+# with the keyset queries in paging.py. Opening a huge table costs the same as a tiny one.
+
+import tkinter as tk
+import customtkinter as ctk
+
+import paging
+import schema
+from result_stream import column_widths, format_row, separator
+
+
+class TableGrid(ctk.CTkFrame):
+    """Paged, sortable and filterable view of one table."""
+
+    def __init__(self, master, backend, table_name, column_names, page_size=paging.DEFAULT_PAGE_SIZE,
+                 dialect="oracle", runner=None, on_page=None, on_error=None, cache=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.backend = backend  # backends.Backend the pages are read from
+        self.table_name = table_name
+        self.column_names = column_names
+        self.page_size = page_size
+        self.dialect = dialect
+        self.runner = runner  # jobs.JobRunner used to fetch pages off the Tk thread (None fetches inline)
+        self.on_page = on_page  # called with the rows of every page shown
+        self.on_error = on_error  # called with the exception when a page can't be fetched
+        self.cache = cache  # result_cache.ResultCache pages are read through (None always queries)
+        self.rows = []
+        self.keys = []  # primary key of every row in self.rows, to find a row again after an edit
+        self.col_widths = None
+        self.has_more = False
+        self.page_starts = [None]  # keyset of each visited page, the last one is the current page
+        self.loading = False  # navigation is ignored while a page is on its way
+        self.sort_column = None
+        self.descending = False
+        self.filter_column = None
+        self.filter_value = None
+
+        # Sort and filter controls (applied in the database)
+        controls = ctk.CTkFrame(self)
+        controls.pack(fill="x", padx=5, pady=5)
+        self.sort_var = ctk.StringVar(value="(primary key)")
+        ctk.CTkLabel(controls, text="Sort by:").pack(side="left", padx=5)
+        ctk.CTkComboBox(controls, values=["(primary key)"] + column_names, variable=self.sort_var, width=160).pack(side="left")
+        self.descending_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls, text="Descending", variable=self.descending_var).pack(side="left", padx=5)
+        self.filter_column_var = ctk.StringVar(value=column_names[0])
+        ctk.CTkLabel(controls, text="Filter:").pack(side="left", padx=5)
+        ctk.CTkComboBox(controls, values=column_names, variable=self.filter_column_var, width=160).pack(side="left")
+        self.filter_entry = ctk.CTkEntry(controls, width=150, placeholder_text="value")
+        self.filter_entry.pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Apply", command=self.apply_view, width=80).pack(side="left", padx=5)
+
+        # Fixed set of row labels that get re-filled for every page
+        body = ctk.CTkFrame(self)
+        body.pack(fill="both", expand=True, padx=5)
+        self.header_label = ctk.CTkLabel(body, text="", font=("Courier", 10), anchor="w", justify=tk.LEFT)
+        self.header_label.pack(anchor="w")
+        self.row_labels = []
+        for _ in range(page_size):
+            label = ctk.CTkLabel(body, text="", font=("Courier", 10), anchor="w", justify=tk.LEFT, height=18)
+            label.pack(anchor="w")
+            self.row_labels.append(label)
+        for widget in [body, self.header_label] + self.row_labels:
+            widget.bind("<MouseWheel>", self._on_mouse_wheel)
+            widget.bind("<Button-4>", lambda event: self.previous_page())
+            widget.bind("<Button-5>", lambda event: self.next_page())
+
+        # Page navigation
+        navigation = ctk.CTkFrame(self)
+        navigation.pack(fill="x", padx=5, pady=5)
+        self.previous_button = ctk.CTkButton(navigation, text="< Previous", command=self.previous_page, width=100)
+        self.previous_button.pack(side="left", padx=5)
+        self.position_label = ctk.CTkLabel(navigation, text="")
+        self.position_label.pack(side="left", padx=10)
+        self.next_button = ctk.CTkButton(navigation, text="Next >", command=self.next_page, width=100)
+        self.next_button.pack(side="left", padx=5)
+
+    def _on_mouse_wheel(self, event):
+        if event.delta > 0:
+            self.previous_page()
+        else:
+            self.next_page()
+
+    def _fetch(self, after):
+        with self.backend.connection() as connection:
+            _, rows, has_more = paging.fetch_page(
+                connection.cursor(), self.table_name, after=after, page_size=self.page_size, dialect=self.dialect,
+                cache=self.cache,
+                sort_column=self.sort_column, descending=self.descending,
+                filter_column=self.filter_column, filter_value=self.filter_value)
+        return rows, has_more
+
+    def _load(self, after, on_failure=None):
+        self.loading = True
+
+        def loaded(page):
+            self.loading = False
+            if self.winfo_exists():  # The window may have been closed while the page was loading
+                self.show_page(*page)
+
+        def failed(e):
+            self.loading = False
+            if on_failure is not None:
+                on_failure()
+            if self.on_error is None:
+                raise e
+            self.on_error(e)
+
+        if self.runner is not None:
+            self.runner.submit(f"page of {self.table_name}", self._fetch, after, on_done=loaded, on_error=failed)
+            return
+        try:
+            page = self._fetch(after)
+        except Exception as e:
+            failed(e)
+            return
+        loaded(page)
+
+    def show_page(self, rows, has_more):
+        """Render one page of rows into the existing labels."""
+        self.rows = list(rows)
+        self.keys = [self.key_of(row) for row in self.rows]
+        self.has_more = has_more
+        self.col_widths = column_widths(self.column_names, rows)
+        line = separator(self.col_widths)
+        self.header_label.configure(text=line + "\n" + format_row(self.column_names, self.col_widths) + "\n" + line)
+        self._render(0)
+        if self.on_page is not None:
+            self.on_page(self.rows)
+
+    def _render(self, start):
+        """Re-fill the labels from position `start` down, and the navigation below them."""
+        for i in range(start, len(self.row_labels)):
+            label = self.row_labels[i]
+            label.configure(text=format_row(self.rows[i], self.col_widths) if i < len(self.rows) else "")
+
+        first = (len(self.page_starts) - 1) * self.page_size
+        if self.rows:
+            self.position_label.configure(text=f"Rows {first + 1}-{first + len(self.rows)}")
+        else:
+            self.position_label.configure(text="No rows")
+        self.previous_button.configure(state=tk.NORMAL if len(self.page_starts) > 1 else tk.DISABLED)
+        self.next_button.configure(state=tk.NORMAL if self.has_more else tk.DISABLED)
+
+    def key_of(self, row):
+        return schema.key_of(self.table_name, self.column_names, row)
+
+    def row_for(self, key):
+        """The row with this primary key if it is on the current page, else None."""
+        return self.rows[self.keys.index(key)] if key in self.keys else None
+
+    def update_row(self, key, row):
+        """Show the new values of one row in place; returns its position, None if it isn't on this page."""
+        if key not in self.keys:
+            return None
+        position = self.keys.index(key)
+        self.rows[position] = row
+        self.keys[position] = self.key_of(row)
+        self.row_labels[position].configure(text=format_row(row, self.col_widths))
+        return position
+
+    def remove_row(self, key):
+        """Take one deleted row off the page; returns its old position, None if it wasn't on this page."""
+        if key not in self.keys:
+            return None
+        position = self.keys.index(key)
+        del self.rows[position]
+        del self.keys[position]
+        self._render(position)
+        return position
+
+    def insert_row(self, row):
+        """Place a new row on the page if it sorts into it; returns its position or None.
+
+        A row that belongs on another page (or might not pass the filter) shows up when that page is read.
+        """
+        if self.filter_value is not None:
+            return None
+        order = self._order_of(row)
+        try:
+            position = 0
+            while position < len(self.rows) and not self._sorts_before(order, self._order_of(self.rows[position])):
+                position += 1
+        except TypeError:
+            return None  # Values that can't be compared in Python, leave it to the next page read
+        if position == 0 and len(self.page_starts) > 1:
+            return None  # Before the first row shown, so on an earlier page
+        if position == len(self.rows) and self.has_more:
+            return None  # After the last row shown, so on a later page
+        self.rows.insert(position, row)
+        self.keys.insert(position, self.key_of(row))
+        if len(self.rows) > self.page_size:
+            del self.rows[self.page_size:], self.keys[self.page_size:]
+            self.has_more = True
+        self._render(position)
+        return position
+
+    def apply_changes(self, rows):
+        """Move rows other terminals changed ({key: row, None when deleted}) into the page.
+
+        Only the rows that changed are touched; a row whose sort position changed is taken
+        off and placed again, which may move it to another page.
+        """
+        for key, row in rows.items():
+            if row is None:
+                self.remove_row(key)
+            elif key not in self.keys:
+                if self.filter_value is None:
+                    self.insert_row(row)
+            elif self._order_of(row) == self._order_of(self.rows[self.keys.index(key)]):
+                self.update_row(key, row)
+            else:
+                self.remove_row(key)
+                self.insert_row(row)
+        if self.on_page is not None:
+            self.on_page(self.rows)
+
+    def _order_of(self, row):
+        return paging.after_values(self.table_name, self.column_names, row, self.sort_column)
+
+    def _sorts_before(self, a, b):
+        """Whether order values a come before b in the page order (NULL sort values last)."""
+        for value_a, value_b in zip(a, b):
+            if value_a == value_b:
+                continue
+            if value_a is None:
+                return False
+            if value_b is None:
+                return True
+            return value_a > value_b if self.descending else value_a < value_b
+        return False
+
+    def next_page(self):
+        if self.loading or not self.has_more or not self.rows:
+            return
+        after = paging.after_values(self.table_name, self.column_names, self.rows[-1], self.sort_column)
+        self.page_starts.append(after)
+        self._load(after, on_failure=self.page_starts.pop)
+
+    def previous_page(self):
+        if self.loading or len(self.page_starts) < 2:
+            return
+        self.page_starts.pop()
+        self._load(self.page_starts[-1])
+
+    def refresh(self):
+        """Re-read the current page, e.g. after an edit."""
+        self._load(self.page_starts[-1])
+
+    def apply_view(self):
+        """Apply the sort and filter controls and go back to the first page."""
+        sort_column = self.sort_var.get()
+        self.sort_column = None if sort_column == "(primary key)" else sort_column
+        self.descending = self.descending_var.get()
+        self.filter_value = self.filter_entry.get().strip() or None
+        self.filter_column = self.filter_column_var.get() if self.filter_value else None
+        self.page_starts = [None]
+        self._load(None)
@@ -50,6 +50,41 @@ CREATE TABLE Movie (
     FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
 );
 
+CREATE TABLE MusicGenre (
+    ProductID INT,
+    Genre VARCHAR(255),
+    PRIMARY KEY (ProductID, Genre),
+    FOREIGN KEY (ProductID) REFERENCES Music(ProductID) ON DELETE CASCADE
+);
+
+CREATE TABLE MusicArtist (
+    ProductID INT,
+    Artist VARCHAR(255),
+    PRIMARY KEY (ProductID, Artist),
+    FOREIGN KEY (ProductID) REFERENCES Music(ProductID) ON DELETE CASCADE
+);
+
+CREATE TABLE MusicProducer (
+    ProductID INT,
+    Producer VARCHAR(255),
+    PRIMARY KEY (ProductID, Producer),
+    FOREIGN KEY (ProductID) REFERENCES Music(ProductID) ON DELETE CASCADE
+);
+
+CREATE TABLE MovieGenre (
+    ProductID INT,
+    Genre VARCHAR(255),
+    PRIMARY KEY (ProductID, Genre),
+    FOREIGN KEY (ProductID) REFERENCES Movie(ProductID) ON DELETE CASCADE
+);
+
+CREATE TABLE MovieDirector (
+    ProductID INT,
+    Director VARCHAR(255),
+    PRIMARY KEY (ProductID, Director),
+    FOREIGN KEY (ProductID) REFERENCES Movie(ProductID) ON DELETE CASCADE
+);
+
 CREATE TABLE Customer (
     CustomerID INT PRIMARY KEY,
     Name VARCHAR(255) NOT NULL,
@@ -93,3 +128,125 @@ CREATE TABLE InventoryProduct (
     FOREIGN KEY (InventoryID) REFERENCES Inventory(InventoryID),
     FOREIGN KEY (ProductID) REFERENCES Product(ProductID)
 );
+
+-- Next free key of tables that get new rows from several terminals at once (see rentals.py)
+CREATE TABLE KeyCounter (
+    TableName VARCHAR(30) PRIMARY KEY,
+    NextID INT NOT NULL
+);
+
+-- Inserted, updated and deleted rows, written by triggers (see changes.py) and polled by open terminals
+CREATE TABLE ChangeLog (
+    ChangeID INT PRIMARY KEY,
+    TableName VARCHAR(30) NOT NULL,
+    Key1 INT NOT NULL,
+    Key2 INT,
+    Operation VARCHAR(1) NOT NULL CHECK (Operation IN ('I', 'U', 'D')),
+    ChangedAt DATE NOT NULL
+);
+
+-- Report summaries, refreshed from the change log up to ReportState.LastChangeID (see reports.py)
+CREATE TABLE ReportState (
+    ReportName VARCHAR(30) PRIMARY KEY,
+    LastChangeID INT NOT NULL,
+    RefreshedAt DATE NOT NULL
+);
+
+CREATE TABLE ReportDailyRevenue (
+    RevenueDate DATE,
+    TransactionType VARCHAR(255),
+    Revenue DECIMAL(14, 2) NOT NULL,
+    TransactionCount INT NOT NULL,
+    PRIMARY KEY (RevenueDate, TransactionType)
+);
+
+CREATE TABLE ReportProductRentals (
+    ProductID INT PRIMARY KEY,
+    RentalCount INT NOT NULL
+);
+
+CREATE TABLE ReportSupplierStock (
+    SupplierID INT PRIMARY KEY,
+    StockQuantity INT NOT NULL,
+    StockValue DECIMAL(14, 2) NOT NULL
+);
+
+-- Wishlist matching (see wishlist.py): normalized product names with their last seen stock,
+-- normalized wishlist entries, the products each entry resolved to, and restock notices
+CREATE TABLE WishlistProduct (
+    ProductID INT PRIMARY KEY,
+    NameKey VARCHAR(255) NOT NULL,
+    InStock INT NOT NULL
+);
+
+CREATE TABLE WishlistEntry (
+    CustomerID INT PRIMARY KEY,
+    NameKey VARCHAR(255) NOT NULL,
+    MatchKind VARCHAR(10)
+);
+
+CREATE TABLE WishlistMatch (
+    ProductID INT,
+    CustomerID INT,
+    PRIMARY KEY (ProductID, CustomerID)
+);
+
+CREATE TABLE WishlistNotice (
+    CustomerID INT,
+    ProductID INT,
+    RestockedAt DATE NOT NULL,
+    PRIMARY KEY (CustomerID, ProductID)
+);
+
+-- Indexes on foreign key columns that don't lead a primary key, and on lookup columns
+CREATE INDEX IX_INVENTORY_PRODUCT ON Inventory (ProductID);
+CREATE INDEX IX_PRODSUPP_SUPPLIER ON ProductSupplier (SupplierID);
+CREATE INDEX IX_RENTALS_CUSTOMER ON Rentals (CustomerID);
+CREATE INDEX IX_INVCUST_INVENTORY ON InventoryCustomer (InventoryID);
+CREATE INDEX IX_TRANS_CUSTOMER ON Transactions (CustomerID);
+CREATE INDEX IX_TRANS_INVENTORY ON Transactions (InventoryID);
+CREATE INDEX IX_INVPROD_PRODUCT ON InventoryProduct (ProductID);
+CREATE INDEX IX_PRODUCT_NAME ON Product (Name);
+CREATE INDEX IX_CUSTOMER_NAME ON Customer (Name);
+CREATE INDEX IX_CUSTOMER_PHONE ON Customer (PhoneNumber);
+CREATE INDEX IX_RENTALS_STATUS ON Rentals (Status, ReturnDate);
+CREATE INDEX IX_MUSICGENRE_GENRE ON MusicGenre (Genre, ProductID);
+CREATE INDEX IX_MUSICARTIST_ARTIST ON MusicArtist (Artist, ProductID);
+CREATE INDEX IX_MUSICPRODUCER_PRODUCER ON MusicProducer (Producer, ProductID);
+CREATE INDEX IX_MOVIEGENRE_GENRE ON MovieGenre (Genre, ProductID);
+CREATE INDEX IX_MOVIEDIRECTOR_DIRECTOR ON MovieDirector (Director, ProductID);
+CREATE INDEX IX_CHANGELOG_CHANGED ON ChangeLog (ChangedAt);
+CREATE INDEX IX_REPORT_RENTAL_COUNT ON ReportProductRentals (RentalCount);
+CREATE INDEX IX_REPORT_STOCK_VALUE ON ReportSupplierStock (StockValue);
+CREATE INDEX IX_WISHPRODUCT_KEY ON WishlistProduct (NameKey);
+CREATE INDEX IX_WISHENTRY_KEY ON WishlistEntry (NameKey);
+CREATE INDEX IX_WISHMATCH_CUSTOMER ON WishlistMatch (CustomerID);
+CREATE INDEX IX_WISHNOTICE_RESTOCKED ON WishlistNotice (RestockedAt);
+
+-- Row versions for optimistic concurrency (schema.add_version_columns() also creates the triggers bumping them)
+ALTER TABLE Supplier ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Product ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Inventory ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE ProductSupplier ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Music ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Movie ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Customer ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Rentals ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE InventoryCustomer ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE Transactions ADD RowVersion INT DEFAULT 1 NOT NULL;
+ALTER TABLE InventoryProduct ADD RowVersion INT DEFAULT 1 NOT NULL;
+
+-- Music and Movie with their attributes comma joined from the attribute tables
+CREATE OR REPLACE VIEW MusicDetails AS
+SELECT b.ProductID,
+    (SELECT LISTAGG(a.Genre, ', ') WITHIN GROUP (ORDER BY a.Genre) FROM MusicGenre a WHERE a.ProductID = b.ProductID) AS Genre,
+    (SELECT LISTAGG(a.Artist, ', ') WITHIN GROUP (ORDER BY a.Artist) FROM MusicArtist a WHERE a.ProductID = b.ProductID) AS Artist,
+    (SELECT LISTAGG(a.Producer, ', ') WITHIN GROUP (ORDER BY a.Producer) FROM MusicProducer a WHERE a.ProductID = b.ProductID) AS Producer
+FROM Music b;
+
+CREATE OR REPLACE VIEW MovieDetails AS
+SELECT b.ProductID,
+    (SELECT LISTAGG(a.Genre, ', ') WITHIN GROUP (ORDER BY a.Genre) FROM MovieGenre a WHERE a.ProductID = b.ProductID) AS Genre,
+    (SELECT LISTAGG(a.Director, ', ') WITHIN GROUP (ORDER BY a.Director) FROM MovieDirector a WHERE a.ProductID = b.ProductID) AS Director,
+    b.Studio
+FROM Movie b;
@@ -0,0 +1,71 @@
+# Terminal output of the GUI as a logging handler
+# Messages from any thread are queued and written to the textbox in one insert every
+# flush_ms (a root.after() loop), and the textbox only keeps the last max_lines lines, so a
+# burst of thousands of messages costs a few widget updates instead of one each. The full
+# log can go to a rotating file through file_sink().
+
+import collections
+import logging
+import logging.handlers
+import threading
+
+DEFAULT_MAX_LINES = 5000
+DEFAULT_FLUSH_MS = 50
+
+FILE_FORMAT = "%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"
+
+
+class TerminalLog(logging.Handler):
+    """Writes log records into a Tk text widget in coalesced batches."""
+
+    def __init__(self, root, textbox, max_lines=DEFAULT_MAX_LINES, flush_ms=DEFAULT_FLUSH_MS, level=logging.INFO):
+        super().__init__(level)
+        self.root = root
+        self.textbox = textbox
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        self.pending = collections.deque()  # (text, line count) waiting for the next flush
+        self.pending_lines = 0
+        self.widget_lines = 0
+        self.queue_lock = threading.Lock()
+        self.root.after(self.flush_ms, self._flush)
+
+    def emit(self, record):
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        lines = text.count("\n") + 1
+        with self.queue_lock:
+            self.pending.append((text, lines))
+            self.pending_lines += lines
+            # Ring buffer: older messages would be trimmed from the widget straight away, so drop them now
+            while len(self.pending) > 1 and self.pending_lines - self.pending[0][1] >= self.max_lines:
+                self.pending_lines -= self.pending.popleft()[1]
+
+    def _flush(self):
+        self.root.after(self.flush_ms, self._flush)
+        with self.queue_lock:
+            if not self.pending:
+                return
+            batch = list(self.pending)
+            added = self.pending_lines
+            self.pending.clear()
+            self.pending_lines = 0
+
+        self.textbox.insert("end", "\n".join(text for text, _ in batch) + "\n")
+        self.widget_lines += added
+        excess = self.widget_lines - self.max_lines
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
+            self.widget_lines -= excess
+        self.textbox.yview("end")
+
+
+def file_sink(path, max_bytes, backups, level=logging.DEBUG):
+    """Rotating log file handler that keeps every message with a timestamp."""
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    return handler
@@ -0,0 +1,208 @@
+# Streaming export and import of tables and query results (CSV or JSON Lines, optionally gzip)
+# Exports fetch arraysize rows at a time and write them straight to the file; imports read the
+# file lazily and feed it to bulk_load.load_table() one batch at a time. Either way only one
+# batch is in memory, whatever the size of the table. The format comes from the file name:
+# .csv or .jsonl, plus .gz to compress.
+#
+# Imported values are converted with one converter per column, chosen once from the declared
+# column types (schema.COLUMN_TYPES) instead of guessing the type of every value.
+
+import csv
+import gzip
+import itertools
+import json
+import os
+import time
+
+import bulk_load
+import metadata
+import result_stream
+import schema
+
+DEFAULT_ARRAYSIZE = 1000
+
+# zlib's default level; 9 costs several times the CPU for a few percent smaller files
+GZIP_LEVEL = 6
+
+FORMATS = ("csv", "jsonl")
+
+
+def file_format(path):
+    """(format, compressed) from a file name such as Product.csv or Transactions.jsonl.gz."""
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    for fmt in FORMATS:
+        if name.endswith("." + fmt):
+            return fmt, compressed
+    raise ValueError(f"Can't tell the format of {path} (use .csv, .jsonl, .csv.gz or .jsonl.gz)")
+
+
+def open_file(path, mode):
+    """Open an export file for text reading ("r") or writing ("w"), through gzip for .gz names."""
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, mode + "t", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def table_of(path):
+    """Store table a file is named after (Product.csv.gz -> Product), None if it isn't one."""
+    name = os.path.basename(path).split(".")[0].upper()
+    return next((table_name for table_name in schema.TABLES if table_name.upper() == name), None)
+
+
+# Export
+
+def write_rows(cursor, output, fmt="csv", arraysize=DEFAULT_ARRAYSIZE, on_progress=None):
+    """Write every remaining row of an executed query to an open text file; returns the row count.
+
+    Dates are written in ISO format and decimals as text, NULL as an empty CSV field or JSON null.
+    on_progress(rows_written) is called after every fetch.
+    """
+    column_names = [desc[0] for desc in cursor.description]
+    if fmt == "csv":
+        writer = csv.writer(output)
+        writer.writerow(column_names)
+        write_batch = writer.writerows
+    else:
+        encoder = json.JSONEncoder(default=str, ensure_ascii=False)  # date, datetime and Decimal as text
+        write_batch = lambda rows: output.writelines(encoder.encode(dict(zip(column_names, row))) + "\n" for row in rows)
+    count = 0
+    while True:
+        rows = cursor.fetchmany(arraysize)
+        if not rows:
+            return count
+        write_batch(rows)
+        count += len(rows)
+        if on_progress is not None:
+            on_progress(count)
+
+
+def export_query(cursor, sql, path, binds=None, arraysize=DEFAULT_ARRAYSIZE, on_progress=None):
+    """Run a query and stream its result to path; returns the row count."""
+    fmt, compressed = file_format(path)
+    result_stream.tune_cursor(cursor, arraysize)
+    cursor.execute(sql, binds or {})
+    with open_file(path, "w") as output:
+        return write_rows(cursor, output, fmt, arraysize, on_progress)
+
+
+def table_query(table_name):
+    """SELECT of a whole table in primary key order, so exports of the same data are identical."""
+    return f"SELECT * FROM {table_name} ORDER BY {', '.join(schema.PRIMARY_KEYS[table_name])}"
+
+
+def export_table(backend, table_name, path, arraysize=DEFAULT_ARRAYSIZE, on_progress=None):
+    """Stream one table to path; returns (rows, elapsed seconds)."""
+    start = time.perf_counter()
+    with backend.connection() as connection:
+        count = export_query(connection.cursor(), table_query(table_name), path,
+                             arraysize=arraysize, on_progress=on_progress)
+    return count, time.perf_counter() - start
+
+
+def export_tables(backend, directory, extension=".csv.gz", arraysize=DEFAULT_ARRAYSIZE, on_progress=None):
+    """Export every table to directory/<Table><extension>; returns {table name: rows}.
+
+    on_progress(table_name, rows_written) is called after every fetch.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for table_name in bulk_load.LOAD_ORDER:
+        counts[table_name], elapsed = export_table(
+            backend, table_name, os.path.join(directory, table_name + extension), arraysize,
+            on_progress=None if on_progress is None else lambda done, table_name=table_name: on_progress(table_name, done))
+    return counts
+
+
+# Import
+
+def read_rows(source, fmt):
+    """(column names, iterator of raw value lists) of an open export file."""
+    if fmt == "csv":
+        reader = csv.reader(source)
+        return next(reader, []), reader
+    first = source.readline()
+    if not first.strip():
+        return [], iter(())
+    column_names = list(json.loads(first))
+
+    def rows():
+        for line in itertools.chain([first], source):  # the first line was read for its keys
+            if line.strip():
+                record = json.loads(line)
+                yield [record.get(name) for name in column_names]
+    return column_names, rows()
+
+
+def convert_rows(table_name, column_names, rows):
+    """Match file columns to the table's and convert every row; returns (table columns, row iterator).
+
+    An exported row version column is skipped, imported rows start at version 1.
+    """
+    declared = {column.upper(): (column, kind) for column, kind in schema.COLUMN_TYPES[table_name]}
+    kept = [position for position, name in enumerate(column_names) if name.upper() != schema.VERSION_COLUMN.upper()]
+    if len(kept) < len(column_names):
+        column_names = [column_names[position] for position in kept]
+        rows = ([row[position] for position in kept] for row in rows)
+    unknown = [name for name in column_names if name.upper() not in declared]
+    if unknown:
+        raise ValueError(f"{table_name} has no column {', '.join(unknown)}")
+    columns = [declared[name.upper()][0] for name in column_names]
+    converters = [metadata.CONVERTERS[declared[name.upper()][1]] for name in column_names]
+
+    def converted():
+        for row in rows:
+            yield tuple(None if value is None or value == "" else convert(value)
+                        for convert, value in zip(converters, row))
+    return columns, converted()
+
+
+def import_file(backend, path, table_name=None, batch_size=bulk_load.DEFAULT_BATCH_SIZE, on_batch=None, info=None):
+    """Load one export file into a table (named after the file unless given).
+
+    Returns (inserted, errors) like bulk_load.load_table(); rows are committed batch by batch.
+    info (metadata.TableInfo) declares the bind types.
+    """
+    table_name = table_name or table_of(path)
+    if table_name is None:
+        raise ValueError(f"Can't tell which table {path} belongs to, name it after the table")
+    fmt, compressed = file_format(path)
+    with open_file(path, "r") as source:
+        column_names, rows = read_rows(source, fmt)
+        if not column_names:
+            return 0, []
+        columns, rows = convert_rows(table_name, column_names, rows)
+        with backend.connection() as connection:
+            return bulk_load.load_table(connection, table_name, rows, batch_size, backend.dialect,
+                                        on_batch=on_batch, column_names=columns, info=info)
+
+
+def import_files(backend, paths, batch_size=bulk_load.DEFAULT_BATCH_SIZE, on_progress=None, metadata_tables=None):
+    """Load export files named after their tables, parents before children.
+
+    Returns ({table name: (inserted, errors)}, elapsed seconds) like bulk_load.load_tables().
+    on_progress(table_name, rows_done) is called after every batch. metadata_tables is
+    {table name: metadata.TableInfo}, as loaded at connect time.
+    """
+    tables = {}
+    for path in paths:
+        table_name = table_of(path)
+        if table_name is None:
+            raise ValueError(f"Can't tell which table {path} belongs to, name it after the table")
+        if table_name not in bulk_load.LOAD_ORDER:
+            raise ValueError(f"{table_name} is filled from its base table when that is loaded, import that instead")
+        tables.setdefault(table_name, []).append(path)
+
+    start = time.perf_counter()
+    summary = {}
+    for table_name in bulk_load.LOAD_ORDER:
+        for path in tables.get(table_name, []):
+            inserted, errors = import_file(
+                backend, path, table_name, batch_size,
+                on_batch=None if on_progress is None else lambda done, table_name=table_name: on_progress(table_name, done),
+                info=(metadata_tables or {}).get(table_name))
+            total_inserted, total_errors = summary.get(table_name, (0, []))
+            summary[table_name] = (total_inserted + inserted, total_errors + errors)
+    return summary, time.perf_counter() - start
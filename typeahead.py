@@ -0,0 +1,209 @@
+# Prefix lookups for the record picker in manage_entries
+# A record is found by a prefix of its key (12 finds 12, 120-129, 1200-1299, ...) or of its
+# name. Both are index range reads on the primary key and the name indexes (schema.INDEXES),
+# each stopped after `limit` rows, so a lookup costs the same however large the table is. Recent
+# lookups are kept in a small LRU, and a longer prefix of a lookup that came back complete
+# is filtered from it in memory without a query.
+
+import collections
+import threading
+
+import schema
+
+# Column a record is also looked up by, besides its key
+NAME_COLUMNS = {
+    "Product": "Name",
+    "Customer": "Name",
+    "Supplier": "Name",
+}
+
+DEFAULT_LIMIT = 20
+DEFAULT_CACHE_ENTRIES = 128
+
+# Longest key, in digits, a numeric key prefix is extended to
+KEY_DIGITS = 10
+
+
+def key_ranges(prefix, digits=KEY_DIGITS):
+    """[(low, high)] of the non-negative integers whose decimal digits start with prefix."""
+    value = int(prefix)
+    ranges = [(value, value)]
+    if prefix.startswith("0"):
+        return ranges if prefix == "0" else []  # Keys aren't zero padded
+    for extra in range(1, digits - len(prefix) + 1):
+        scale = 10 ** extra
+        ranges.append((value * scale, value * scale + scale - 1))
+    return ranges
+
+
+def name_variants(prefix):
+    """The prefix as typed and capitalized the usual ways; each is one index range."""
+    variants = []
+    for variant in (prefix, prefix.capitalize(), prefix.title(), prefix.lower(), prefix.upper()):
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+def _upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _limit_clause(dialect):
+    return " LIMIT :row_limit" if dialect == "sqlite" else " FETCH FIRST :row_limit ROWS ONLY"
+
+
+def _first_rows(table_name, predicates, order, dialect):
+    """First :row_limit rows matching any predicate. Each predicate is one index range read in
+    order up to the limit on its own, so neither a wide OR nor a sort of every match is needed.
+    """
+    limit = _limit_clause(dialect)
+    ranges = " UNION ALL ".join(f"SELECT * FROM (SELECT * FROM {table_name} WHERE {predicate} "
+                                f"ORDER BY {order}{limit})" for predicate in predicates)
+    return f"SELECT * FROM ({ranges}) ORDER BY {order}{limit}"
+
+
+def key_kind(table_name):
+    key_column = schema.PRIMARY_KEYS[table_name][0]
+    return dict(schema.COLUMN_TYPES[table_name])[key_column]
+
+
+def build_key_query(table_name, prefix, dialect="oracle"):
+    """SELECT of the rows whose first key column starts with prefix, and its binds; None if none can."""
+    key_column = schema.PRIMARY_KEYS[table_name][0]
+    binds = {}
+    if key_kind(table_name) == "INT":
+        if not prefix.isdigit():
+            return None
+        predicates = []
+        for i, (low, high) in enumerate(key_ranges(prefix)):
+            predicates.append(f"{key_column} = :low{i}" if low == high else f"{key_column} BETWEEN :low{i} AND :high{i}")
+            binds[f"low{i}"] = low
+            if low != high:
+                binds[f"high{i}"] = high
+        if not predicates:
+            return None
+    else:
+        predicates = [f"{key_column} >= :low0 AND {key_column} < :high0"]
+        binds.update(low0=prefix, high0=_upper_bound(prefix))
+    order = ", ".join(schema.PRIMARY_KEYS[table_name])
+    return _first_rows(table_name, predicates, order, dialect), binds
+
+
+def build_name_query(table_name, prefix, dialect="oracle"):
+    """SELECT of the rows whose name starts with prefix, and its binds; None for tables without a name."""
+    column = NAME_COLUMNS.get(table_name)
+    if column is None:
+        return None
+    predicates = []
+    binds = {}
+    for i, variant in enumerate(name_variants(prefix)):
+        predicates.append(f"{column} >= :low{i} AND {column} < :high{i}")
+        binds[f"low{i}"] = variant
+        binds[f"high{i}"] = _upper_bound(variant)
+    order = ", ".join([column] + schema.PRIMARY_KEYS[table_name])
+    return _first_rows(table_name, predicates, order, dialect), binds
+
+
+def lookup(cursor, table_name, prefix, limit=DEFAULT_LIMIT, dialect="oracle"):
+    """(column names, rows, complete) of the records whose key or name starts with prefix.
+
+    Key matches come first, in key order, then name matches in name order; complete is False
+    when either query had more than `limit` rows.
+    """
+    column_names = None
+    rows = []
+    seen = set()
+    complete = True
+    for query in (build_key_query(table_name, prefix, dialect), build_name_query(table_name, prefix, dialect)):
+        if query is None:
+            continue
+        sql, binds = query
+        binds["row_limit"] = limit + 1  # One more to tell whether there are others
+        cursor.execute(sql, binds)
+        found = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+        complete = complete and len(found) <= limit
+        for row in found[:limit]:
+            key = schema.key_of(table_name, column_names, row)
+            if key not in seen:
+                seen.add(key)
+                rows.append(row)
+    return column_names, rows[:limit], complete
+
+
+def matches(table_name, column_names, row, prefix):
+    """True when the row's key or name starts with prefix, as lookup() matches it."""
+    key_value = row[schema.column_position(column_names, schema.PRIMARY_KEYS[table_name][0])]
+    if key_value is not None and str(key_value).startswith(prefix):
+        return True
+    column = NAME_COLUMNS.get(table_name)
+    if column is None:
+        return False
+    name = row[schema.column_position(column_names, column)]
+    return name is not None and any(name.startswith(variant) for variant in name_variants(prefix))
+
+
+class Typeahead:
+    """Prefix lookups of one table with an LRU of the most recent ones.
+
+    invalidate() must be called when the table is written, like result_cache.ResultCache.
+    """
+
+    def __init__(self, table_name, limit=DEFAULT_LIMIT, max_entries=DEFAULT_CACHE_ENTRIES, dialect="oracle"):
+        self.table_name = table_name
+        self.limit = limit
+        self.max_entries = max_entries
+        self.dialect = dialect
+        self.entries = collections.OrderedDict()  # prefix -> (column names, rows, complete)
+        self.lock = threading.Lock()  # lookups run on worker threads, cached() on the Tk thread
+        self.generation = 0  # bumped by invalidate(), so a lookup in flight isn't stored stale
+        self.hits = 0
+        self.misses = 0
+
+    def key_of(self, column_names, row):
+        return schema.key_of(self.table_name, column_names, row)
+
+    def cached(self, prefix):
+        """(column names, rows) from memory, or None when the database has to be asked."""
+        with self.lock:
+            entry = self.entries.get(prefix)
+            if entry is not None:
+                self.entries.move_to_end(prefix)
+                self.hits += 1
+                return entry[0], entry[1]
+            # A complete result for a shorter prefix holds every row the longer one can match
+            for length in range(len(prefix) - 1, 0, -1):
+                entry = self.entries.get(prefix[:length])
+                if entry is not None and entry[2] and entry[0] is not None:
+                    column_names = entry[0]
+                    rows = [row for row in entry[1] if matches(self.table_name, column_names, row, prefix)]
+                    self._put(prefix, (column_names, rows, True))
+                    self.hits += 1
+                    return column_names, rows
+        return None
+
+    def lookup(self, cursor, prefix):
+        """(column names, rows) of the records starting with prefix, from memory when possible."""
+        found = self.cached(prefix)
+        if found is not None:
+            return found
+        generation = self.generation
+        column_names, rows, complete = lookup(cursor, self.table_name, prefix, self.limit, self.dialect)
+        with self.lock:
+            self.misses += 1
+            if generation == self.generation:
+                self._put(prefix, (column_names, rows, complete))
+        return column_names, rows
+
+    def _put(self, prefix, entry):
+        self.entries[prefix] = entry
+        self.entries.move_to_end(prefix)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
@@ -0,0 +1,289 @@
+# Wishlist matching and restock notices
+# Customer.WishlistItem is free text. It is resolved to ProductIDs through normalized names
+# (name_key(): accents, case and punctuation dropped) kept in WishlistProduct and WishlistEntry,
+# both indexed on NameKey, so a wishlist entry is one index probe instead of a scan of every
+# product: the products with the same name, else the products whose name starts with it
+# ("inception" finds "inception blu ray"), else the closest names among those sharing its first
+# STEM_LENGTH characters (difflib), which covers typos after the first few letters.
+#
+# refresh() is driven by the change log (changes.py) like reports.py: only the products and
+# customers changed since the last refresh are looked at. A product whose stock went from 0 (or
+# that didn't exist) to positive gives a WishlistNotice for the customers matched to it, found
+# through WishlistMatch's primary key, so a restock touches only those customers.
+
+import datetime
+import difflib
+import re
+import unicodedata
+
+import changes
+import records
+import reports
+
+# ReportState row holding the last change applied
+STATE_NAME = "Wishlist"
+
+# Leading characters a fuzzy match has to share, and the names with them compared at most
+STEM_LENGTH = 3
+FUZZY_CANDIDATES = 500
+FUZZY_CUTOFF = 0.8
+
+# Products a name prefix resolves to at most
+MAX_MATCHES = 20
+
+KEY_LENGTH = 255  # NameKey VARCHAR(255)
+
+WORD = re.compile(r"[^\W_]+")
+
+
+def name_key(text):
+    """Normalized name: accents dropped, lower case, words of letters and digits single spaced."""
+    if not text:
+        return ""
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return " ".join(WORD.findall(text.lower()))[:KEY_LENGTH].strip()
+
+
+def _upper_bound(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _word_prefixes(key):
+    """Every leading run of whole words of a key, the key itself included."""
+    words = key.split(" ")
+    return [" ".join(words[:count]) for count in range(1, len(words) + 1)]
+
+
+def match(cursor, key, dialect="oracle"):
+    """(match kind, ProductIDs) a normalized wishlist entry resolves to; (None, []) when nothing is close."""
+    cursor.execute("SELECT ProductID FROM WishlistProduct WHERE NameKey = :key ORDER BY ProductID", {"key": key})
+    found = [product_id for (product_id,) in cursor.fetchall()]
+    if found:
+        return "exact", found
+    limit = reports._limit_clause(dialect)
+    cursor.execute(f"SELECT ProductID FROM WishlistProduct WHERE NameKey >= :low AND NameKey < :high "
+                   f"ORDER BY NameKey, ProductID{limit}",
+                   {"low": key + " ", "high": key + "!", "row_limit": MAX_MATCHES})  # "!" follows " "
+    found = [product_id for (product_id,) in cursor.fetchall()]
+    if found:
+        return "prefix", found
+    # The names sorting nearest the key on either side of it share the most leading characters
+    stem = key[:STEM_LENGTH]
+    candidates = {}
+    for condition, order in (("NameKey >= :low AND NameKey < :key", " DESC"),
+                             ("NameKey > :key AND NameKey < :high", "")):
+        cursor.execute(f"SELECT NameKey, ProductID FROM WishlistProduct WHERE {condition} "
+                       f"ORDER BY NameKey{order}{limit}",
+                       {"low": stem, "key": key, "high": _upper_bound(stem), "row_limit": FUZZY_CANDIDATES // 2})
+        for candidate, product_id in cursor.fetchall():
+            candidates.setdefault(candidate, []).append(product_id)
+    closest = difflib.get_close_matches(key, list(candidates), n=1, cutoff=FUZZY_CUTOFF)
+    if closest:
+        return "fuzzy", sorted(candidates[closest[0]])
+    return None, []
+
+
+def resolve(cursor, customer_id, key, dialect="oracle", matched=None):
+    """Match one customer's wishlist entry again, replacing its WishlistMatch rows.
+
+    matched ({key: match()}) remembers the names already matched when resolving many entries.
+    """
+    cursor.execute("DELETE FROM WishlistMatch WHERE CustomerID = :customer_id", {"customer_id": customer_id})
+    matched = {} if matched is None else matched
+    if key not in matched:
+        matched[key] = match(cursor, key, dialect)
+    kind, product_ids = matched[key]
+    if product_ids:
+        cursor.executemany("INSERT INTO WishlistMatch (ProductID, CustomerID) VALUES (:1, :2)",
+                           [(product_id, customer_id) for product_id in product_ids])
+    cursor.execute("UPDATE WishlistEntry SET MatchKind = :kind WHERE CustomerID = :customer_id",
+                   {"kind": kind, "customer_id": customer_id})
+    return product_ids
+
+
+def _in_stock(quantity):
+    return 1 if quantity is not None and quantity > 0 else 0
+
+
+def rebuild_tables(connection, dialect="oracle", batch_size=1000):
+    """Fill the wishlist tables from every product and customer. No notices are given."""
+    cursor = connection.cursor()
+    for table_name in ("WishlistMatch", "WishlistEntry", "WishlistProduct"):
+        cursor.execute(f"DELETE FROM {table_name}")
+    reader = connection.cursor()
+    reader.execute("SELECT ProductID, Name, StockQuantity FROM Product")
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
+        keyed = [(product_id, name_key(name), _in_stock(quantity)) for product_id, name, quantity in rows]
+        cursor.executemany("INSERT INTO WishlistProduct (ProductID, NameKey, InStock) VALUES (:1, :2, :3)",
+                           [row for row in keyed if row[1]])
+    reader.execute("SELECT CustomerID, WishlistItem FROM Customer WHERE WishlistItem IS NOT NULL")
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
+        keyed = [(customer_id, name_key(item)) for customer_id, item in rows]
+        cursor.executemany("INSERT INTO WishlistEntry (CustomerID, NameKey) VALUES (:1, :2)",
+                           [row for row in keyed if row[1]])
+
+    # Exact names in one join, then the entries left over, each different name matched once
+    cursor.execute("INSERT INTO WishlistMatch (ProductID, CustomerID) SELECT p.ProductID, e.CustomerID "
+                   "FROM WishlistEntry e JOIN WishlistProduct p ON p.NameKey = e.NameKey")
+    cursor.execute("UPDATE WishlistEntry SET MatchKind = 'exact' "
+                   "WHERE CustomerID IN (SELECT CustomerID FROM WishlistMatch)")
+    reader.execute("SELECT CustomerID, NameKey FROM WishlistEntry WHERE MatchKind IS NULL")
+    matched = {}
+    for customer_id, key in reader.fetchall():
+        resolve(cursor, customer_id, key, dialect, matched)
+
+
+def _changed(cursor, table_name, window):
+    cursor.execute(f"SELECT DISTINCT c.Key1 FROM ChangeLog c WHERE c.TableName = :table_name AND {reports.WINDOW}",
+                   dict(window, table_name=table_name))
+    return [key for (key,) in cursor.fetchall()]
+
+
+def _column(cursor, column):
+    return [desc[0].upper() for desc in cursor.description].index(column.upper())
+
+
+def apply(cursor, window, today=None, dialect="oracle"):
+    """Apply the product and customer changes of one change log window.
+
+    Returns [(customer ID, product ID)] of the notices given for products back in stock.
+    """
+    today = today or datetime.date.today()
+    product_ids = _changed(cursor, "Product", window)
+    customer_ids = _changed(cursor, "Customer", window)
+    to_resolve = set(customer_ids)
+
+    # Products: new name keys and stock, remembering which came back in stock
+    restocked = []
+    if product_ids:
+        stored = records.fetch_rows(cursor, "WishlistProduct", [(product_id,) for product_id in product_ids])
+        current = records.fetch_rows(cursor, "Product", [(product_id,) for product_id in product_ids])
+        if current:
+            name_at, stock_at = _column(cursor, "Name"), _column(cursor, "StockQuantity")
+        written = []
+        renamed = []
+        for product_id in product_ids:
+            old = stored.get((product_id,))  # (ProductID, NameKey, InStock)
+            row = current.get((product_id,))
+            key = name_key(row[name_at]) if row is not None else ""
+            in_stock = _in_stock(row[stock_at]) if row is not None else 0
+            if key:
+                written.append((product_id, key, in_stock))
+                if in_stock and not (old is not None and old[2]):
+                    restocked.append(product_id)
+            if old is None or old[1] != key:
+                renamed.append((product_id, old[1] if old is not None else None, key))
+        cursor.executemany("DELETE FROM WishlistProduct WHERE ProductID = :1",
+                           [(product_id,) for product_id in product_ids])
+        cursor.executemany("INSERT INTO WishlistProduct (ProductID, NameKey, InStock) VALUES (:1, :2, :3)", written)
+
+        # Customers a renamed, new or removed product may match or may have stopped matching
+        for product_id, old_key, key in renamed:
+            if old_key is not None:
+                cursor.execute("SELECT CustomerID FROM WishlistMatch WHERE ProductID = :product_id",
+                               {"product_id": product_id})
+                to_resolve.update(customer_id for (customer_id,) in cursor.fetchall())
+            if not key:
+                continue
+            prefixes = _word_prefixes(key)
+            in_list = ", ".join(f":key{i}" for i in range(len(prefixes)))
+            stem = key[:STEM_LENGTH]
+            cursor.execute(f"SELECT CustomerID FROM WishlistEntry WHERE NameKey IN ({in_list}) "
+                           f"UNION SELECT CustomerID FROM WishlistEntry WHERE NameKey >= :low AND NameKey < :high "
+                           f"AND (MatchKind IS NULL OR MatchKind = 'fuzzy')",
+                           dict({f"key{i}": prefix for i, prefix in enumerate(prefixes)},
+                                low=stem, high=_upper_bound(stem)))
+            to_resolve.update(customer_id for (customer_id,) in cursor.fetchall())
+
+    # Customers whose wishlist changed, then everyone to match again
+    if customer_ids:
+        current = records.fetch_rows(cursor, "Customer", [(customer_id,) for customer_id in customer_ids])
+        entries = []
+        if current:
+            item_at = _column(cursor, "WishlistItem")
+            entries = [(customer_id, name_key(row[item_at])) for (customer_id,), row in current.items()]
+        keys = [(customer_id,) for customer_id in customer_ids]
+        cursor.executemany("DELETE FROM WishlistEntry WHERE CustomerID = :1", keys)
+        cursor.executemany("DELETE FROM WishlistMatch WHERE CustomerID = :1", keys)
+        cursor.executemany("INSERT INTO WishlistEntry (CustomerID, NameKey) VALUES (:1, :2)",
+                           [entry for entry in entries if entry[1]])
+    if to_resolve:
+        entries = records.fetch_rows(cursor, "WishlistEntry", [(customer_id,) for customer_id in sorted(to_resolve)])
+        matched = {}
+        for (customer_id,), (entry_id, key, kind) in sorted(entries.items()):
+            resolve(cursor, customer_id, key, dialect, matched)
+
+    # Restocks: the customers matched to each product, through WishlistMatch's primary key
+    notices = []
+    for product_id in restocked:
+        cursor.execute("SELECT CustomerID FROM WishlistMatch WHERE ProductID = :product_id", {"product_id": product_id})
+        notices.extend((customer_id, product_id) for (customer_id,) in cursor.fetchall())
+    if notices:
+        cursor.executemany("DELETE FROM WishlistNotice WHERE CustomerID = :1 AND ProductID = :2", notices)
+        cursor.executemany("INSERT INTO WishlistNotice (CustomerID, ProductID, RestockedAt) VALUES (:1, :2, :3)",
+                           [(customer_id, product_id, today) for customer_id, product_id in notices])
+    return notices
+
+
+def refresh(connection, dialect="oracle", rebuild=False, today=None, gap_seconds=changes.GAP_SECONDS,
+            keep_days=changes.KEEP_DAYS):
+    """Bring the wishlist matches up to date in one transaction (committed).
+
+    Returns (rebuilt, notices); the first refresh, one older than the change log keeps and
+    rebuild=True rebuild everything and give no notices.
+    """
+    cursor = connection.cursor()
+    if dialect == "sqlite":
+        cursor.execute("BEGIN IMMEDIATE")  # Refreshes take turns, and nobody writes in between
+    else:
+        cursor.execute("LOCK TABLE WishlistEntry IN EXCLUSIVE MODE")  # Refreshes take turns
+    cursor.execute("SELECT LastChangeID, RefreshedAt FROM ReportState WHERE ReportName = :name", {"name": STATE_NAME})
+    state = cursor.fetchone()
+    now = datetime.datetime.now().replace(microsecond=0)
+    stale = state is None or reports._as_datetime(state[1]) < now - datetime.timedelta(days=keep_days - 1)
+    notices = []
+    if rebuild or stale:
+        if dialect != "sqlite":
+            cursor.execute("LOCK TABLE Product, Customer IN SHARE MODE")  # No change in flight while reading
+        cursor.execute("SELECT MAX(ChangeID) FROM ChangeLog")
+        last = cursor.fetchone()[0] or 0
+        rebuild_tables(connection, dialect)
+    else:
+        last = reports.frontier(cursor, state[0], gap_seconds, dialect)
+        if last > state[0]:
+            notices = apply(cursor, {"since": state[0], "upto": last}, today, dialect)
+
+    binds = {"name": STATE_NAME, "last": last, "refreshed": now}
+    cursor.execute("UPDATE ReportState SET LastChangeID = :last, RefreshedAt = :refreshed "
+                   "WHERE ReportName = :name", binds)
+    if cursor.rowcount == 0:
+        cursor.execute("INSERT INTO ReportState (ReportName, LastChangeID, RefreshedAt) "
+                       "VALUES (:name, :last, :refreshed)", binds)
+    connection.commit()
+    return rebuild or stale, notices
+
+
+def pending(cursor, limit=100, dialect="oracle"):
+    """(column names, rows) of the notices not yet dismissed, newest restock first.
+
+    Rows are (RestockedAt, CustomerID, customer Name, PhoneNumber, ProductID, product Name).
+    """
+    cursor.execute(f"SELECT n.RestockedAt, n.CustomerID, c.Name, c.PhoneNumber, n.ProductID, p.Name AS Product "
+                   f"FROM (SELECT * FROM WishlistNotice ORDER BY RestockedAt DESC{reports._limit_clause(dialect)}) n "
+                   f"LEFT JOIN Customer c ON c.CustomerID = n.CustomerID "
+                   f"LEFT JOIN Product p ON p.ProductID = n.ProductID "
+                   f"ORDER BY n.RestockedAt DESC, n.CustomerID, n.ProductID", {"row_limit": limit})
+    return [desc[0] for desc in cursor.description], cursor.fetchall()
+
+
+def dismiss(connection, notices):
+    """Remove notices [(customer ID, product ID)] once the customers were told (committed)."""
+    cursor = connection.cursor()
+    cursor.executemany("DELETE FROM WishlistNotice WHERE CustomerID = :1 AND ProductID = :2", notices)
+    connection.commit()